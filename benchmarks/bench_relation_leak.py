@@ -0,0 +1,61 @@
+# benchmarks/bench_relation_leak.py
+"""
+بررسی نشت اشتراک‌های رابطه: یک ForeignKey و یک OneToManyField یک میلیون بار دوباره مقداردهی می‌شوند
+و تعداد بلوک‌های تخصیص‌یافته‌ی مفسر (sys.getallocatedblocks) باید ثابت بماند:
+    python benchmarks/bench_relation_leak.py [count]
+"""
+import gc
+import os
+import sys
+import time
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kivy_projectile.models import BaseModel
+from kivy_projectile.models.field import ForeignKey, OneToManyField, StringField
+
+
+class Tag(BaseModel):
+    label = StringField(default = "")
+
+
+class Post(BaseModel):
+    tag = ForeignKey(Tag)
+    tags = OneToManyField(Tag)
+
+
+def main(count = 1000000):
+    targets = [Tag(label = str(index)) for index in range(8)]
+    post = Post()
+    # گرم کردن کش‌ها قبل از اندازه‌گیری
+    for index in range(1000):
+        post.tag = targets[index % 8]
+        post.tags = [targets[index % 8]]
+
+    samples = []
+    gc.collect()
+    baseline = sys.getallocatedblocks()
+    start = time.perf_counter()
+    for index in range(count):
+        target = targets[index % 8]
+        post.tag = target
+        post.tags = [target]
+        if not index % (count // 10 or 1):
+            gc.collect()
+            samples.append(sys.getallocatedblocks() - baseline)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    growth = sys.getallocatedblocks() - baseline
+
+    subscriptions = sum(len(target.get_property_observers("on_change")) for target in targets)
+    print(f"{count} reassignments: {elapsed:.2f}s, block growth samples: {samples}")
+    print(f"final growth: {growth} blocks, live subscriptions: {subscriptions}")
+    # یک اشتراک برای tag و یکی برای tags
+    assert subscriptions == 2, "stale relation subscriptions"
+    assert growth < 1000, f"memory grew by {growth} blocks"
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,34 @@
+# benchmarks/bench_schema.py
+"""
+ساخت انبوه نمونه‌های مدل (schema کامپایل‌شده‌ی هر کلاس):
+    python benchmarks/bench_schema.py [count]
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kivy_projectile.models import BaseModel
+from kivy_projectile.models.field import BooleanField, FloatField, IntegerField, StringField
+
+
+class Product(BaseModel):
+    name = StringField(default = "")
+    price = FloatField(default = 0.0)
+    stock = IntegerField(default = 0)
+    active = BooleanField(default = True)
+
+
+def main(count = 100000):
+    start = time.perf_counter()
+    items = [Product(name = "item", price = 1.5, stock = index) for index in range(count)]
+    elapsed = time.perf_counter() - start
+    print(f"{count} constructions: {elapsed * 1000:.1f}ms ({elapsed / count * 1e6:.2f}us each)")
+    return items
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
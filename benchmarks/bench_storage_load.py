@@ -0,0 +1,57 @@
+# benchmarks/bench_storage_load.py
+"""
+بارگذاری سرد ردیف‌ها از SQLite (بدون نمونه در identity map):
+    python benchmarks/bench_storage_load.py [count]
+"""
+import gc
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kivy_projectile.models import BaseModel, SQLiteStorage
+from kivy_projectile.models.field import FloatField, ForeignKey, IntegerField, StringField
+
+
+class Category(BaseModel):
+    uid = IntegerField(primary_key = True)
+    name = StringField(default = "")
+
+
+class Product(BaseModel):
+    uid = IntegerField(primary_key = True)
+    name = StringField(default = "")
+    price = FloatField(default = 0.0)
+    category = ForeignKey(Category, null = True, related_name = "products")
+
+
+def main(count = 100000):
+    with tempfile.TemporaryDirectory() as directory:
+        storage = SQLiteStorage(os.path.join(directory, "bench.sqlite"), [Category, Product])
+        categories = [Category(uid = index, name = f"c{index}") for index in range(100)]
+        items = [
+            Product(uid = index, name = f"p{index}", price = index * 0.5, category = categories[index % 100])
+            for index in range(count)
+        ]
+        start = time.perf_counter()
+        storage.save(categories + items)
+        print(f"save {count} rows: {(time.perf_counter() - start) * 1000:.1f}ms")
+
+        # بارگذاری سرد: هیچ نمونه‌ای در حافظه نمانده
+        del categories, items
+        gc.collect()
+
+        start = time.perf_counter()
+        loaded = storage.load(Product)
+        elapsed = time.perf_counter() - start
+        print(f"cold load {len(loaded)} rows: {elapsed * 1000:.1f}ms ({elapsed / count * 1e6:.2f}us each)")
+        storage.close()
+        return len(loaded)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,51 @@
+# benchmarks/bench_store_memory.py
+"""
+حافظه‌ی هر ردیف در ModelStore در مقایسه با نمونه‌های BaseModel:
+    python benchmarks/bench_store_memory.py [count]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kivy_projectile.models import BaseModel, ModelStore
+from kivy_projectile.models.field import BooleanField, FloatField, IntegerField, StringField
+
+
+class Product(BaseModel):
+    name = StringField(default = "")
+    price = FloatField(default = 0.0)
+    stock = IntegerField(default = 0)
+    active = BooleanField(default = True)
+
+
+def measure(build):
+    """ (نتیجه، بایت تخصیص‌یافته، زمان) """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size, elapsed
+
+
+def main(count = 100000):
+    rows = [{"name": "item", "price": index * 0.5, "stock": index, "active": index % 2 == 0} for index in range(count)]
+
+    models, model_bytes, model_time = measure(lambda: [Product(**row) for row in rows])
+    del models
+    store, store_bytes, store_time = measure(lambda: ModelStore(Product, rows))
+
+    print(f"BaseModel:  {model_bytes / count:8.1f} bytes/row  ({model_time * 1000:.1f}ms)")
+    print(f"ModelStore: {store_bytes / count:8.1f} bytes/row  ({store_time * 1000:.1f}ms)")
+    print(f"ratio: {model_bytes / store_bytes:.1f}x")
+    return store
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,75 @@
+# benchmarks/bench_theme_switch.py
+"""
+زمان تغییر mode تم روی تعداد زیادی ویجت (یک pass در dispatcher):
+    python benchmarks/bench_theme_switch.py [count]
+با جدول rgba هر رنگ یک‌بار parse می‌شود؛ برای مقایسه همان pass با parse دوباره‌ی hex برای هر ویجت هم اندازه گرفته می‌شود.
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kivy.clock import Clock
+from kivy.properties import ListProperty
+from kivy.uix.widget import Widget
+from kivy.utils import get_color_from_hex
+
+from kivy_projectile.app.theme import BaseTheme, M3ThemableBehavior
+
+
+class Swatch(M3ThemableBehavior, Widget):
+    bg_color = ListProperty([0, 0, 0, 0])
+    fg_color = ListProperty([0, 0, 0, 0])
+    line_color = ListProperty([0, 0, 0, 0])
+
+
+def switch(theme, rounds):
+    """ میانگین زمان یک pass پس از تغییر mode (ثانیه) """
+    total = 0.0
+    for _ in range(rounds):
+        theme.toggle_mode()
+        Clock.tick()
+        total += theme.dispatcher.last_pass_time
+    return total / rounds
+
+
+def switch_parsing_hex(theme, widgets, rounds):
+    """ همان کار بدون جدول rgba: parse دوباره‌ی hex هر توکن برای هر ویجت """
+    total = 0.0
+    for _ in range(rounds):
+        theme.toggle_mode()
+        start = time.perf_counter()
+        for widget in widgets:
+            for token_prop, targets_prop in widget._theme_roles:
+                color = get_color_from_hex(theme.get_hex(getattr(widget, token_prop)))
+                for target in getattr(widget, targets_prop):
+                    setattr(widget, target, color)
+        total += time.perf_counter() - start
+        Clock.tick()
+    return total / rounds
+
+
+def main(count = 5000, rounds = 10):
+    theme = BaseTheme()
+    start = time.perf_counter()
+    widgets = [
+        Swatch(theme = theme, target_bg_prop = ["bg_color"], target_fg_prop = ["fg_color"],
+               target_outline_prop = ["line_color"])
+        for _ in range(count)
+    ]
+    print(f"{count} widgets created in {(time.perf_counter() - start) * 1000:.0f}ms")
+    Clock.tick()
+
+    table = switch(theme, rounds)
+    parsing = switch_parsing_hex(theme, widgets, rounds)
+    print(f"rgba table: {table * 1000:8.2f}ms/switch  ({table / count * 1e6:.2f}us/widget)")
+    print(f"hex parse:  {parsing * 1000:8.2f}ms/switch  ({parsing / count * 1e6:.2f}us/widget)")
+    print(theme.dispatcher.stats())
+    return table
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -21,6 +21,10 @@ class BaseApp(MDApp):
     container_module_name = "container"  # نام فایل کانتینر
     ui_folder_name = "ui"  # مسیر پوشه ui
     core_folder_name = "core"  # مسیر پوشه core
+    cache_folder_name = "cache"  # مسیر کش پاسخ‌های HTTP زیر BASE_DIR
+    theme_cache_file_name = "theme.json"  # کش توکن‌های تم داخل cache_folder_name
+    # تم M3 مشترک؛ زیرکلاس می‌تواند آن را در سطح کلاس تعریف کند یا build_theme را صدا بزند
+    m3_theme = None
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -28,6 +32,7 @@ class BaseApp(MDApp):
         self.base_url = None
         self.settings_module = None
         self.dynamic_config = None
+        self.sync_engine = None
 
         self._load_settings()
         self.load_config()
@@ -53,6 +58,34 @@ class BaseApp(MDApp):
             self.BASE_DIR = project_root
             self.base_url = None
 
+    def get_sync_engine(self):
+        """
+        موتور همگام‌سازی مشترک روی base_url با کش HTTP زیر BASE_DIR (اولین بار ساخته می‌شود):
+            app.get_sync_engine().get("items/", callback = ...)
+        """
+        if self.sync_engine is None:
+            from ..network import HTTPCache, SyncEngine
+            base_dir = Path(self.BASE_DIR) if self.BASE_DIR else Path(os.getcwd())
+            cache = HTTPCache(base_dir / self.cache_folder_name / "http")
+            self.sync_engine = SyncEngine(self.base_url, cache = cache)
+        return self.sync_engine
+
+    def build_theme(self, **sources):
+        """
+        ساخت تم M3 مشترک (app.m3_theme) با کش توکن‌ها زیر BASE_DIR؛ قبل از ساخت ویجت‌ها صدا زده شود:
+            self.build_theme(source_primary = "#006A6A")
+        """
+        from .theme import BaseTheme, ThemeCache
+        base_dir = Path(self.BASE_DIR) if self.BASE_DIR else Path(os.getcwd())
+        cache = ThemeCache(base_dir / self.cache_folder_name / self.theme_cache_file_name)
+        self.m3_theme = BaseTheme(cache = cache, **sources)
+        return self.m3_theme
+
+    def on_stop(self):
+        if self.sync_engine is not None:
+            self.sync_engine.stop()
+        return super().on_stop()
+
     def build(self):
         """
         هنگام اجرای اپ:
@@ -1,4 +1,10 @@
 from .theme import BaseTheme
 from .behvaior import M3ThemableBehavior
+from .dispatcher import ThemeDispatcher
+from .cache import ThemeCache
+from .transition import ThemeTransition
+from .overlay import ThemeOverlay
+from .extraction import SeedExtractor, seed_extractor, extract_seed_colors
 
-__all__ = ["BaseTheme","M3ThemableBehavior"]
\ No newline at end of file
+__all__ = ["BaseTheme","M3ThemableBehavior","ThemeDispatcher","ThemeCache","ThemeTransition","ThemeOverlay",
+           "SeedExtractor","seed_extractor","extract_seed_colors"]
\ No newline at end of file
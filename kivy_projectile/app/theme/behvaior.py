@@ -1,15 +1,41 @@
 # theme/behavior.py
+import weakref
+
 from kivy.event import EventDispatcher
 from kivy.properties import ObjectProperty, StringProperty, NumericProperty, ListProperty
 from kivymd.app import MDApp
 from .theme import BaseTheme
 
 
+# ریشه‌های زیردرخت معمولی که parent آن‌ها دنبال می‌شود
+_watched = weakref.WeakSet()
+
+
+def _refresh_subtree(widget, *args):
+    for child in widget.walk(restrict = True):
+        if isinstance(child, M3ThemableBehavior):
+            child._on_parent()
+
+
+def _watch_subtree(widget):
+    if isinstance(widget, M3ThemableBehavior) or widget in _watched:
+        return
+    _watched.add(widget)
+    widget.fbind("parent", _refresh_subtree)
+    _refresh_subtree(widget)
+
+
 class M3ThemableBehavior(EventDispatcher):
     """
     Behavior عمومی برای ویجت‌های M3
+
+    اگر theme صریحاً داده نشود، نزدیک‌ترین theme_overlay در خود ویجت یا والدهایش و در نبود آن
+    تم برنامه استفاده می‌شود؛ با جابه‌جایی در درخت یا تغییر theme_overlay دوباره resolve می‌شود.
+    (برای زیردرختی که بدون ویجت M3 در مسیرش اضافه شده، refresh_theme را روی ریشه‌ی آن صدا بزنید)
     """
     theme: BaseTheme = ObjectProperty(None, rebind = True)
+    # ThemeOverlay برای این ویجت و زیردرختش
+    theme_overlay = ObjectProperty(None, allownone = True)
 
     bg_token = StringProperty("surface")
     fg_token = StringProperty("on_surface")
@@ -22,45 +48,123 @@ class M3ThemableBehavior(EventDispatcher):
     target_fg_prop = ListProperty([])
     target_outline_prop = ListProperty([])
     target_optional_prop = ListProperty([])
+
+    # (پراپرتی توکن، پراپرتی مقصد)
+    _theme_roles = (
+        ("bg_token", "target_bg_prop"),
+        ("fg_token", "target_fg_prop"),
+        ("outline_token", "target_outline_prop"),
+        ("optional_token", "target_optional_prop"),
+    )
+
     def __init__(self, *args, **kwargs):
+        self._registered_theme = None
+        self._resolved_context = None
+        self._resolving = False
+        # لیست children در آخرین تغییر، برای یافتن فرزندان تازه
+        self._known_children = []
         super().__init__(*args, **kwargs)
+        self._theme_explicit = self.theme is not None
         self._bind_theme()
+        for token_prop, _ in self._theme_roles:
+            self.fbind(token_prop, self._on_token_prop)
+        self.fbind("theme", self._on_theme)
+        self.fbind("parent", self._on_parent)
+        self.fbind("theme_overlay", self._on_theme_overlay)
+        self.fbind("children", self._on_children)
         self.apply_theme()
 
     def _bind_theme(self):
-        if self.theme is None:
-            app = MDApp.get_running_app()
-            if app and hasattr(app, "m3_theme"):
-                self.theme = app.m3_theme
-        if self.theme:
-            self.theme.bind(tokens = lambda *a:self.apply_theme())
+        self._resolve_theme()
+        self._register_theme()
 
-    def apply_theme(self, *args):
-        if not self.theme:
-            return
+    # -------------------------
+    # resolve تم از درخت ویجت‌ها
+    # -------------------------
+    def resolve_theme(self):
+        """ نزدیک‌ترین theme_overlay در خود ویجت یا والدهایش، وگرنه تم برنامه """
+        widget = self
+        while widget is not None:
+            overlay = getattr(widget, "theme_overlay", None)
+            if overlay is not None:
+                return overlay
+            parent = getattr(widget, "parent", None)
+            # parent خود Window، خودش است
+            widget = parent if parent is not widget else None
+        app = MDApp.get_running_app()
+        return getattr(app, "m3_theme", None) if app else None
 
+    def _resolve_theme(self):
+        context = self._resolved_context = self.resolve_theme()
+        # بدون تم در درخت و برنامه (مثلاً ویجت جداشده) تم قبلی می‌ماند
+        if self._theme_explicit or context is None or self.theme is context:
+            return
+        self._resolving = True
         try:
-            bg = self.theme.get_rgba(self.bg_token)
-            fg = self.theme.get_rgba(self.fg_token)
-            outline = self.theme.get_rgba(self.outline_token)
-            optional = self.theme.get_rgba(self.optional_token)
-            if self.target_bg_prop:
-                for target in self.target_bg_prop:
-                    if hasattr(self, target):
-                        setattr(self, target, bg)
+            self.theme = context
+        finally:
+            self._resolving = False
 
-            if self.target_fg_prop:
-                for target in self.target_fg_prop:
-                    if hasattr(self, target):
-                        setattr(self, target, fg)
+    def refresh_theme(self):
+        """ resolve دوباره‌ی تم این ویجت و همه‌ی ویجت‌های M3 زیردرختش """
+        for widget in self.walk(restrict = True):
+            if isinstance(widget, M3ThemableBehavior):
+                widget._resolve_theme()
 
-            if self.target_outline_prop:
-                for target in  self.target_outline_prop:
-                    if hasattr(self, target):
-                        setattr(self, target, outline)
-            if self.target_optional_prop:
-                for target in self.target_optional_prop:
+    def _on_parent(self, *args):
+        # فقط اگر overlay موثر بالای این ویجت عوض شده باشد زیردرخت پیمایش می‌شود
+        if self.resolve_theme() is not self._resolved_context:
+            self.refresh_theme()
+
+    def _on_theme_overlay(self, *args):
+        self.refresh_theme()
+
+    def _on_children(self, instance, children):
+        # ویجت M3 خودش با تغییر parent resolve می‌شود؛ برای ریشه‌ی زیردرخت‌های معمولی parent دنبال می‌شود.
+        # فرزندان تازه با مقایسه‌ی لیست قبلی و فعلی پیدا می‌شوند (هر جای لیست، یا چند فرزند در یک تغییر)
+        known = {id(child) for child in self._known_children}
+        self._known_children = list(children)
+        for child in children:
+            if id(child) not in known:
+                _watch_subtree(child)
+
+    def _register_theme(self):
+        """ ثبت در dispatcher تم فقط با توکن‌هایی که این ویجت استفاده می‌کند (با weakref) """
+        if self._registered_theme is not None and self._registered_theme is not self.theme:
+            self._registered_theme.dispatcher.unregister(self)
+        self._registered_theme = self.theme
+        if self.theme:
+            tokens = [getattr(self, token_prop) for token_prop, _ in self._theme_roles]
+            self.theme.dispatcher.register(self, tokens)
+
+    def _on_theme(self, *args):
+        if not self._resolving:
+            # تم صریح دیگر از درخت resolve نمی‌شود
+            self._theme_explicit = True
+        self._register_theme()
+        self.apply_theme()
+
+    def _on_token_prop(self, *args):
+        self._register_theme()
+        self.apply_theme()
+
+    def apply_theme(self, *args, changed = None):
+        """ اعمال رنگ توکن‌ها روی پراپرتی‌های مقصد؛ با changed فقط نقش‌هایی که توکنشان عوض شده """
+        theme = self.theme
+        if not theme:
+            return
+
+        try:
+            for token_prop, targets_prop in self._theme_roles:
+                targets = getattr(self, targets_prop)
+                if not targets:
+                    continue
+                token = getattr(self, token_prop)
+                if changed is not None and token not in changed:
+                    continue
+                color = theme.get_rgba(token)
+                for target in targets:
                     if hasattr(self, target):
-                        setattr(self, target, optional)
+                        setattr(self, target, color)
         except Exception as e:
             print("Error applying theme:", e)
@@ -0,0 +1,90 @@
+# theme/cache.py
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# با تغییر ساختار فایل افزایش یابد
+CACHE_FORMAT = 1
+
+
+def theme_cache_key(sources, algorithm_version, roles = None):
+    """ hash رنگ‌های منبع + نسخه‌ی الگوریتم (و جدول نقش‌ها) """
+    payload = json.dumps([algorithm_version, sorted(sources.items()), roles], sort_keys = True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class ThemeCache:
+    """
+    کش توکن‌های ساخته‌شده‌ی تم (light و dark) در یک فایل JSON کوچک:
+        cache = ThemeCache(BASE_DIR / "cache" / "theme.json")
+        theme = BaseTheme(cache = cache)
+
+    - کلید هر ورودی hash رنگ‌های منبع و نسخه‌ی الگوریتم است؛ فایل با نسخه‌ی دیگر نادیده گرفته می‌شود
+    - حداکثر max_entries مجموعه‌ی آخر نگه داشته می‌شود (LRU)
+    - نوشتن اتمیک (فایل موقت + os.replace)
+    """
+
+    def __init__(self, path, max_entries = 8):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = None
+
+        self.hits = 0
+        self.misses = 0
+
+    def _read(self):
+        if self._entries is not None:
+            return self._entries
+        self._entries = OrderedDict()
+        try:
+            with open(self.path, "r", encoding = "utf-8") as fp:
+                data = json.load(fp)
+        except (OSError, ValueError):
+            return self._entries
+        if isinstance(data, dict) and data.get("format") == CACHE_FORMAT:
+            for key, entry in data.get("entries", []):
+                self._entries[key] = entry
+        return self._entries
+
+    def load(self, key):
+        """ (light، dark) یا None """
+        with self._lock:
+            entry = self._read().get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry["light"], entry["dark"]
+
+    def store(self, key, light, dark):
+        with self._lock:
+            entries = self._read()
+            entry = entries.get(key)
+            if entry is not None and entry["light"] == light and entry["dark"] == dark:
+                entries.move_to_end(key)
+                return
+            entries[key] = {"light": dict(light), "dark": dict(dark)}
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last = False)
+            self._write(entries)
+
+    def _write(self, entries):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok = True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding = "utf-8") as fp:
+            json.dump({"format": CACHE_FORMAT, "entries": list(entries.items())}, fp, separators = (",", ":"))
+        os.replace(temp_path, self.path)
+
+    def clear(self):
+        with self._lock:
+            self._entries = OrderedDict()
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
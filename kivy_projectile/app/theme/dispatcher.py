@@ -0,0 +1,227 @@
+# theme/dispatcher.py
+import time
+import weakref
+
+from kivy.clock import Clock
+
+
+def is_on_screen(widget):
+    """ آیا ویجت به پنجره متصل است و کادرش با پنجره هم‌پوشانی دارد """
+    window = widget.get_root_window()
+    if window is None:
+        return False
+    x, y = widget.to_window(widget.x, widget.y)
+    return x < window.width and y < window.height and x + widget.width > 0 and y + widget.height > 0
+
+
+class ThemeDispatcher:
+    """
+    رجیستری مرکزی ویجت‌های تم‌پذیر یک تم:
+    - ویجت‌ها با weakref نگه داشته می‌شوند؛ ویجت حذف‌شده خودبه‌خود از رجیستری می‌رود
+    - گروه‌بندی بر اساس (کلاس ویجت، مجموعه‌ی توکن‌ها)؛ تغییر هر توکن فقط گروه‌های وابسته را لمس می‌کند
+    - تغییرات یک فریم جمع و در یک pass (Clock trigger) روی ویجت‌های زنده اعمال می‌شوند
+    - تعداد ویجت‌های به‌روزشده و مدت هر pass گزارش می‌شود
+    - با frame_budget (ثانیه) هر pass بعد از پر شدن بودجه متوقف و همان دور (sweep) در فریم بعد ادامه می‌یابد
+    - با skip_offscreen (در حین transition) ویجت‌های خارج از صفحه رد می‌شوند؛ دور نهایی بعد از
+      end_transition همه را به رنگ نهایی می‌رساند
+    """
+    # هر چند ویجت یک‌بار زمان بررسی شود
+    BUDGET_CHECK_EVERY = 16
+
+    def __init__(self, theme):
+        self.theme = theme
+        # (کلاس، توکن‌ها) -> WeakSet ویجت‌ها
+        self._groups = {}
+        # توکن -> کلیدهای گروه
+        self._token_groups = {}
+        # ویجت -> کلید گروه فعلی
+        self._members = weakref.WeakKeyDictionary()
+        # توکن‌های تغییرکرده از pass قبلی
+        self._pending = set()
+        # دور نیمه‌تمام: [لیست (weakref ویجت، توکن‌ها)، موقعیت]
+        self._sweep = None
+        self._trigger = Clock.create_trigger(self.apply_pass)
+        theme.fbind("on_tokens_changed", self._on_tokens_changed)
+
+        self.frame_budget = None
+        self.skip_offscreen = False
+        self._saved_budget = None
+        self._restore_budget = False
+
+        self.passes = 0
+        self.last_pass_widgets = 0
+        self.last_pass_groups = 0
+        self.last_pass_skipped = 0
+        self.last_pass_deferred = 0
+        self.last_pass_time = 0.0
+        self.max_pass_time = 0.0
+
+    def __len__(self):
+        return len(self._members)
+
+    # -------------------------
+    # ثبت ویجت‌ها
+    # -------------------------
+    def register(self, widget, tokens):
+        """ ثبت (یا جابه‌جایی) ویجت در گروه توکن‌هایش """
+        key = (type(widget), tuple(sorted(set(tokens))))
+        current = self._members.get(widget)
+        if current == key:
+            return
+        if current is not None:
+            self._discard(widget, current)
+
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = weakref.WeakSet()
+            for token in key[1]:
+                self._token_groups.setdefault(token, set()).add(key)
+        group.add(widget)
+        self._members[widget] = key
+
+    def unregister(self, widget):
+        key = self._members.pop(widget, None)
+        if key is not None:
+            self._discard(widget, key)
+
+    def _discard(self, widget, key):
+        group = self._groups.get(key)
+        if group is None:
+            return
+        group.discard(widget)
+        if not group:
+            self._drop_group(key)
+
+    def _drop_group(self, key):
+        del self._groups[key]
+        for token in key[1]:
+            keys = self._token_groups.get(token)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._token_groups[token]
+
+    # -------------------------
+    # اعمال تغییرات
+    # -------------------------
+    def _on_tokens_changed(self, theme, changed):
+        self.invalidate(changed)
+
+    def invalidate(self, tokens):
+        """ اعمال دوباره‌ی این توکن‌ها روی ویجت‌های وابسته در pass بعدی """
+        self._pending.update(tokens)
+        self._trigger()
+
+    def begin_transition(self, frame_budget = None):
+        """ در حین transition: بودجه‌ی زمانی هر فریم و رد شدن از ویجت‌های خارج از صفحه """
+        if not self.skip_offscreen and not self._restore_budget:
+            self._saved_budget = self.frame_budget
+        self._restore_budget = False
+        self.frame_budget = frame_budget or None
+        self.skip_offscreen = True
+
+    def end_transition(self):
+        """ pass های بعدی همه‌ی ویجت‌ها را (با همان بودجه) به رنگ نهایی می‌رسانند، سپس بودجه برمی‌گردد """
+        self.skip_offscreen = False
+        self._restore_budget = True
+        self._trigger()
+
+    def apply_pass(self, *args):
+        """ اعمال توکن‌های تغییرکرده روی همه‌ی ویجت‌های زنده‌ی وابسته (به‌طور خودکار یک‌بار در هر فریم) """
+        start = time.perf_counter()
+        keys = ()
+        if self._sweep is None:
+            changed, self._pending = self._pending, set()
+            if not changed:
+                self._finish_pass()
+                return
+            keys = set()
+            token_groups = self._token_groups
+            for token in changed:
+                keys.update(token_groups.get(token, ()))
+
+            if self.frame_budget is None and not self.skip_offscreen:
+                # مسیر سریع: اعمال مستقیم همه
+                widgets = 0
+                for key in keys:
+                    group = self._groups.get(key)
+                    if group is None:
+                        continue
+                    for widget in list(group):
+                        widget.apply_theme(changed = changed)
+                        widgets += 1
+                    if not group:
+                        self._drop_group(key)
+                self._record(start, widgets, len(keys), 0, 0)
+                self._finish_pass()
+                return
+
+            items = []
+            ref = weakref.ref
+            for key in keys:
+                group = self._groups.get(key)
+                if group is None:
+                    continue
+                group_changed = frozenset(changed.intersection(key[1]))
+                items.extend((ref(widget), group_changed) for widget in group)
+                if not group:
+                    self._drop_group(key)
+            self._sweep = [items, 0]
+
+        items, position = self._sweep
+        deadline = start + self.frame_budget if self.frame_budget is not None else None
+        skip_offscreen = self.skip_offscreen
+        check_every = self.BUDGET_CHECK_EVERY
+        widgets = skipped = 0
+        count = len(items)
+        while position < count:
+            widget_ref, tokens = items[position]
+            position += 1
+            widget = widget_ref()
+            if widget is None:
+                continue
+            if skip_offscreen and not is_on_screen(widget):
+                skipped += 1
+                continue
+            widget.apply_theme(changed = tokens)
+            widgets += 1
+            if deadline is not None and not widgets % check_every and time.perf_counter() > deadline:
+                break
+
+        if position < count:
+            # ادامه در فریم بعد
+            self._sweep[1] = position
+            self._trigger()
+        else:
+            self._sweep = None
+            if self._pending:
+                self._trigger()
+        self._record(start, widgets, len(keys), skipped, count - position)
+        self._finish_pass()
+
+    def _finish_pass(self):
+        if self._restore_budget and self._sweep is None and not self._pending:
+            self.frame_budget = self._saved_budget
+            self._restore_budget = False
+
+    def _record(self, start, widgets, groups, skipped, deferred):
+        self.last_pass_time = time.perf_counter() - start
+        self.max_pass_time = max(self.max_pass_time, self.last_pass_time)
+        self.last_pass_widgets = widgets
+        self.last_pass_groups = groups
+        self.last_pass_skipped = skipped
+        self.last_pass_deferred = deferred
+        self.passes += 1
+
+    def stats(self):
+        return {
+            "widgets": len(self._members),
+            "groups": len(self._groups),
+            "passes": self.passes,
+            "last_pass_widgets": self.last_pass_widgets,
+            "last_pass_groups": self.last_pass_groups,
+            "last_pass_skipped": self.last_pass_skipped,
+            "last_pass_deferred": self.last_pass_deferred,
+            "last_pass_time": self.last_pass_time,
+            "max_pass_time": self.max_pass_time,
+        }
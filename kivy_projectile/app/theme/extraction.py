@@ -0,0 +1,297 @@
+# theme/extraction.py
+"""
+استخراج رنگ‌های منبع (seed) از تصویر، مثل Material You:
+    seeds = extract_seed_colors("wallpaper.jpg")            # ["#4B6CB7", ...] به ترتیب امتیاز
+    seed_extractor.extract_async(path, callback)           # در thread کارگر با کش بر اساس hash تصویر
+
+مراحل: کوچک‌سازی تصویر، هیستوگرام 15 بیتی، k-means وزن‌دار در فضای Lab (NumPy)،
+و امتیازدهی HCT (سهم hue های نزدیک + chroma) با انتخاب رنگ‌های دارای فاصله‌ی hue کافی.
+NumPy لازم است؛ Pillow فقط برای باز کردن فایل تصویر (هر دو: pip install kivy_projectile[theme]).
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from kivy.clock import Clock
+
+from . import hct
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from PIL import Image as PILImage
+except ImportError:
+    PILImage = None
+
+
+# -------------------------
+# ثابت‌ها
+# -------------------------
+# حداکثر پیکسل پس از کوچک‌سازی
+MAX_PIXELS = 128 * 128
+# تعداد خوشه‌های quantizer
+MAX_COLORS = 128
+KMEANS_ITERATIONS = 10
+
+# امتیازدهی (مقادیر Material Color Utilities)
+TARGET_CHROMA = 48.0
+WEIGHT_PROPORTION = 0.7
+WEIGHT_CHROMA_ABOVE = 0.3
+WEIGHT_CHROMA_BELOW = 0.1
+CUTOFF_CHROMA = 5.0
+CUTOFF_EXCITED_PROPORTION = 0.01
+
+# وقتی هیچ رنگ مناسبی پیدا نشود
+FALLBACK_SEED = "#4285F4"
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("Seed color extraction requires numpy; install kivy_projectile[theme]")
+
+
+def _is_file(image):
+    return isinstance(image, (str, bytes, os.PathLike))
+
+
+def require_support(image):
+    """ خطای ImportError روشن (با نام extra) اگر وابستگی‌های لازم برای این تصویر نصب نباشند """
+    _require_numpy()
+    if PILImage is None and _is_file(image):
+        raise ImportError("Loading image files requires Pillow; install kivy_projectile[theme]")
+
+
+# -------------------------
+# خواندن و کوچک‌سازی
+# -------------------------
+def load_pixels(image, max_pixels = MAX_PIXELS):
+    """
+    تصویر (مسیر فایل، bytes، PIL.Image یا آرایه‌ی H×W×3/4) -> آرایه‌ی N×3 uint8 از پیکسل‌های مات
+    """
+    require_support(image)
+    if _is_file(image) or (PILImage is not None and isinstance(image, PILImage.Image)):
+        if isinstance(image, bytes):
+            from io import BytesIO
+            image = BytesIO(image)
+        picture = image if isinstance(image, PILImage.Image) else PILImage.open(image)
+        side = int(max_pixels ** 0.5)
+        # draft برای JPEG رمزگشایی را از همان ابتدا در اندازه‌ی کوچک‌تر انجام می‌دهد
+        picture.draft("RGB", (side, side))
+        picture = picture.convert("RGBA")
+        picture.thumbnail((side, side))
+        array = np.asarray(picture)
+    else:
+        array = np.asarray(image)
+        if array.ndim != 3 or array.shape[2] not in (3, 4):
+            raise ValueError("Image array must have shape (height, width, 3|4)")
+        step = int(np.ceil((array.shape[0] * array.shape[1] / max_pixels) ** 0.5))
+        if step > 1:
+            array = array[::step, ::step]
+
+    pixels = array.reshape(-1, array.shape[2])
+    if pixels.dtype != np.uint8:
+        pixels = np.clip(pixels, 0, 255).astype(np.uint8)
+    if pixels.shape[1] == 4:
+        pixels = pixels[pixels[:, 3] == 255]
+    return np.ascontiguousarray(pixels[:, :3])
+
+
+def image_key(image):
+    """ کلید کش: hash محتوای فایل یا پیکسل‌های آرایه """
+    digest = hashlib.sha1()
+    if isinstance(image, (str, os.PathLike)):
+        with open(image, "rb") as fp:
+            for chunk in iter(lambda: fp.read(1 << 20), b""):
+                digest.update(chunk)
+    elif isinstance(image, bytes):
+        digest.update(image)
+    elif PILImage is not None and isinstance(image, PILImage.Image):
+        digest.update(repr((image.mode, image.size)).encode())
+        digest.update(image.tobytes())
+    else:
+        array = np.ascontiguousarray(image)
+        digest.update(repr((array.dtype.str, array.shape)).encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+# -------------------------
+# quantizer
+# -------------------------
+def _lab_from_rgb(rgb):
+    linear = hct._LINEAR_LUT[rgb.astype(np.intp)] / 100.0
+    xyz = linear @ np.array(hct.SRGB_TO_XYZ).T / (np.array(hct.WHITE_POINT_D65) / 100.0)
+    f = np.where(xyz > hct._EPSILON, np.cbrt(xyz), (hct._KAPPA * xyz + 16.0) / 116.0)
+    return np.stack((116.0 * f[:, 1] - 16.0, 500.0 * (f[:, 0] - f[:, 1]), 200.0 * (f[:, 1] - f[:, 2])), axis = 1)
+
+
+def quantize(pixels, max_colors = MAX_COLORS, iterations = KMEANS_ITERATIONS):
+    """
+    پیکسل‌های N×3 -> (رنگ‌های K×3 uint8، جمعیت هر رنگ)
+    ابتدا هیستوگرام 5 بیتی هر کانال، سپس k-means وزن‌دار در Lab روی خانه‌های هیستوگرام.
+    """
+    _require_numpy()
+    if not len(pixels):
+        return np.zeros((0, 3), dtype = np.uint8), np.zeros(0, dtype = np.int64)
+
+    pixels = pixels.astype(np.int64)
+    bins = (pixels[:, 0] >> 3) << 10 | (pixels[:, 1] >> 3) << 5 | (pixels[:, 2] >> 3)
+    counts = np.bincount(bins, minlength = 1 << 15)
+    used = np.flatnonzero(counts)
+    weights = counts[used].astype(float)
+    # میانگین رنگ واقعی پیکسل‌های هر خانه
+    colors = np.stack([np.bincount(bins, pixels[:, channel], minlength = 1 << 15)[used] for channel in range(3)], axis = 1)
+    colors = colors / weights[:, None]
+    points = _lab_from_rgb(np.rint(colors))
+
+    count = min(max_colors, len(points))
+    # شروع قطعی: پرجمعیت‌ترین خانه‌ها
+    centers = points[np.argsort(-weights, kind = "stable")[:count]].copy()
+    assignment = np.zeros(len(points), dtype = np.intp)
+    for iteration in range(iterations):
+        distances = (
+            (points * points).sum(axis = 1)[:, None]
+            - 2.0 * points @ centers.T
+            + (centers * centers).sum(axis = 1)[None, :]
+        )
+        new_assignment = distances.argmin(axis = 1)
+        if iteration and np.array_equal(new_assignment, assignment):
+            break
+        assignment = new_assignment
+        totals = np.bincount(assignment, weights, minlength = count)
+        occupied = totals > 0
+        for axis in range(3):
+            sums = np.bincount(assignment, weights * points[:, axis], minlength = count)
+            centers[occupied, axis] = sums[occupied] / totals[occupied]
+
+    populations = np.bincount(assignment, weights, minlength = count)
+    occupied = populations > 0
+    rgb_sums = np.stack([np.bincount(assignment, weights * colors[:, axis], minlength = count) for axis in range(3)], axis = 1)
+    result = np.rint(rgb_sums[occupied] / populations[occupied, None]).astype(np.uint8)
+    return result, populations[occupied].astype(np.int64)
+
+
+# -------------------------
+# امتیازدهی
+# -------------------------
+def score_colors(colors, populations, desired = 4, fallback = FALLBACK_SEED):
+    """ رنگ‌های کوانتیزه‌شده -> hex رنگ‌های منبع به ترتیب امتیاز با فاصله‌ی hue کافی """
+    _require_numpy()
+    if not len(colors):
+        return [fallback] if fallback else []
+    hcts = hct.hct_from_rgb_array(colors)
+    hues = np.mod(np.rint(hcts[:, 0]).astype(np.intp), 360)
+    chromas = hcts[:, 1]
+    proportions = populations / populations.sum()
+
+    # سهم هر hue از رنگ‌های با hue نزدیک (−14..+15 درجه)
+    excited = np.zeros(360)
+    offsets = np.arange(-14, 16)
+    np.add.at(excited, np.mod(hues[:, None] + offsets[None, :], 360).ravel(), np.repeat(proportions, len(offsets)))
+
+    proportion = excited[hues]
+    keep = (chromas >= CUTOFF_CHROMA) & (proportion > CUTOFF_EXCITED_PROPORTION)
+    scores = proportion * 100.0 * WEIGHT_PROPORTION + (chromas - TARGET_CHROMA) * np.where(
+        chromas < TARGET_CHROMA, WEIGHT_CHROMA_BELOW, WEIGHT_CHROMA_ABOVE
+    )
+    order = np.array([index for index in np.argsort(-scores, kind = "stable") if keep[index]], dtype = np.intp)
+
+    # فاصله‌ی hue بین همه‌ی نامزدها یک‌بار حساب می‌شود
+    ordered_hues = hcts[order, 0]
+    distances = (180.0 - np.abs(np.abs(ordered_hues[:, None] - ordered_hues[None, :]) - 180.0)).tolist()
+    chosen = []
+    for difference in range(90, 14, -1):
+        chosen = []
+        for position, row in enumerate(distances):
+            if all(row[other] >= difference for other in chosen):
+                chosen.append(position)
+                if len(chosen) >= desired:
+                    break
+        if len(chosen) >= desired:
+            break
+
+    seeds = [hct.rgb_to_hex(*colors[order[position]].tolist()) for position in chosen]
+    if not seeds and fallback:
+        seeds.append(fallback)
+    return seeds
+
+
+def extract_seed_colors(image, count = 4, max_pixels = MAX_PIXELS, max_colors = MAX_COLORS):
+    """ تصویر -> لیست hex رنگ‌های منبع به ترتیب امتیاز (اولی بهترین) """
+    colors, populations = quantize(load_pixels(image, max_pixels), max_colors)
+    return score_colors(colors, populations, count)
+
+
+# -------------------------
+# اجرا در پس‌زمینه
+# -------------------------
+class SeedExtractor:
+    """
+    استخراج در یک thread کارگر با کش LRU بر اساس hash تصویر:
+        seed_extractor.extract_async("wallpaper.jpg", lambda seeds: theme.apply_seed(seeds[0]))
+    callback(seeds یا exception) روی main thread صدا زده می‌شود.
+    """
+
+    def __init__(self, cache_size = 32, count = 4):
+        self.cache_size = cache_size
+        self.count = count
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None
+
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, key):
+        with self._lock:
+            seeds = self._cache.get(key)
+            if seeds is None:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return list(seeds)
+
+    def _remember(self, key, seeds):
+        with self._lock:
+            self._cache[key] = tuple(seeds)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last = False)
+
+    def extract(self, image):
+        """ استخراج همزمان (در همین thread) با استفاده از کش """
+        key = image_key(image)
+        seeds = self._cached(key)
+        if seeds is None:
+            seeds = extract_seed_colors(image, self.count)
+            self._remember(key, seeds)
+        return seeds
+
+    def extract_async(self, image, callback):
+        """ استخراج در thread کارگر؛ Future برمی‌گرداند """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers = 1, thread_name_prefix = "SeedExtractor")
+        future = self._executor.submit(self.extract, image)
+
+        def done(future):
+            error = future.exception()
+            result = error if error is not None else future.result()
+            Clock.schedule_once(lambda dt: callback(result))
+
+        future.add_done_callback(done)
+        return future
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait = False)
+            self._executor = None
+
+
+# singleton
+seed_extractor = SeedExtractor()
@@ -0,0 +1,465 @@
+# theme/hct.py
+"""
+موتور رنگ HCT (hue / chroma / tone) بر پایه‌ی CAM16 و L* مثل Material Color Utilities.
+- مسیر اسکالر دقیق با math (بدون وابستگی)
+- مسیر برداری با NumPy برای حل هم‌زمان تعداد زیادی (hue, chroma, tone) و پالت چند رنگ منبع
+رنگ‌ها 8 بیتی (0..255) هستند.
+"""
+import math
+
+try:
+    import numpy as np
+except ImportError:  # numpy اختیاری است؛ مسیر اسکالر همیشه در دسترس است
+    np = None
+
+
+# -------------------------
+# ثابت‌ها
+# -------------------------
+WHITE_POINT_D65 = (95.047, 100.0, 108.883)
+
+SRGB_TO_XYZ = (
+    (0.41233895, 0.35762064, 0.18051042),
+    (0.2126, 0.7152, 0.0722),
+    (0.01932141, 0.11916382, 0.95034478),
+)
+
+XYZ_TO_SRGB = (
+    (3.2413774792388685, -1.5376652402851851, -0.49885366846268053),
+    (-0.9691452513005321, 1.8758853451067872, 0.04156585616912061),
+    (0.05562093689691305, -0.20395524564742123, 1.0571799111220335),
+)
+
+# XYZ -> پاسخ مخروط‌ها (CAM16)
+M16 = (
+    (0.401288, 0.650173, -0.051461),
+    (-0.250268, 1.204414, 0.045854),
+    (-0.002079, 0.048952, 0.953127),
+)
+
+# سهم هر کانال خطی در Y
+Y_FROM_LINRGB = (0.2126, 0.7152, 0.0722)
+
+_EPSILON = 216.0 / 24389.0
+_KAPPA = 24389.0 / 27.0
+
+# کاهش chroma برای رنگ‌های خارج از گاموت: حداکثر گام‌ها و دقت کافی برای خروجی 8 بیتی
+BISECT_STEPS = 16
+CHROMA_TOLERANCE = 0.25
+
+# وضوح LUT تون -> Y
+TONE_LUT_STEPS = 1000
+
+# زیر این تعداد (رنگ × تون) سربار NumPy از حلقه‌ی اسکالر بیشتر است
+VECTOR_THRESHOLD = 128
+
+
+def _matmul(m, v):
+    return (
+        m[0][0] * v[0] + m[0][1] * v[1] + m[0][2] * v[2],
+        m[1][0] * v[0] + m[1][1] * v[1] + m[1][2] * v[2],
+        m[2][0] * v[0] + m[2][1] * v[1] + m[2][2] * v[2],
+    )
+
+
+def _matmat(a, b):
+    return tuple(
+        tuple(sum(a[i][k] * b[k][j] for k in range(3)) for j in range(3))
+        for i in range(3)
+    )
+
+
+def _invert(m):
+    (a, b, c), (d, e, f), (g, h, i) = m
+    det = a * (e * i - f * h) - b * (d * i - f * g) + c * (d * h - e * g)
+    return (
+        ((e * i - f * h) / det, (c * h - b * i) / det, (b * f - c * e) / det),
+        ((f * g - d * i) / det, (a * i - c * g) / det, (c * d - a * f) / det),
+        ((d * h - e * g) / det, (b * g - a * h) / det, (a * e - b * d) / det),
+    )
+
+
+# -------------------------
+# L* و Y
+# -------------------------
+def y_from_lstar(lstar):
+    """ تون (L*) -> Y در بازه‌ی 0..100 """
+    ft = (lstar + 16.0) / 116.0
+    ft3 = ft * ft * ft
+    return 100.0 * (ft3 if ft3 > _EPSILON else (116.0 * ft - 16.0) / _KAPPA)
+
+
+def lstar_from_y(y):
+    t = y / 100.0
+    f = t ** (1.0 / 3.0) if t > _EPSILON else (_KAPPA * t + 16.0) / 116.0
+    return 116.0 * f - 16.0
+
+
+def _linearize(channel):
+    normalized = channel / 255.0
+    if normalized <= 0.040449936:
+        return normalized / 12.92 * 100.0
+    return ((normalized + 0.055) / 1.055) ** 2.4 * 100.0
+
+
+# LUT کانال 8 بیتی -> مقدار خطی 0..100 (دقیق، چون ورودی فقط 256 حالت دارد)
+LINEAR_LUT = tuple(_linearize(channel) for channel in range(256))
+
+
+def delinearize(linear):
+    """ مقدار خطی 0..100 -> کانال 8 بیتی """
+    normalized = linear / 100.0
+    if normalized <= 0.0031308:
+        delinearized = normalized * 12.92
+    else:
+        delinearized = 1.055 * normalized ** (1.0 / 2.4) - 0.055
+    return min(max(int(round(delinearized * 255.0)), 0), 255)
+
+
+# -------------------------
+# شرایط دید پیش‌فرض (sRGB، پس‌زمینه L* = 50)
+# -------------------------
+class ViewingConditions:
+
+    def __init__(self, white_point = WHITE_POINT_D65, adapting_luminance = None,
+                 background_lstar = 50.0, surround = 2.0, discounting_illuminant = False):
+        if adapting_luminance is None:
+            adapting_luminance = (200.0 / math.pi) * y_from_lstar(50.0) / 100.0
+        background_lstar = max(0.1, background_lstar)
+
+        rgb_w = _matmul(M16, white_point)
+        f = 0.8 + surround / 10.0
+        if f >= 0.9:
+            c = 0.59 + (0.69 - 0.59) * ((f - 0.9) * 10.0)
+        else:
+            c = 0.525 + (0.59 - 0.525) * ((f - 0.8) * 10.0)
+        if discounting_illuminant:
+            d = 1.0
+        else:
+            d = f * (1.0 - (1.0 / 3.6) * math.exp((-adapting_luminance - 42.0) / 92.0))
+        d = min(max(d, 0.0), 1.0)
+        rgb_d = tuple(d * (100.0 / w) + 1.0 - d for w in rgb_w)
+
+        k = 1.0 / (5.0 * adapting_luminance + 1.0)
+        k4 = k ** 4
+        k4f = 1.0 - k4
+        fl = k4 * adapting_luminance + 0.1 * k4f * k4f * (5.0 * adapting_luminance) ** (1.0 / 3.0)
+        n = y_from_lstar(background_lstar) / white_point[1]
+        z = 1.48 + math.sqrt(n)
+        nbb = 0.725 / n ** 0.2
+
+        rgb_a = []
+        for channel_d, channel_w in zip(rgb_d, rgb_w):
+            factor = (fl * channel_d * channel_w / 100.0) ** 0.42
+            rgb_a.append(400.0 * factor / (factor + 27.13))
+        aw = (2.0 * rgb_a[0] + rgb_a[1] + 0.05 * rgb_a[2]) * nbb
+
+        self.n = n
+        self.aw = aw
+        self.nbb = nbb
+        self.ncb = nbb
+        self.c = c
+        self.nc = f
+        self.rgb_d = rgb_d
+        self.fl = fl
+        self.z = z
+
+        # ضریب‌های ثابت برای حل معکوس
+        self.t_inner_coeff = 1.0 / (1.64 - 0.29 ** n) ** 0.73
+        self.j_exponent = 1.0 / c / z
+        # پاسخ مخروط‌های مقیاس‌شده -> RGB خطی (0..100)
+        scale = tuple((100.0 / fl) / channel_d for channel_d in rgb_d)
+        to_xyz = _invert(M16)
+        to_xyz = tuple(tuple(to_xyz[i][j] * scale[j] for j in range(3)) for i in range(3))
+        self.linrgb_from_scaled = _matmat(XYZ_TO_SRGB, to_xyz)
+        # RGB خطی -> پاسخ مخروط‌های تطبیق‌یافته
+        cone = _matmat(M16, SRGB_TO_XYZ)
+        self.scaled_from_linrgb = tuple(tuple(cone[i][j] * rgb_d[i] for j in range(3)) for i in range(3))
+
+
+DEFAULT_VIEWING_CONDITIONS = ViewingConditions()
+
+
+# -------------------------
+# مسیر اسکالر
+# -------------------------
+def _hue_chroma(r_a, g_a, b_a, vc):
+    """ (hue درجه، chroma، J) از پاسخ‌های تطبیق‌یافته """
+    a = (11.0 * r_a + -12.0 * g_a + b_a) / 11.0
+    b = (r_a + g_a - 2.0 * b_a) / 9.0
+    u = (20.0 * r_a + 20.0 * g_a + 21.0 * b_a) / 20.0
+    p2 = (40.0 * r_a + 20.0 * g_a + b_a) / 20.0
+    hue = math.degrees(math.atan2(b, a)) % 360.0
+    ac = p2 * vc.nbb
+    j = 100.0 * (ac / vc.aw) ** (vc.c * vc.z)
+    hue_prime = hue + 360.0 if hue < 20.14 else hue
+    e_hue = 0.25 * (math.cos(math.radians(hue_prime) + 2.0) + 3.8)
+    p1 = 50000.0 / 13.0 * e_hue * vc.nc * vc.ncb
+    t = p1 * math.hypot(a, b) / (u + 0.305)
+    alpha = t ** 0.9 * (1.64 - 0.29 ** vc.n) ** 0.73
+    return hue, alpha * math.sqrt(j / 100.0), j
+
+
+def _adapt(component, fl):
+    factor = (fl * abs(component) / 100.0) ** 0.42
+    return math.copysign(400.0 * factor / (factor + 27.13), component)
+
+
+def hct_from_rgb(r, g, b, vc = DEFAULT_VIEWING_CONDITIONS):
+    """ رنگ 8 بیتی -> (hue, chroma, tone) """
+    linear = (LINEAR_LUT[r], LINEAR_LUT[g], LINEAR_LUT[b])
+    scaled = _matmul(vc.scaled_from_linrgb, linear)
+    r_a, g_a, b_a = (_adapt(component, vc.fl) for component in scaled)
+    hue, chroma, _ = _hue_chroma(r_a, g_a, b_a, vc)
+    y = sum(k * c for k, c in zip(Y_FROM_LINRGB, linear))
+    return hue, chroma, lstar_from_y(y)
+
+
+def _inverse_adapt(adapted):
+    adapted_abs = abs(adapted)
+    base = max(0.0, 27.13 * adapted_abs / (400.0 - adapted_abs))
+    return math.copysign(base ** (1.0 / 0.42), adapted)
+
+
+def _solve_by_j(hue_radians, chroma, y, vc):
+    """ RGB خطی با hue و chroma داده‌شده و Y هدف؛ None اگر در گاموت sRGB نباشد """
+    j = math.sqrt(y) * 11.0
+    e_hue = 0.25 * (math.cos(hue_radians + 2.0) + 3.8)
+    p1 = e_hue * (50000.0 / 13.0) * vc.nc * vc.ncb
+    h_sin = math.sin(hue_radians)
+    h_cos = math.cos(hue_radians)
+    matrix = vc.linrgb_from_scaled
+    for iteration in range(5):
+        j_normalized = j / 100.0
+        alpha = 0.0 if chroma == 0.0 or j == 0.0 else chroma / math.sqrt(j_normalized)
+        t = (alpha * vc.t_inner_coeff) ** (1.0 / 0.9)
+        ac = vc.aw * j_normalized ** vc.j_exponent
+        p2 = ac / vc.nbb
+        gamma = 23.0 * (p2 + 0.305) * t / (23.0 * p1 + 11.0 * t * h_cos + 108.0 * t * h_sin)
+        a = gamma * h_cos
+        b = gamma * h_sin
+        r_a = (460.0 * p2 + 451.0 * a + 288.0 * b) / 1403.0
+        g_a = (460.0 * p2 - 891.0 * a - 261.0 * b) / 1403.0
+        b_a = (460.0 * p2 - 220.0 * a - 6300.0 * b) / 1403.0
+        linear = _matmul(matrix, (_inverse_adapt(r_a), _inverse_adapt(g_a), _inverse_adapt(b_a)))
+        if min(linear) < 0.0:
+            return None
+        fnj = Y_FROM_LINRGB[0] * linear[0] + Y_FROM_LINRGB[1] * linear[1] + Y_FROM_LINRGB[2] * linear[2]
+        if fnj <= 0.0:
+            return None
+        if iteration == 4 or abs(fnj - y) < 0.002:
+            if max(linear) > 100.01:
+                return None
+            return linear
+        # گام نیوتن روی J
+        j = j - (fnj - y) * j / (2.0 * fnj)
+    return None
+
+
+def solve_rgb(hue, chroma, tone, vc = DEFAULT_VIEWING_CONDITIONS):
+    """
+    (hue, chroma, tone) -> رنگ 8 بیتی (r, g, b).
+    اگر chroma در این hue و tone در گاموت نباشد، بیشترین chroma ممکن استفاده می‌شود.
+    """
+    y = y_from_lstar(tone)
+    if chroma < 0.0001 or tone < 0.0001 or tone > 99.9999:
+        gray = delinearize(y)
+        return gray, gray, gray
+    hue_radians = math.radians(hue % 360.0)
+    linear = _solve_by_j(hue_radians, chroma, y, vc)
+    if linear is None:
+        low, high = 0.0, chroma
+        linear = (y, y, y)
+        for _ in range(BISECT_STEPS):
+            if high - low <= CHROMA_TOLERANCE:
+                break
+            middle = (low + high) / 2.0
+            candidate = _solve_by_j(hue_radians, middle, y, vc)
+            if candidate is None:
+                high = middle
+            else:
+                low = middle
+                linear = candidate
+    return tuple(delinearize(component) for component in linear)
+
+
+def rgb_to_hex(r, g, b):
+    return "#%02X%02X%02X" % (r, g, b)
+
+
+def hex_to_rgb8(hex_color):
+    hex_color = hex_color.lstrip("#")
+    if len(hex_color) == 3:
+        hex_color = "".join(c * 2 for c in hex_color)
+    return int(hex_color[0:2], 16), int(hex_color[2:4], 16), int(hex_color[4:6], 16)
+
+
+# -------------------------
+# مسیر برداری (NumPy)
+# -------------------------
+if np is not None:
+    _LINEAR_LUT = np.array(LINEAR_LUT)
+    _TONE_GRID = np.linspace(0.0, 100.0, TONE_LUT_STEPS + 1)
+    # LUT تون -> Y؛ بین نقاط به‌صورت خطی درون‌یابی می‌شود
+    _Y_LUT = np.array([y_from_lstar(tone) for tone in _TONE_GRID])
+    _Y_COEFFS = np.array(Y_FROM_LINRGB)
+
+
+def _y_from_lstar_array(tones):
+    return np.interp(tones, _TONE_GRID, _Y_LUT)
+
+
+def _delinearize_array(linear):
+    normalized = np.clip(linear / 100.0, 0.0, None)
+    delinearized = np.where(
+        normalized <= 0.0031308,
+        normalized * 12.92,
+        1.055 * normalized ** (1.0 / 2.4) - 0.055,
+    )
+    return np.clip(np.rint(delinearized * 255.0), 0, 255).astype(np.uint8)
+
+
+def _inverse_adapt_array(adapted):
+    adapted_abs = np.abs(adapted)
+    base = np.maximum(0.0, 27.13 * adapted_abs / (400.0 - adapted_abs))
+    return np.sign(adapted) * base ** (1.0 / 0.42)
+
+
+def _solve_by_j_array(hue_radians, chroma, y, vc):
+    """ نسخه‌ی برداری _solve_by_j؛ (ok، RGB خطی N×3) """
+    count = len(y)
+    j = np.sqrt(y) * 11.0
+    e_hue = 0.25 * (np.cos(hue_radians + 2.0) + 3.8)
+    p1 = e_hue * (50000.0 / 13.0) * vc.nc * vc.ncb
+    h_sin = np.sin(hue_radians)
+    h_cos = np.cos(hue_radians)
+    matrix = np.array(vc.linrgb_from_scaled).T
+
+    ok = np.zeros(count, dtype = bool)
+    active = np.ones(count, dtype = bool)
+    result = np.zeros((count, 3))
+    for iteration in range(5):
+        j_normalized = j / 100.0
+        alpha = np.where((chroma == 0.0) | (j == 0.0), 0.0, chroma / np.sqrt(j_normalized))
+        t = (alpha * vc.t_inner_coeff) ** (1.0 / 0.9)
+        ac = vc.aw * j_normalized ** vc.j_exponent
+        p2 = ac / vc.nbb
+        gamma = 23.0 * (p2 + 0.305) * t / (23.0 * p1 + 11.0 * t * h_cos + 108.0 * t * h_sin)
+        a = gamma * h_cos
+        b = gamma * h_sin
+        scaled = np.stack((
+            _inverse_adapt_array((460.0 * p2 + 451.0 * a + 288.0 * b) / 1403.0),
+            _inverse_adapt_array((460.0 * p2 - 891.0 * a - 261.0 * b) / 1403.0),
+            _inverse_adapt_array((460.0 * p2 - 220.0 * a - 6300.0 * b) / 1403.0),
+        ), axis = 1)
+        linear = scaled @ matrix
+        fnj = linear @ _Y_COEFFS
+
+        active &= ~((linear.min(axis = 1) < 0.0) | (fnj <= 0.0))
+        finished = active & ((np.abs(fnj - y) < 0.002) | (iteration == 4))
+        good = finished & (linear.max(axis = 1) <= 100.01)
+        ok |= good
+        result[good] = linear[good]
+        active &= ~finished
+        if not active.any():
+            break
+        j = np.where(active, j - (fnj - y) * j / (2.0 * fnj), j)
+    return ok, result
+
+
+def solve_rgb_array(hues, chromas, tones, vc = DEFAULT_VIEWING_CONDITIONS):
+    """
+    نسخه‌ی برداری solve_rgb: آرایه‌های hue / chroma / tone (قابل broadcast) -> آرایه‌ی uint8 به شکل (..., 3)
+    """
+    if np is None:
+        raise RuntimeError("solve_rgb_array requires numpy")
+    hues, chromas, tones = np.broadcast_arrays(
+        np.asarray(hues, dtype = float), np.asarray(chromas, dtype = float), np.asarray(tones, dtype = float)
+    )
+    shape = hues.shape
+    hues = np.radians(np.mod(hues.ravel(), 360.0))
+    chromas = chromas.ravel()
+    tones = tones.ravel()
+
+    with np.errstate(all = "ignore"):
+        y = _y_from_lstar_array(tones)
+        # خاکستری با همان Y پیش‌فرض است
+        linear = np.repeat(y[:, None], 3, axis = 1)
+        solvable = (chromas >= 0.0001) & (tones >= 0.0001) & (tones <= 99.9999)
+        index = np.flatnonzero(solvable)
+        if len(index):
+            ok, result = _solve_by_j_array(hues[index], chromas[index], y[index], vc)
+            linear[index[ok]] = result[ok]
+
+            # خارج از گاموت: کاهش هم‌زمان chroma همه با دونیم‌سازی
+            index = index[~ok]
+            if len(index):
+                low = np.zeros(len(index))
+                high = chromas[index]
+                for _ in range(BISECT_STEPS):
+                    # فقط آن‌هایی که هنوز به دقت کافی نرسیده‌اند
+                    narrowing = high - low > CHROMA_TOLERANCE
+                    if not narrowing.any():
+                        break
+                    index, low, high = index[narrowing], low[narrowing], high[narrowing]
+                    middle = (low + high) / 2.0
+                    ok, result = _solve_by_j_array(hues[index], middle, y[index], vc)
+                    low = np.where(ok, middle, low)
+                    high = np.where(ok, high, middle)
+                    linear[index[ok]] = result[ok]
+
+    return _delinearize_array(linear).reshape(shape + (3,))
+
+
+def hct_from_rgb_array(rgb, vc = DEFAULT_VIEWING_CONDITIONS):
+    """ آرایه‌ی رنگ 8 بیتی (..., 3) -> آرایه‌ی (..., 3) از (hue, chroma, tone) """
+    if np is None:
+        raise RuntimeError("hct_from_rgb_array requires numpy")
+    rgb = np.asarray(rgb)
+    shape = rgb.shape[:-1]
+    linear = _LINEAR_LUT[rgb.reshape(-1, 3).astype(np.intp)]
+    scaled = linear @ np.array(vc.scaled_from_linrgb).T
+    factor = (vc.fl * np.abs(scaled) / 100.0) ** 0.42
+    adapted = np.sign(scaled) * 400.0 * factor / (factor + 27.13)
+    r_a, g_a, b_a = adapted[:, 0], adapted[:, 1], adapted[:, 2]
+
+    a = (11.0 * r_a - 12.0 * g_a + b_a) / 11.0
+    b = (r_a + g_a - 2.0 * b_a) / 9.0
+    u = (20.0 * r_a + 20.0 * g_a + 21.0 * b_a) / 20.0
+    p2 = (40.0 * r_a + 20.0 * g_a + b_a) / 20.0
+    hue = np.mod(np.degrees(np.arctan2(b, a)), 360.0)
+    j = 100.0 * (p2 * vc.nbb / vc.aw) ** (vc.c * vc.z)
+    hue_prime = np.where(hue < 20.14, hue + 360.0, hue)
+    e_hue = 0.25 * (np.cos(np.radians(hue_prime) + 2.0) + 3.8)
+    p1 = 50000.0 / 13.0 * e_hue * vc.nc * vc.ncb
+    t = p1 * np.hypot(a, b) / (u + 0.305)
+    chroma = t ** 0.9 * (1.64 - 0.29 ** vc.n) ** 0.73 * np.sqrt(j / 100.0)
+
+    y = linear @ _Y_COEFFS / 100.0
+    f = np.where(y > _EPSILON, np.cbrt(y), (_KAPPA * y + 16.0) / 116.0)
+    tone = 116.0 * f - 16.0
+    return np.stack((hue, chroma, tone), axis = 1).reshape(shape + (3,))
+
+
+# -------------------------
+# پالت‌ها
+# -------------------------
+def tonal_palettes(hex_colors, tones):
+    """
+    پالت تونال چند رنگ منبع با یک فراخوانی: لیستی از tuple های hex (هم‌ترتیب tones) برای هر رنگ.
+    با NumPy همه‌ی (رنگ × تون) ها یکجا حل می‌شوند؛ بدون آن (یا برای تعداد کم) مسیر اسکالر استفاده می‌شود.
+    """
+    hex_colors = list(hex_colors)
+    tones = list(tones)
+    if not hex_colors:
+        return []
+    if np is None or len(hex_colors) * len(tones) < VECTOR_THRESHOLD:
+        palettes = []
+        for hex_color in hex_colors:
+            hue, chroma, _ = hct_from_rgb(*hex_to_rgb8(hex_color))
+            palettes.append(tuple(rgb_to_hex(*solve_rgb(hue, chroma, tone)) for tone in tones))
+        return palettes
+
+    seeds = hct_from_rgb_array(np.array([hex_to_rgb8(hex_color) for hex_color in hex_colors]))
+    rgb = solve_rgb_array(seeds[:, 0:1], seeds[:, 1:2], np.array(tones, dtype = float)[None, :])
+    return [tuple(rgb_to_hex(*pixel) for pixel in row.tolist()) for row in rgb]
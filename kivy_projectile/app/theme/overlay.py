@@ -0,0 +1,199 @@
+# theme/overlay.py
+import weakref
+
+from .dispatcher import ThemeDispatcher
+from .theme import MODES, SOURCE_ROLES, ThemeResolveError, TokenSource, rgba_from_hex, roles_for_source
+
+
+def _weak_callback(method):
+    """ callback که فقط weakref به صاحب متد دارد؛ تا تم والد overlay را زنده نگه ندارد """
+    ref = weakref.WeakMethod(method)
+
+    def call(*args):
+        bound = ref()
+        if bound is not None:
+            return bound(*args)
+    return call
+
+
+def _unbind_all(parent, bindings):
+    for name, uid in bindings:
+        parent.unbind_uid(name, uid)
+
+
+class ThemeOverlay(TokenSource):
+    """
+    تم سبک برای یک زیردرخت ویجت‌ها که چند توکن یا رنگ منبع را عوض می‌کند و بقیه را از تم والد می‌گیرد:
+        screen.theme_overlay = ThemeOverlay(app.m3_theme, source_primary = "#006A6A",
+                                            tokens = {"surface": ("#FFFFFF", "#101010")})
+
+    - tokens: توکن -> hex یا (hex light، hex dark)
+    - source_*: فقط نقش‌های همان منبع از پالت (کش‌شده‌ی) آن ساخته می‌شوند
+    - توکن‌های دیگر از والد resolve و در همین overlay کش می‌شوند؛ فقط تغییر همان توکن‌ها در والد
+      (و نه توکن‌های override شده) این کش را باطل و ویجت‌های زیردرخت را به‌روز می‌کند
+    - mode و فریم‌های انتقال تدریجی والد دنبال می‌شوند؛ والد می‌تواند خودش overlay باشد
+    - والد فقط weakref به overlay دارد؛ overlay بی‌استفاده جمع‌آوری و اتصالش به والد خودکار قطع می‌شود
+    """
+
+    def __init__(self, parent, tokens = None, **sources):
+        super().__init__()
+        self.parent_theme = parent
+        self._resolved_mode = parent.mode
+        self.overrides = {}
+        self.source_overrides = {}
+        # حالت -> توکن‌های خود overlay (hex)
+        self._own = {mode: {} for mode in MODES}
+        for token, value in (tokens or {}).items():
+            self._set_override(token, value)
+        for source_name, hex_color in sources.items():
+            self._set_source(source_name, hex_color)
+
+        bindings = [
+            (name, parent.fbind(name, _weak_callback(callback)))
+            for name, callback in (
+                ("on_tokens_changed", self._on_parent_tokens),
+                ("on_rgba_changed", self._on_parent_rgba),
+            )
+        ]
+        self._detach = weakref.finalize(self, _unbind_all, parent, bindings)
+        self._resolve(set(parent.tokens) | self._own_tokens())
+        self.dispatcher = ThemeDispatcher(self)
+
+    @property
+    def mode(self):
+        return self.parent_theme.mode
+
+    @property
+    def transition(self):
+        return self.parent_theme.transition
+
+    @property
+    def transition_budget(self):
+        # بودجه‌ی تم ریشه (از میان overlay های تودرتو)
+        return self.parent_theme.transition_budget
+
+    def _own_tokens(self):
+        return set(self._own["light"]) | set(self._own["dark"])
+
+    def _own_table(self):
+        return self._own["dark" if self.mode == "dark" else "light"]
+
+    # -------------------------
+    # overrideها
+    # -------------------------
+    def _set_override(self, token, value):
+        light, dark = (value, value) if isinstance(value, str) else value
+        self.overrides[token] = (light, dark)
+        self._own["light"][token] = light
+        self._own["dark"][token] = dark
+
+    def _set_source(self, source_name, hex_color):
+        if source_name not in SOURCE_ROLES:
+            raise ThemeResolveError(f"Unknown source: {source_name}")
+        self.source_overrides[source_name] = hex_color
+        light, dark = roles_for_source(source_name, hex_color)
+        # override مستقیم توکن بر نقش ساخته‌شده از منبع اولویت دارد
+        for mode, roles in (("light", light), ("dark", dark)):
+            for token, value in roles.items():
+                if token not in self.overrides:
+                    self._own[mode][token] = value
+
+    def set_tokens(self, **tokens):
+        """ override چند توکن (hex یا (light، dark)) """
+        for token, value in tokens.items():
+            self._set_override(token, value)
+        self._resolve(set(tokens))
+
+    def set_sources(self, **sources):
+        changed = set()
+        for source_name, hex_color in sources.items():
+            self._set_source(source_name, hex_color)
+            changed.update(role for role, _, _ in SOURCE_ROLES[source_name])
+        self._resolve(changed)
+
+    def clear(self, *tokens):
+        """
+        برداشتن override توکن‌ها (بدون نام: همه) تا دوباره از والد resolve شوند؛
+        منبعی که یکی از نقش‌هایش در tokens باشد با همه‌ی نقش‌هایش برداشته می‌شود
+        """
+        tokens = set(tokens or self._own_tokens())
+        for token in tokens:
+            self.overrides.pop(token, None)
+        for source_name in list(self.source_overrides):
+            roles = {role for role, _, _ in SOURCE_ROLES[source_name]}
+            if roles & tokens:
+                del self.source_overrides[source_name]
+                tokens |= roles
+        self._own = {mode: {} for mode in MODES}
+        for token, value in list(self.overrides.items()):
+            self._set_override(token, value)
+        for source_name, hex_color in self.source_overrides.items():
+            self._set_source(source_name, hex_color)
+        self._resolve(tokens)
+
+    # -------------------------
+    # resolve و کش
+    # -------------------------
+    def _resolve(self, tokens):
+        """ resolve دوباره‌ی فقط این توکن‌ها (خودی یا از والد) و انتشار تغییرات """
+        parent = self.parent_theme
+        own = self._own_table()
+        resolved = dict(self.tokens)
+        rgba = dict(self.rgba)
+        changed = set()
+        for token in tokens:
+            if token in own:
+                value = own[token]
+                color = rgba_from_hex(value)
+            elif token in parent.tokens:
+                value = parent.tokens[token]
+                # در حین انتقال والد، rgba مقدار میانی را دارد
+                color = parent.rgba[token]
+            else:
+                if resolved.pop(token, None) is not None:
+                    rgba.pop(token, None)
+                    changed.add(token)
+                continue
+            if resolved.get(token) != value:
+                resolved[token] = value
+                changed.add(token)
+            if rgba.get(token) != color:
+                rgba[token] = color
+                changed.add(token)
+        if not changed:
+            return
+        self._set_rgba(rgba, changed)
+        self.tokens = resolved
+        self._notify(changed)
+
+    def _on_parent_tokens(self, parent, changed):
+        own = self._own_table()
+        relevant = {token for token in changed if token not in own}
+        if self._resolved_mode != self.mode:
+            # نقش‌های خود overlay هم به mode وابسته‌اند
+            self._resolved_mode = self.mode
+            relevant |= self._own_tokens()
+        if relevant:
+            self._resolve(relevant)
+
+    def _on_parent_rgba(self, parent, tokens):
+        own = self._own_table()
+        relevant = [token for token in tokens if token not in own and token in self.tokens]
+        if not relevant:
+            return
+        dispatcher = self.dispatcher
+        if parent.transition is not None:
+            if not dispatcher.skip_offscreen:
+                dispatcher.begin_transition(self.transition_budget)
+        elif dispatcher.skip_offscreen:
+            dispatcher.end_transition()
+        rgba = dict(self.rgba)
+        for token in relevant:
+            rgba[token] = parent.rgba[token]
+        self._set_rgba(rgba, relevant)
+        dispatcher.invalidate(relevant)
+        self.dispatch("on_rgba_changed", relevant)
+
+    def detach(self):
+        """ قطع اتصال از والد (وقتی زیردرخت دیگر استفاده نمی‌شود)؛ با جمع‌آوری overlay خودکار انجام می‌شود """
+        self._detach()
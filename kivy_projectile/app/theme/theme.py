@@ -1,9 +1,18 @@
 # theme/theme.py
+from collections import OrderedDict
+from functools import lru_cache, partial
+from types import MappingProxyType
+
 from kivy.event import EventDispatcher
-from kivy.properties import DictProperty, StringProperty
+from kivy.properties import DictProperty, NumericProperty, StringProperty
 from kivy.utils import get_color_from_hex
 from enum import Enum
-import colorsys
+import time
+
+from . import hct
+from .cache import theme_cache_key
+from .dispatcher import ThemeDispatcher
+from .transition import ThemeTransition
 
 
 class ThemeResolveError(KeyError):
@@ -37,7 +46,7 @@ class M3ColorTokens(str, Enum):
 
 
 # ================================
-# 🎨 توابع رنگی ساده (Hex ↔ RGB/HCT)
+# 🎨 توابع رنگی (Hex ↔ RGB/HCT)
 # ================================
 def hex_to_rgb(hex_color: str):
     hex_color = hex_color.lstrip("#")
@@ -53,32 +62,248 @@ def rgb_to_hex(rgb):
 
 
 def rgb_to_hct(rgb):
-    r, g, b = rgb
-    h, l, s = colorsys.rgb_to_hls(r, g, b)
-    max_val, min_val = max(rgb), min(rgb)
-    chroma = max_val - min_val
-    return h * 360, chroma * 100, l * 100
+    """ RGB (0..1) -> (hue, chroma, tone) واقعی HCT """
+    return hct.hct_from_rgb(*(min(max(int(round(c * 255)), 0), 255) for c in rgb))
 
 
 def hct_to_rgb(h, c, t):
-    l = t / 100.0
-    s = c / 100.0 if c > 0 else 0
-    h = h / 360.0
-    return colorsys.hls_to_rgb(h, l, s)
+    return tuple(channel / 255.0 for channel in hct.solve_rgb(h, c, t))
 
 
 def hct_to_hex(h, c, t):
-    return rgb_to_hex(hct_to_rgb(h, c, t))
+    return hct.rgb_to_hex(*hct.solve_rgb(h, c, t))
 
 
 def hex_to_hct(hex_color):
-    return rgb_to_hct(hex_to_rgb(hex_color))
+    return hct.hct_from_rgb(*hct.hex_to_rgb8(hex_color))
+
+
+# ================================
+# 🎨 پالت تونال (memoize شده)
+# ================================
+# تون‌های هر پالت
+PALETTE_TONES = (0, 6, 10, 20, 30, 40, 50, 60, 70, 80, 90, 95, 98, 100)
+
+# حداکثر تعداد پالت نگه‌داشته‌شده (رنگ‌های منبع متمایز، مثلاً هنگام کشیدن اسلایدر رنگ)
+PALETTE_CACHE_SIZE = 256
+
+# hex -> پالت، به ترتیب آخرین استفاده
+_palette_cache = OrderedDict()
+
+
+def tonal_palettes(hex_colors):
+    """
+    پالت تونال چند رنگ منبع؛ پالت‌های کش‌نشده با یک فراخوانی برداری (hct.tonal_palettes) ساخته می‌شوند.
+    هر پالت: تون (str) -> hex، فقط خواندنی.
+    """
+    hex_colors = list(hex_colors)
+    missing = [hex_color for hex_color in dict.fromkeys(hex_colors) if hex_color not in _palette_cache]
+    if missing:
+        for hex_color, palette in zip(missing, hct.tonal_palettes(missing, PALETTE_TONES)):
+            _palette_cache[hex_color] = MappingProxyType(dict(zip(map(str, PALETTE_TONES), palette)))
+    palettes = []
+    for hex_color in hex_colors:
+        _palette_cache.move_to_end(hex_color)
+        palettes.append(_palette_cache[hex_color])
+    while len(_palette_cache) > PALETTE_CACHE_SIZE:
+        _palette_cache.popitem(last = False)
+    return palettes
+
+
+def tonal_palette(hex_color: str):
+    """ پالت تونال یک رنگ منبع: تون (str) -> hex؛ خروجی فقط خواندنی و کش‌شده است """
+    return tonal_palettes((hex_color,))[0]
+
+
+@lru_cache(maxsize = PALETTE_CACHE_SIZE * len(PALETTE_TONES))
+def rgba_from_hex(hex_color: str):
+    """ hex -> tuple (r, g, b, a) در بازه‌ی 0..1؛ هر رنگ فقط یک‌بار parse می‌شود """
+    return tuple(get_color_from_hex(hex_color))
+
+
+# ================================
+# 🎨 نقش‌ها بر اساس رنگ منبع
+# ================================
+# پراپرتی منبع -> ((نقش، تون light، تون dark), ...)
+SOURCE_ROLES = {
+    "source_primary": (
+        ("primary", "60", "10"),
+        ("on_primary", "10", "90"),
+        ("primary_container", "80", "40"),
+        ("on_primary_container", "20", "70"),
+    ),
+    "source_secondary": (
+        ("secondary", "60", "10"),
+        ("on_secondary", "10", "90"),
+        ("secondary_container", "80", "40"),
+        ("on_secondary_container", "20", "70"),
+    ),
+    "source_tertiary": (
+        ("tertiary", "60", "10"),
+        ("on_tertiary", "10", "90"),
+        ("tertiary_container", "80", "40"),
+        ("on_tertiary_container", "20", "70"),
+    ),
+    "source_error": (
+        ("error", "60", "10"),
+        ("on_error", "10", "90"),
+        ("error_container", "80", "40"),
+        ("on_error_container", "20", "70"),
+    ),
+    "source_neutral": (
+        ("surface", "80", "10"),
+        ("on_surface", "10", "80"),
+        ("surface_container", "90", "20"),
+        ("on_surface_container", "20", "90"),
+    ),
+    "source_neutral_variant": (
+        ("outline", "50", "60"),
+    ),
+}
+
+# توکن‌هایی که به رنگ منبع وابسته نیستند
+STATIC_TOKENS = {
+    "transparent": "#00000000",
+}
+
+MODES = ("light", "dark")
+
+# نسخه‌ی الگوریتم ساخت توکن‌ها؛ با هر تغییر در خروجی افزایش یابد تا کش‌های روی دیسک نامعتبر شوند
+THEME_ALGORITHM_VERSION = 2
+
+
+def roles_for_source(source_name, hex_color):
+    """ (نقش‌های light، نقش‌های dark) مشتق از یک رنگ منبع """
+    palette = tonal_palette(hex_color)
+    light = {}
+    dark = {}
+    for role, light_tone, dark_tone in SOURCE_ROLES[source_name]:
+        light[role] = palette[light_tone]
+        dark[role] = palette[dark_tone]
+    return light, dark
+
+
+def sources_from_seed(hex_color):
+    """ رنگ‌های منبع یک تم از یک رنگ seed (مثل طرح tonal spot در Material You) """
+    hue, chroma, _ = hex_to_hct(hex_color)
+    return {
+        "source_primary": hex_color,
+        "source_secondary": hct_to_hex(hue, 16.0, 50.0),
+        "source_tertiary": hct_to_hex(hue + 60.0, 24.0, 50.0),
+        "source_neutral": hct_to_hex(hue, 4.0, 50.0),
+        "source_neutral_variant": hct_to_hex(hue, 8.0, 50.0),
+    }
+
+
+# ================================
+# 🎨 جدول توکن‌ها (پایه‌ی تم و overlay)
+# ================================
+class TokenSource(EventDispatcher):
+    """
+    منبع توکن‌ها برای ویجت‌ها: tokens (hex)، rgba (جدول فقط خواندنی توکن -> (r, g, b, a))،
+    اشتراک per-token و dispatcher برای اعمال روی ویجت‌ها.
+    - on_tokens_changed(changed): مقدار hex توکن‌ها تغییر کرده
+    - on_rgba_changed(tokens): فقط rgba تغییر کرده (فریم‌های انتقال تدریجی)
+    """
+    __events__ = ("on_tokens_changed", "on_rgba_changed")
+
+    # نقش‌های رنگی (توکن‌ها)
+    tokens = DictProperty({})
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # جدول فقط خواندنی توکن -> (r, g, b, a) هم‌گام با tokens
+        self.rgba = MappingProxyType({})
+        # (توکن، alpha) -> رنگ
+        self._alpha_cache = {}
+        # توکن -> callbackهای مشترک
+        self._token_callbacks = {}
+
+    def _set_rgba(self, rgba, tokens):
+        self.rgba = MappingProxyType(rgba)
+        self._alpha_cache = {key: color for key, color in self._alpha_cache.items() if key[0] not in tokens}
+
+    def _notify(self, changed):
+        token_callbacks = self._token_callbacks
+        seen = set()
+        for token in changed:
+            for callback in token_callbacks.get(token, ()):
+                # ویجتی که چند توکن تغییرکرده دارد فقط یک‌بار خبردار می‌شود
+                if id(callback) not in seen:
+                    seen.add(id(callback))
+                    callback(changed)
+        self.dispatch("on_tokens_changed", changed)
+
+    def on_tokens_changed(self, changed):
+        pass
+
+    def on_rgba_changed(self, tokens):
+        pass
+
+    # -----------------------------
+    # اشتراک توکن‌ها
+    # -----------------------------
+    def bind_tokens(self, tokens, callback):
+        """ callback(changed) فقط وقتی یکی از tokens تغییر کند؛ handle برای unbind_tokens برمی‌گرداند """
+        tokens = tuple(dict.fromkeys(str(token) for token in tokens))
+        for token in tokens:
+            self._token_callbacks.setdefault(token, []).append(callback)
+        return tokens, callback
+
+    def unbind_tokens(self, handle):
+        tokens, callback = handle
+        for token in tokens:
+            callbacks = self._token_callbacks.get(token)
+            if not callbacks:
+                continue
+            for index, item in enumerate(callbacks):
+                if item is callback:
+                    del callbacks[index]
+                    break
+            if not callbacks:
+                del self._token_callbacks[token]
+
+    # -----------------------------
+    # گرفتن رنگ
+    # -----------------------------
+    def get_hex(self, token: str) -> str:
+        token = str(token)
+        if token in self.tokens:
+            return self.tokens[token]
+        raise ThemeResolveError(f"Unknown token: {token}")
+
+    def get_rgba(self, token: str, alpha: float = 1.0):
+        """ (r, g, b, alpha) از جدول rgba؛ هر ترکیب توکن و alpha تا تغییر بعدی توکن کش می‌شود """
+        key = (token, alpha)
+        color = self._alpha_cache.get(key)
+        if color is None:
+            rgba = self.rgba.get(str(token))
+            if rgba is None:
+                raise ThemeResolveError(f"Unknown token: {token}")
+            color = self._alpha_cache[key] = (rgba[0], rgba[1], rgba[2], alpha)
+        return color
+
+    def get_rgba_many(self, tokens, alpha: float = 1.0):
+        """ رنگ چند توکن با یک فراخوانی """
+        get_rgba = self.get_rgba
+        return [get_rgba(token, alpha) for token in tokens]
 
 
 # ================================
 # 🎨 M3 Theme Manager
 # ================================
-class BaseTheme(EventDispatcher):
+class BaseTheme(TokenSource):
+    """
+    تم M3 از روی رنگ‌های منبع.
+    هر بار انتشار، مجموعه‌ی توکن‌های واقعاً تغییرکرده را حساب و فقط به مشترک‌های همان توکن‌ها خبر می‌دهد:
+        handle = theme.bind_tokens(("primary", "on_primary"), callback)   # callback(changed)
+        theme.unbind_tokens(handle)
+    رویداد on_tokens_changed(changed) هم برای همه‌ی تغییرات dispatch می‌شود.
+    ویجت‌ها از طریق dispatcher (ThemeDispatcher) ثبت و یک‌بار در هر فریم به‌روز می‌شوند.
+    برای یک زیردرخت با چند توکن یا منبع متفاوت از ThemeOverlay استفاده کنید.
+    با cache (ThemeCache) توکن‌های همین رنگ‌های منبع بدون ساخت دوباره از دیسک خوانده می‌شوند.
+    """
+
     # رنگ‌های منبع
     source_primary = StringProperty("#6750A4")
     source_secondary = StringProperty("#625B71")
@@ -87,103 +312,210 @@ class BaseTheme(EventDispatcher):
     source_neutral = StringProperty("#605D62")
     source_neutral_variant = StringProperty("#605D62")
 
-    # نقش‌های رنگی (توکن‌ها)
-    tokens = DictProperty({})
-
     # حالت تم
     mode = StringProperty("light")  # light / dark
 
-    def __init__(self, *args, **kwargs):
+    # انتقال تدریجی هنگام تغییر mode یا set_sources (ثانیه؛ 0 یعنی فوری)
+    transition_duration = NumericProperty(0)
+    # حداکثر زمان اعمال رنگ روی ویجت‌ها در هر فریم حین انتقال (ثانیه؛ 0 یعنی بدون سقف)
+    transition_budget = NumericProperty(0.006)
+    transition_easing = StringProperty("in_out_quad")
+
+    def __init__(self, *args, cache = None, **kwargs):
+        start = time.perf_counter()
         super().__init__(*args, **kwargs)
-        self.bind(
-            source_primary=self._regenerate,
-            source_secondary=self._regenerate,
-            source_tertiary=self._regenerate,
-            source_error=self._regenerate,
-            source_neutral=self._regenerate,
-            source_neutral_variant=self._regenerate,
-            mode=self._regenerate,
-        )
-        self._regenerate()
+        # کش توکن‌ها روی دیسک (ThemeCache) و زمان مراحل راه‌اندازی (ثانیه)
+        self.cache = cache
+        self.timings = {}
+        # جدول توکن‌های هر دو حالت؛ تغییر mode فقط جدول را عوض می‌کند
+        self._tables = {mode: dict(STATIC_TOKENS) for mode in MODES}
+        # جدول RGBA نهایی؛ در حین انتقال rgba مقادیر میانی را دارد
+        self._final_rgba = {}
+        self.transition = None
+        # هنگام set_sources، انتشار تا پایان تغییر همه‌ی منبع‌ها عقب می‌افتد
+        self._deferred = False
+        for source_name in SOURCE_ROLES:
+            self.fbind(source_name, partial(self._on_source, source_name))
+        self.fbind("mode", self._on_mode)
+        if not self._load_cached():
+            phase = time.perf_counter()
+            self._regenerate()
+            self.timings["regenerate"] = time.perf_counter() - phase
+            self.save_cache()
+        # بعد از ساخت اولیه، تا انتشار اولیه pass اضافه‌ای نسازد
+        self.dispatcher = ThemeDispatcher(self)
+        self.timings["startup"] = time.perf_counter() - start
 
     # -----------------------------
     # ساخت پالت تونال
     # -----------------------------
     def _generate_tonal_palette(self, hex_color: str) -> dict:
-        h, c, _ = hex_to_hct(hex_color)
-        tones = {str(t): hct_to_hex(h, c, t) for t in range(0, 101, 10)}
-        tones.update({"95": hct_to_hex(h, c, 95), "98": hct_to_hex(h, c, 98), "6":hct_to_hex(h, c, 6)})
-        return tones
+        return dict(tonal_palette(hex_color))
 
     # -----------------------------
-    # ساخت کل نقش‌های رنگی
+    # ساخت نقش‌های رنگی
     # -----------------------------
     def _regenerate(self, *args):
-        is_dark = self.mode == "dark"
-
-        # پالت‌ها
-        primary_pal = self._generate_tonal_palette(self.source_primary)
-        secondary_pal = self._generate_tonal_palette(self.source_secondary)
-        tertiary_pal = self._generate_tonal_palette(self.source_tertiary)
-        error_pal = self._generate_tonal_palette(self.source_error)
-        neutral_pal = self._generate_tonal_palette(self.source_neutral)
-        neutral_var_pal = self._generate_tonal_palette(self.source_neutral_variant)
-
-        # نقش‌ها
-        self.tokens = {
-            # primary
-            "primary": primary_pal["60"] if not is_dark else primary_pal["10"],
-            "on_primary": primary_pal["10"] if not is_dark else primary_pal["90"],
-            "primary_container": primary_pal["80"] if not is_dark else primary_pal["40"],
-            "on_primary_container": primary_pal["20"] if not is_dark else primary_pal["70"],
-
-            # secondary
-            "secondary": secondary_pal["60"] if not is_dark else secondary_pal["10"],
-            "on_secondary": secondary_pal["10"] if not is_dark else secondary_pal["90"],
-            "secondary_container": secondary_pal["80"] if not is_dark else secondary_pal["40"],
-            "on_secondary_container": secondary_pal["20"] if not is_dark else secondary_pal["70"],
-
-            # tertiary
-            "tertiary": tertiary_pal["60"] if not is_dark else tertiary_pal["10"],
-            "on_tertiary": tertiary_pal["10"] if not is_dark else tertiary_pal["90"],
-            "tertiary_container": tertiary_pal["80"] if not is_dark else tertiary_pal["40"],
-            "on_tertiary_container": tertiary_pal["20"] if not is_dark else tertiary_pal["70"],
-
-            # error
-            "error": error_pal["60"] if not is_dark else error_pal["10"],
-            "on_error": error_pal["10"] if not is_dark else error_pal["90"],
-            "error_container": error_pal["80"] if not is_dark else error_pal["40"],
-            "on_error_container": error_pal["20"] if not is_dark else error_pal["70"],
-
-            # surface + outline
-            "surface": neutral_pal["80"] if not is_dark else neutral_pal["10"],
-            "on_surface": neutral_pal["10"] if not is_dark else neutral_pal["80"],
-            "surface_container":neutral_pal["90"] if not is_dark else neutral_pal["20"],
-            "on_surface_container":neutral_pal["20"] if not is_dark else neutral_pal["90"],
-
-            "outline": neutral_var_pal["50"] if not is_dark else neutral_var_pal["60"],
-
-            # شفاف
-            "transparent": "#00000000",
-        }
+        """ ساخت کامل جدول‌های light / dark از همه‌ی رنگ‌های منبع """
+        # پالت‌های همه‌ی منبع‌ها یکجا
+        tonal_palettes(getattr(self, source_name) for source_name in SOURCE_ROLES)
+        for source_name in SOURCE_ROLES:
+            self._update_source(source_name)
+        self._publish()
+
+    def _update_source(self, source_name):
+        light, dark = roles_for_source(source_name, getattr(self, source_name))
+        self._tables["light"].update(light)
+        self._tables["dark"].update(dark)
+
+    def _on_source(self, source_name, *args):
+        # فقط نقش‌های همین منبع دوباره ساخته می‌شوند
+        self._update_source(source_name)
+        if not self._deferred:
+            self._publish()
+
+    def _on_mode(self, *args):
+        self._publish(animate = True)
+
+    def _publish(self, animate = False):
+        new = self._tables["dark" if self.mode == "dark" else "light"]
+        old = self.tokens
+        changed = {token for token, value in new.items() if old.get(token) != value}
+        changed.update(token for token in old if token not in new)
+        if not changed:
+            return
+        final = self._final_rgba
+        for token in changed:
+            if token in new:
+                final[token] = rgba_from_hex(new[token])
+            else:
+                final.pop(token, None)
+        self.tokens = dict(new)
+
+        previous = self.transition
+        if previous is not None:
+            previous.cancel()
+            self.transition = None
+        if animate and self.transition_duration > 0:
+            # از رنگ‌های فعلی (شاید میانه‌ی انتقال قبلی) به جدول نهایی؛ ویجت‌هایی که انتقال قبلی
+            # رد کرده بود هم با پایان این انتقال به‌روز می‌شوند
+            start = self.rgba
+            transition = self.transition = ThemeTransition(
+                self, start, final, self.transition_duration, self.transition_easing,
+                changed = changed.union(previous.changed) if previous else changed,
+            )
+            rgba = dict(final)
+            rgba.update((token, start[token]) for token in transition.tokens)
+            self._set_rgba(rgba, changed.union(previous.tokens) if previous else changed)
+            self.dispatcher.begin_transition(self.transition_budget)
+            self._notify(changed)
+            transition.start()
+            return
+
+        self._set_rgba(dict(final), changed.union(previous.tokens) if previous else changed)
+        self._notify(changed)
+        if previous is not None:
+            self.dispatcher.end_transition()
+            self._rgba_changed(previous.changed)
 
     # -----------------------------
-    # گرفتن رنگ
+    # انتقال تدریجی
     # -----------------------------
-    def get_hex(self, token: str) -> str:
-        token = str(token)
-        if token in self.tokens:
-            return self.tokens[token]
-        raise ThemeResolveError(f"Unknown token: {token}")
+    def _show_frame(self, frame):
+        """ هر فریم انتقال: جدول میانی و یک pass روی ویجت‌های وابسته """
+        rgba = dict(self.rgba)
+        rgba.update(frame)
+        self._set_rgba(rgba, frame)
+        self._rgba_changed(frame)
+
+    def _end_transition(self, transition):
+        if transition is not self.transition:
+            return
+        self.transition = None
+        self._set_rgba(dict(self._final_rgba), transition.tokens)
+        self.dispatcher.end_transition()
+        # همه‌ی توکن‌های تغییرکرده، نه فقط درون‌یابی‌شده‌ها (ویجت‌های خارج از صفحه رد شده بودند)
+        self._rgba_changed(transition.changed)
+
+    def _rgba_changed(self, tokens):
+        self.dispatcher.invalidate(tokens)
+        self.dispatch("on_rgba_changed", tokens)
 
-    def get_rgba(self, token: str, alpha: float = 1.0):
-        hex_color = self.get_hex(token)
-        color = get_color_from_hex(hex_color)
-        return [color[0], color[1], color[2], alpha]
+    # -----------------------------
+    # کش روی دیسک
+    # -----------------------------
+    def sources(self):
+        return {source_name: getattr(self, source_name) for source_name in SOURCE_ROLES}
+
+    def cache_key(self):
+        return theme_cache_key(self.sources(), THEME_ALGORITHM_VERSION, SOURCE_ROLES)
+
+    def _load_cached(self):
+        if self.cache is None:
+            return False
+        phase = time.perf_counter()
+        tables = self.cache.load(self.cache_key())
+        if tables is None:
+            self.timings["cache_miss"] = time.perf_counter() - phase
+            return False
+        for mode, table in zip(MODES, tables):
+            self._tables[mode].update(table)
+        self._publish()
+        self.timings["cache_load"] = time.perf_counter() - phase
+        return True
+
+    def save_cache(self):
+        """ ذخیره‌ی جدول‌های light / dark فعلی برای راه‌اندازی بعدی """
+        if self.cache is None:
+            return
+        phase = time.perf_counter()
+        try:
+            self.cache.store(self.cache_key(), self._tables["light"], self._tables["dark"])
+        except OSError as e:
+            print("Error saving theme cache:", e)
+        self.timings["cache_store"] = time.perf_counter() - phase
+
+    # -----------------------------
+    # تغییر رنگ‌های منبع
+    # -----------------------------
+    def set_sources(self, **sources):
+        """ تغییر چند رنگ منبع با یک انتشار (و یک pass روی ویجت‌ها) """
+        for source_name in sources:
+            if source_name not in SOURCE_ROLES:
+                raise ThemeResolveError(f"Unknown source: {source_name}")
+        tonal_palettes(sources.values())
+        self._deferred = True
+        try:
+            for source_name, hex_color in sources.items():
+                setattr(self, source_name, hex_color)
+        finally:
+            self._deferred = False
+        self._publish(animate = True)
+        self.save_cache()
+
+    def apply_seed(self, hex_color):
+        """ ساخت همه‌ی رنگ‌های منبع (به جز error) از یک رنگ seed """
+        self.set_sources(**sources_from_seed(hex_color))
+
+    def apply_image(self, image, extractor = None):
+        """
+        استخراج seed از تصویر (مسیر، bytes یا آرایه) در پس‌زمینه و اعمال بهترین آن؛ Future برمی‌گرداند.
+        اگر numpy یا (برای فایل) Pillow نصب نباشد همین‌جا ImportError می‌دهد (extra "theme").
+        """
+        from .extraction import require_support
+        require_support(image)
+        if extractor is None:
+            from .extraction import seed_extractor as extractor
+
+        def on_seeds(seeds):
+            if not isinstance(seeds, Exception) and seeds:
+                self.apply_seed(seeds[0])
+
+        return extractor.extract_async(image, on_seeds)
 
     # -----------------------------
     # تغییر حالت
     # -----------------------------
     def toggle_mode(self):
+        # binding روی mode جدول جدید را منتشر می‌کند (با transition_duration به‌صورت تدریجی)
         self.mode = "dark" if self.mode == "light" else "light"
-        self._regenerate()
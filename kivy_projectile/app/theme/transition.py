@@ -0,0 +1,64 @@
+# theme/transition.py
+from kivy.animation import AnimationTransition
+from kivy.clock import Clock
+
+
+class ThemeTransition:
+    """
+    انتقال تدریجی بین دو جدول RGBA تم با یک interpolation در هر فریم (به‌جای یک Animation برای هر ویجت).
+    فقط توکن‌هایی که بین دو جدول فرق دارند درون‌یابی می‌شوند؛ هر فریم جدول میانی به theme داده می‌شود
+    و dispatcher آن را در یک pass (با بودجه‌ی زمانی) روی ویجت‌ها اعمال می‌کند.
+    changed: همه‌ی توکن‌های تغییرکرده (از جمله توکن‌های اضافه/حذف‌شده که درون‌یابی نمی‌شوند)؛
+    ویجت‌های خارج از صفحه که حین انتقال رد شده‌اند با پایان انتقال برای همه‌ی آن‌ها به‌روز می‌شوند.
+    """
+
+    def __init__(self, theme, start, end, duration, easing = "in_out_quad", changed = ()):
+        self.theme = theme
+        self.duration = max(float(duration), 1e-6)
+        self.easing = getattr(AnimationTransition, easing) if isinstance(easing, str) else easing
+        self.tokens = tuple(token for token in end if token in start and start[token] != end[token])
+        self._start = {token: start[token] for token in self.tokens}
+        self._end = {token: end[token] for token in self.tokens}
+        self.changed = frozenset(changed).union(self.tokens)
+        self.elapsed = 0.0
+        self.frames = 0
+        self._event = None
+
+    @property
+    def running(self):
+        return self._event is not None
+
+    def start(self):
+        if self.tokens:
+            self._event = Clock.schedule_interval(self._step, 0)
+        else:
+            self.theme._end_transition(self)
+        return self
+
+    def current(self):
+        """ جدول میانی توکن‌های در حال تغییر در لحظه‌ی فعلی """
+        progress = self.easing(min(self.elapsed / self.duration, 1.0))
+        frame = {}
+        for token in self.tokens:
+            start = self._start[token]
+            end = self._end[token]
+            frame[token] = tuple(a + (b - a) * progress for a, b in zip(start, end))
+        return frame
+
+    def _step(self, dt):
+        self.elapsed += dt
+        self.frames += 1
+        if self.elapsed >= self.duration:
+            self.finish()
+            return False
+        self.theme._show_frame(self.current())
+
+    def finish(self):
+        """ پرش به انتهای انتقال """
+        self.cancel()
+        self.theme._end_transition(self)
+
+    def cancel(self):
+        if self._event is not None:
+            self._event.cancel()
+            self._event = None
@@ -1,5 +1,14 @@
 from . import model
 from . import field
-from .registry import relation_registry
+from .registry import relation_registry, CASCADE, SET_NULL, PROTECT, ProtectedError
+from .model import BaseModel, batch, delete
+from .store import ModelStore
+from .storage import SQLiteStorage
+from .serialization import dump_json, load_json, iter_json_array
+from .journal import ChangeJournal
+from .updates import UpdateQueue, update_queue
 
-__all__ = ["model", "field", "relation_registry"]
\ No newline at end of file
+__all__ = ["model", "field", "relation_registry", "CASCADE", "SET_NULL", "PROTECT", "ProtectedError",
+           "BaseModel", "batch", "delete", "ModelStore", "SQLiteStorage",
+           "dump_json", "load_json", "iter_json_array", "ChangeJournal",
+           "UpdateQueue", "update_queue"]
\ No newline at end of file
@@ -1,106 +1,389 @@
+import weakref
+
 from kivy import properties
 from kivy.event import EventDispatcher
 
+try:
+    import numpy
+except ImportError:  # numpy اختیاری است
+    numpy = None
+
+from .observable import ObservableList, ObservableMixin, ObservableSet, diff_lists, diff_sets
+from .registry import CASCADE, SET_NULL, relation_registry
+
+
+# پشته‌ی ردیابی وابستگی‌ها هنگام محاسبه‌ی ComputedField؛ هر عضو مجموعه‌ای از (instance، نام فیلد)
+_tracking = []
+
+
+# -------------------------
+# اشتراک روی objectهای مرتبط
+# -------------------------
+class RelatedObserver:
+    """
+    callback ثبت‌شده روی on_change یک object مرتبط.
+    مالک فقط با weakref نگه داشته می‌شود تا object مرتبط آن را زنده نگه ندارد؛
+    اگر مالک از بین رفته باشد، در اولین رویداد خودش را unbind می‌کند.
+    """
+    __slots__ = ('owner_ref', 'field', 'uid')
+
+    def __init__(self, owner, field):
+        self.owner_ref = weakref.ref(owner)
+        self.field = field
+        self.uid = None
+
+    def __call__(self, related, *args):
+        owner = self.owner_ref()
+        if owner is None:
+            related.unbind_uid('on_change', self.uid)
+            return
+        owner.dispatch(self.field.event_name, self.field.__get__(owner, None))
+
 
 # -------------------------
 # کلاس پایه فیلد
 # -------------------------
 class ModelField(properties.Property):
-    def __init__(self, default = None, null = True, **kwargs):
+    # فیلدهای ساده: نوع‌های مجاز، نوع نهایی (تبدیل) و نام نوع در پیام خطا
+    value_types = None
+    coerce = None
+    type_label = None
+    # dtype.kind های numpy که بدون بررسی تک‌تک پذیرفته می‌شوند
+    numpy_kinds = ""
+
+    def __init__(self, default = None, null = True, primary_key = False, index = False, **kwargs):
         super().__init__(default, **kwargs)
         self.default = default
         self.null = null
+        # primary_key: کلید identity map؛ index: True / 'hash' یا 'sorted'
+        self.primary_key = primary_key
+        self.index = index
+        self.indexed = bool(primary_key or index)
+        # تا قبل از نام‌گذاری فیلد، همان validate استفاده می‌شود
+        self.check = self.validate
 
     def validate(self, value):
-        if value is None and not self.null:
-            raise ValueError(f"{self.name} cannot be None")
+        if value is None:
+            if not self.null:
+                raise ValueError(f"{self.name} cannot be None")
+            return value
+        if self.value_types is not None:
+            if not isinstance(value, self.value_types):
+                raise TypeError(f"{self.name} must be {self.type_label}")
+            return self.coerce(value)
         return value
 
+    def __set_name__(self, owner, name):
+        super().__set_name__(owner, name)
+        # نام رویداد یک‌بار برای هر فیلد ساخته می‌شود، نه در هر set
+        self.event_name = f'on_{name}_change'
+        self.check = self.compile_validator()
+
+    # -------------------------
+    # اعتبارسنجی کامپایل‌شده
+    # -------------------------
+    def compile_validator(self):
+        """
+        اعتبارسنج تخت (بدون زنجیره‌ی super) برای همین نمونه‌ی فیلد.
+        اگر زیرکلاس validate خودش را دارد، همان استفاده می‌شود.
+        """
+        if type(self).validate is not ModelField.validate:
+            return self.validate
+
+        name, null = self.name, self.null
+        types, coerce, label = self.value_types, self.coerce, self.type_label
+
+        if types is None:
+            def check(value):
+                if value is None and not null:
+                    raise ValueError(f"{name} cannot be None")
+                return value
+            return check
+
+        def check(value):
+            if type(value) is coerce:
+                return value
+            if value is None:
+                if null:
+                    return None
+                raise ValueError(f"{name} cannot be None")
+            if not isinstance(value, types):
+                raise TypeError(f"{name} must be {label}")
+            return coerce(value)
+        return check
+
+    def validate_many(self, values):
+        """
+        اعتبارسنجی یک ستون کامل؛ برای ستون‌های یکدست فقط مجموعه‌ی نوع‌ها بررسی می‌شود
+        (و برای آرایه‌های numpy فقط dtype).
+        """
+        coerce = self.coerce
+        if numpy is not None and isinstance(values, numpy.ndarray) and values.dtype.kind in self.numpy_kinds:
+            return values.astype(coerce).tolist()
+
+        values = list(values)
+        types = set(map(type, values))
+        if coerce is not None and types <= {coerce, type(None)}:
+            if not self.null and type(None) in types:
+                raise ValueError(f"{self.name} cannot be None")
+            return values
+        return list(map(self.check, values))
+
     def __get__(self, instance, owner):
         if instance is None:
             return self
+        if _tracking:
+            _tracking[-1].add((instance, self.name))
         return instance.__dict__.get(self.name, self.default)
 
     def __set__(self, instance, value):
-        value = self.validate(value)
+        value = self.clean(instance, value)
+        if self.primary_key:
+            instance.objects.check_pk(instance, value)
         old_value = instance.__dict__.get(self.name, self.default)
         instance.__dict__[self.name] = value
+        self.rebind(instance, old_value, value)
 
-        # قطع اتصال قبلی اگر فیلد قبلی EventDispatcher بود
-        if isinstance(old_value, EventDispatcher):
-            old_value.unbind(on_change = lambda *a:None)
+        if old_value != value:
+            instance.field_changed(self, old_value, value)
+
+    def clean(self, instance, value):
+        """ اعتبارسنجی و تبدیل مقدار قبل از ذخیره روی instance """
+        return self.check(value)
+
+    def set_initial(self, instance, value):
+        """ مقداردهی اولیه هنگام ساخت نمونه (بدون مقایسه و dispatch) """
+        value = self.clean(instance, value)
+        instance.__dict__[self.name] = value
+        self.rebind(instance, None, value)
+
+    def set_trusted(self, instance, value):
+        """ مثل set_initial اما بدون اعتبارسنجی؛ فقط برای داده‌ی لایه‌ی ذخیره‌سازی خودمان """
+        instance.__dict__[self.name] = value
+        self.rebind(instance, None, value)
 
+    def rebind(self, instance, old_value, value):
+        # قطع اتصال قبلی اگر فیلد قبلی EventDispatcher بود
+        self.unbind_related(instance, old_value)
         # وصل اتصال جدید اگر EventDispatcher بود
-        if isinstance(value, EventDispatcher):
-            value.bind(on_change = lambda *a:instance.dispatch(f'on_{self.name}_change', value))
+        self.bind_related(instance, value)
 
-        if old_value != value:
-            instance.dispatch(f'on_{self.name}_change', value)
+    def bind_related(self, instance, value):
+        """ وصل تغییرات داخل objectهای مرتبط """
+        if not isinstance(value, EventDispatcher):
+            return
+        # هر (مالک، فیلد، object مرتبط) فقط یک اشتراک دارد؛ تکرار با شمارنده
+        subscriptions = instance.__dict__.setdefault('_related_subscriptions', {})
+        key = (self.name, id(value))
+        entry = subscriptions.get(key)
+        if entry is not None:
+            entry[1] += 1
+            return
+        observer = RelatedObserver(instance, self)
+        observer.uid = value.fbind('on_change', observer)
+        subscriptions[key] = [observer, 1]
+
+    def unbind_related(self, instance, value):
+        if not isinstance(value, EventDispatcher):
+            return
+        subscriptions = instance.__dict__.get('_related_subscriptions')
+        key = (self.name, id(value))
+        entry = subscriptions.get(key) if subscriptions else None
+        if entry is None:
+            return
+        entry[1] -= 1
+        if not entry[1]:
+            del subscriptions[key]
+            value.unbind_uid('on_change', entry[0].uid)
 
 
 # -------------------------
 # فیلدهای پایه
 # -------------------------
 class IntegerField(ModelField):
-    def validate(self, value):
-        value = super().validate(value)
-        if value is not None:
-            if not isinstance(value, int):
-                raise TypeError(f"{self.name} must be int")
-            return int(value)
-        return value
+    value_types = int
+    coerce = int
+    type_label = "int"
+    numpy_kinds = "iub"
 
 
 class StringField(ModelField):
-    def validate(self, value):
-        value = super().validate(value)
-        if value is not None:
-            if not isinstance(value, str):
-                raise TypeError(f"{self.name} must be str")
-            return str(value)
-        return value
+    value_types = str
+    coerce = str
+    type_label = "str"
+    numpy_kinds = "U"
 
 
 class BooleanField(ModelField):
-    def validate(self, value):
-        value = super().validate(value)
-        if value is not None:
-            if not isinstance(value, bool):
-                raise TypeError(f"{self.name} must be bool")
-            return bool(value)
-        return value
+    value_types = bool
+    coerce = bool
+    type_label = "bool"
+    numpy_kinds = "b"
 
 
 class FloatField(ModelField):
-    def validate(self, value):
-        value = super().validate(value)
-        if value is not None:
-            if not isinstance(value, (float, int)):
-                raise TypeError(f"{self.name} must be float")
-            return float(value)
-        return value
+    value_types = (float, int)
+    coerce = float
+    type_label = "float"
+    numpy_kinds = "fiub"
 
 
 # -------------------------
 # فیلدهای رابطه‌ای
 # -------------------------
+class LazyRelation:
+    """
+    مقدار رابطه‌ای که هنوز بارگذاری نشده (مثلاً کلید خارجی خوانده‌شده از دیتابیس).
+    در اولین دسترسی به فیلد با loader(key) بارگذاری و جایگزین می‌شود.
+    """
+    __slots__ = ('loader', 'key')
+
+    def __init__(self, loader, key):
+        self.loader = loader
+        self.key = key
+
+    def resolve(self):
+        return self.loader(self.key)
+
+    def __repr__(self):
+        return f"<LazyRelation {self.key!r}>"
+
+
 class RelationField(ModelField):
     """ پایه برای فیلدهای رابطه‌ای """
 
-    def bind_related(self, instance, value):
-        """ وصل تغییرات داخل objectهای مرتبط """
-        if isinstance(value, EventDispatcher):
-            value.bind(on_change = lambda *a:instance.dispatch(f'on_{self.name}_change', value))
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        if _tracking:
+            _tracking[-1].add((instance, self.name))
+        value = instance.__dict__.get(self.name, self.default)
+        if isinstance(value, LazyRelation):
+            self.unbind_lazy(instance, value)
+            value = self.clean(instance, value.resolve())
+            instance.__dict__[self.name] = value
+            self.rebind(instance, None, value)
+        return value
 
-    def unbind_related(self, value):
-        if isinstance(value, EventDispatcher):
-            value.unbind(on_change = lambda *a:None)
+    def __set__(self, instance, value):
+        # مقدار lazy قبلی فقط با bind_lazy ثبت شده است
+        lazy = instance.__dict__.get(self.name)
+        if isinstance(lazy, LazyRelation):
+            self.unbind_lazy(instance, lazy)
+            del instance.__dict__[self.name]
+        super().__set__(instance, value)
+
+    def set_initial(self, instance, value):
+        if isinstance(value, LazyRelation):
+            instance.__dict__[self.name] = value
+            self.bind_lazy(instance, value)
+            return
+        super().set_initial(instance, value)
+
+    def set_trusted(self, instance, value):
+        if isinstance(value, LazyRelation):
+            instance.__dict__[self.name] = value
+            self.bind_lazy(instance, value)
+            return
+        super().set_trusted(instance, value)
+
+    def bind_lazy(self, instance, lazy):
+        """ ثبت مقدار lazy بدون بارگذاری آن (مثلاً سمت معکوس ForeignKey) """
+
+    def unbind_lazy(self, instance, lazy):
+        """ قبل از resolve، جایگزینی یا جدا شدن مقدار lazy صدا زده می‌شود """
+
+
+class ReverseRelation:
+    """
+    دسترسی معکوس روی مدل مقصد (مثلاً author.book_set):
+    مجموعه‌ی زنده (WeakSet) از objectهایی که با ForeignKey به این نمونه اشاره می‌کنند.
+    بعد از اولین دسترسی در __dict__ نمونه کش می‌شود.
+    """
+
+    def __init__(self, related_name, field):
+        self.related_name = related_name
+        self.field = field
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        related = instance.__dict__.get(self.related_name)
+        if related is None:
+            related = instance.__dict__[self.related_name] = weakref.WeakSet()
+            # فرزندانی که قبل از بارگذاری این نمونه با کلید lazy به آن اشاره کرده‌اند
+            related.update(self.field.adopt_pending(instance))
+        return related
 
 
 class ForeignKey(RelationField):
-    def __init__(self, to, **kwargs):
+    def __init__(self, to, related_name = None, on_delete = CASCADE, **kwargs):
         super().__init__(**kwargs)
+        if on_delete == SET_NULL and not self.null:
+            raise ValueError("ForeignKey with on_delete = SET_NULL must allow null")
         self.to = to
+        self.related_name = related_name
+        self.on_delete = on_delete
+        # کلید مقصدِ هنوز بارگذاری‌نشده -> WeakSet فرزندانی که با LazyRelation به آن اشاره می‌کنند
+        self._pending = {}
+
+    def __set_name__(self, owner, name):
+        super().__set_name__(owner, name)
+        if self.related_name is None:
+            self.related_name = f"{owner.__name__.lower()}_set"
+        relation_registry.register(owner, name, self.to, self.related_name, self)
+        if not isinstance(self.to.__dict__.get(self.related_name), ReverseRelation):
+            setattr(self.to, self.related_name, ReverseRelation(self.related_name, self))
+
+    def query_key(self, value):
+        """
+        مقدار این فیلد در کوئری‌ها و ایندکس‌ها: کلید اصلی مقصد، بدون بارگذاری LazyRelation؛
+        تا filter(shelf = shelf) و order_by("shelf") برای مقدار lazy و بارگذاری‌شده یکسان باشند.
+        """
+        if isinstance(value, LazyRelation):
+            return value.key
+        if isinstance(value, self.to):
+            pk_name = self.to.objects.pk_name
+            pk = value.__dict__.get(pk_name) if pk_name is not None else None
+            if pk is not None:
+                return pk
+        return value
+
+    def rebind(self, instance, old_value, value):
+        super().rebind(instance, old_value, value)
+        # نگهداری افزایشی مجموعه‌ی معکوس روی مقصد
+        if isinstance(old_value, self.to):
+            getattr(old_value, self.related_name).discard(instance)
+        if isinstance(value, self.to):
+            getattr(value, self.related_name).add(instance)
+
+    def bind_lazy(self, instance, lazy):
+        # بدون این ثبت، فرزندان lazy در مجموعه‌ی معکوس نیستند و CASCADE آن‌ها را نمی‌بیند
+        target = self.to.objects.get_by_pk(lazy.key)
+        if target is not None:
+            getattr(target, self.related_name).add(instance)
+            return
+        children = self._pending.get(lazy.key)
+        if children is None:
+            children = self._pending[lazy.key] = weakref.WeakSet()
+        children.add(instance)
+
+    def unbind_lazy(self, instance, lazy):
+        target = self.to.objects.get_by_pk(lazy.key)
+        if target is not None:
+            getattr(target, self.related_name).discard(instance)
+        children = self._pending.get(lazy.key)
+        if children is not None:
+            children.discard(instance)
+            if not children:
+                del self._pending[lazy.key]
+
+    def adopt_pending(self, target):
+        """ فرزندان ثبت‌شده برای کلید target (هنگام ساخت مجموعه‌ی معکوس آن) """
+        if not self._pending:
+            return ()
+        children = self._pending.pop(target.__dict__.get(self.to.objects.pk_name), None)
+        return list(children) if children is not None else ()
 
     def validate(self, value):
         value = super().validate(value)
@@ -109,19 +392,72 @@ class ForeignKey(RelationField):
                 raise TypeError(f"{self.name} must be an EventDispatcher instance")
         return value
 
-    def __set__(self, instance, value):
-        value = self.validate(value)
-        old_value = instance.__dict__.get(self.name, self.default)
 
-        self.unbind_related(old_value)
-        instance.__dict__[self.name] = value
-        self.bind_related(instance, value)
+class CollectionField(RelationField):
+    """
+    پایه‌ی فیلدهای چندتایی: مقدار در یک لیست/مجموعه‌ی مشاهده‌پذیر نگه داشته می‌شود
+    و هر تغییر درجا یا جایگزینی، رویداد on_<field>_diff با عملیات ریز (insert/remove/...) می‌فرستد.
+    """
+    container = None
+
+    def __set_name__(self, owner, name):
+        super().__set_name__(owner, name)
+        self.diff_event_name = f'on_{name}_diff'
+
+    def validate_item(self, item):
+        if not isinstance(item, EventDispatcher):
+            raise TypeError(f"All items in {self.name} must be EventDispatcher instances")
+
+    def validate_items(self, items):
+        """ بررسی نوع آیتم‌ها فقط یک‌بار برای هر نوع متمایز """
+        for item_type in set(map(type, items)):
+            if not issubclass(item_type, EventDispatcher):
+                raise TypeError(f"All items in {self.name} must be EventDispatcher instances")
+
+    def clean(self, instance, value):
+        value = self.check(value)
+        if value is None:
+            return None
+        return self.container(value, instance, self)
+
+    def set_trusted(self, instance, value):
+        # حتی بدون اعتبارسنجی، مقدار باید داخل ظرف مشاهده‌پذیر قرار بگیرد
+        if value is not None and not isinstance(value, LazyRelation):
+            value = self.container(value, instance, self)
+        super().set_trusted(instance, value)
+
+    def diff(self, old_value, value):
+        """ پیش‌فرض: یک reset با محتوای جدید؛ زیرکلاس‌ها diff ریزتر برمی‌گردانند """
+        old_value, value = list(old_value), list(value)
+        return [('reset', value)] if old_value != value else []
+
+    def __set__(self, instance, value):
+        old_value = instance.__dict__.get(self.name)
+        super().__set__(instance, value)
+        value = instance.__dict__[self.name]
+        if isinstance(old_value, LazyRelation):
+            ops = [('reset', list(value or ()))]
+        else:
+            ops = self.diff(old_value or (), value or ())
+        if ops:
+            # on_change قبلاً توسط field_changed فرستاده شده
+            instance.collection_changed(self, ops, aggregate = False)
+
+    def rebind(self, instance, old_value, value):
+        if isinstance(old_value, ObservableMixin):
+            # لیست قبلی دیگر به این مدل رویداد نمی‌فرستد
+            old_value._attach(None, None)
+
+        for obj in old_value or ():
+            self.unbind_related(instance, obj)
+
+        for obj in value or ():
+            self.bind_related(instance, obj)
 
-        if old_value != value:
-            instance.dispatch(f'on_{self.name}_change', value)
 
+class OneToManyField(CollectionField):
+    container = ObservableList
 
-class OneToManyField(RelationField):
     def __init__(self, to, **kwargs):
         super().__init__(default = [], **kwargs)
         self.to = to
@@ -131,28 +467,16 @@ class OneToManyField(RelationField):
         if value is not None:
             if not isinstance(value, list):
                 raise TypeError(f"{self.name} must be a list")
-            for item in value:
-                if not isinstance(item, EventDispatcher):
-                    raise TypeError(f"All items in {self.name} must be EventDispatcher instances")
+            self.validate_items(value)
         return value
 
-    def __set__(self, instance, value):
-        value = self.validate(value)
-        old_value = instance.__dict__.get(self.name, self.default)
-
-        for obj in old_value:
-            self.unbind_related(obj)
+    def diff(self, old_value, value):
+        return diff_lists(list(old_value), list(value))
 
-        instance.__dict__[self.name] = value
 
-        for obj in value:
-            self.bind_related(instance, obj)
+class ManyToManyField(CollectionField):
+    container = ObservableSet
 
-        if old_value != value:
-            instance.dispatch(f'on_{self.name}_change', value)
-
-
-class ManyToManyField(RelationField):
     def __init__(self, to, **kwargs):
         super().__init__(default = set(), **kwargs)
         self.to = to
@@ -162,23 +486,96 @@ class ManyToManyField(RelationField):
         if value is not None:
             if not isinstance(value, (set, list)):
                 raise TypeError(f"{self.name} must be a set or list")
-            for item in value:
-                if not isinstance(item, EventDispatcher):
-                    raise TypeError(f"All items in {self.name} must be EventDispatcher instances")
+            self.validate_items(value)
             return set(value)
         return value
 
-    def __set__(self, instance, value):
-        value = self.validate(value)
-        old_value = instance.__dict__.get(self.name, self.default)
+    def diff(self, old_value, value):
+        return diff_sets(old_value, value)
 
-        for obj in old_value:
-            self.unbind_related(obj)
 
-        instance.__dict__[self.name] = value
+# -------------------------
+# فیلد محاسباتی
+# -------------------------
+class ComputedState:
+    """ کش مقدار یک ComputedField برای یک نمونه + وابستگی‌های آخرین محاسبه """
+    __slots__ = ('owner_ref', 'field', 'value', 'stale', 'deps', '__weakref__')
+
+    def __init__(self, owner, field):
+        self.owner_ref = weakref.ref(owner)
+        self.field = field
+        self.value = None
+        self.stale = True
+        self.deps = ()
+
+    def evaluate(self, owner):
+        deps = set()
+        _tracking.append(deps)
+        try:
+            value = self.field.func(owner)
+        finally:
+            _tracking.pop()
+
+        # فقط وابستگی‌هایی که واقعاً خوانده شدند مشترک می‌شوند
+        for obj, name in deps:
+            dependents = obj.__dict__.get('_dependents')
+            if dependents is None:
+                dependents = obj.__dict__['_dependents'] = {}
+            states = dependents.get(name)
+            if states is None:
+                states = dependents[name] = weakref.WeakSet()
+            states.add(self)
+        self.deps = deps
+        self.value = value
+        self.stale = False
+        return value
 
-        for obj in value:
-            self.bind_related(instance, obj)
+    def invalidate(self):
+        """ فقط علامت‌گذاری؛ محاسبه‌ی دوباره در خواندن بعدی انجام می‌شود """
+        if self.stale:
+            return
+        self.stale = True
+        for obj, name in self.deps:
+            states = obj.__dict__.get('_dependents', {}).get(name)
+            if states is not None:
+                states.discard(self)
+        self.deps = ()
+        self.value = None
+
+        owner = self.owner_ref()
+        if owner is not None:
+            # رویداد بدون مقدار: مقدار جدید با خواندن فیلد محاسبه می‌شود
+            owner.computed_changed(self.field)
+            owner.invalidate_dependents(self.field.name)
+
+
+class ComputedField:
+    """
+    فیلد فقط‌خواندنی با مقدار کش‌شده:
+        full_name = ComputedField(lambda self: f"{self.first} {self.last}")
+    فیلدهایی که در آخرین محاسبه خوانده شده‌اند (حتی از طریق ForeignKey) ردیابی می‌شوند
+    و تغییر هر کدام فقط کش را باطل می‌کند و on_<name>_change را می‌فرستد.
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.__doc__ = getattr(func, '__doc__', None)
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        self.event_name = f'on_{name}_change'
 
-        if old_value != value:
-            instance.dispatch(f'on_{self.name}_change', value)
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        if _tracking:
+            _tracking[-1].add((instance, self.name))
+        state = instance.__dict__.get(self.name)
+        if state is None:
+            state = instance.__dict__[self.name] = ComputedState(instance, self)
+        if state.stale:
+            return state.evaluate(instance)
+        return state.value
+
+    def __set__(self, instance, value):
+        raise AttributeError(f"{self.name} is a computed field")
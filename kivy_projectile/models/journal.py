@@ -0,0 +1,755 @@
+import mmap
+import os
+import struct
+import threading
+import weakref
+import zlib
+
+from kivy.clock import Clock
+from kivy.logger import Logger
+
+from .field import LazyRelation
+from .model import VALUE_MANY, VALUE_SCALAR, BaseModel
+
+# -------------------------
+# قالب فایل
+# -------------------------
+# هر فایل: MAGIC + (نسخه‌ی قالب، نسل)
+# هر رکورد: (طول payload، crc32) + payload
+# لاگ فقط وقتی replay می‌شود که نسلش با snapshot یکی باشد؛ compaction نسل را یکی جلو می‌برد.
+LOG_MAGIC = b"KPJL"
+SNAPSHOT_MAGIC = b"KPJS"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<4sHQ")
+_FRAME = struct.Struct("<II")
+_INT = struct.Struct("<q")
+_FLOAT = struct.Struct("<d")
+_SIZE = struct.Struct("<I")
+
+# نوع رکوردها
+OP_PUT = 1           # (model, pk, {field: value})
+OP_UPDATE = 2        # (model, pk, {field: value}) فقط فیلدهای تغییرکرده
+OP_DELETE = 3        # (model, pk)
+OP_STATE = 4         # (key, value)
+OP_STATE_DELETE = 5  # (key,)
+OP_ROWS = 6          # (model, [field names], [[values], ...]) فقط در snapshot
+
+# تعداد ردیف در هر رکورد OP_ROWS
+SNAPSHOT_CHUNK = 1000
+
+
+# -------------------------
+# کدگذاری باینری مقادیر
+# -------------------------
+class ModelRef:
+    """ ارجاع به یک مدل در state (نام کلاس + primary key)؛ بعد از بارگذاری resolve می‌شود """
+    __slots__ = ('model', 'pk')
+
+    def __init__(self, model, pk):
+        self.model = model
+        self.pk = pk
+
+
+def _encode(value, out):
+    if value is None:
+        out += b"N"
+    elif value is True:
+        out += b"T"
+    elif value is False:
+        out += b"F"
+    elif isinstance(value, int):
+        if -(1 << 63) <= value < (1 << 63):
+            out += b"i"
+            out += _INT.pack(value)
+        else:
+            _encode_text(b"I", str(value), out)
+    elif isinstance(value, float):
+        out += b"d"
+        out += _FLOAT.pack(value)
+    elif isinstance(value, str):
+        _encode_text(b"s", value, out)
+    elif isinstance(value, (bytes, bytearray)):
+        out += b"b"
+        out += _SIZE.pack(len(value))
+        out += value
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        out += b"l"
+        out += _SIZE.pack(len(value))
+        for item in value:
+            _encode(item, out)
+    elif isinstance(value, dict):
+        out += b"m"
+        out += _SIZE.pack(len(value))
+        for key, item in value.items():
+            _encode(key, out)
+            _encode(item, out)
+    elif isinstance(value, BaseModel):
+        out += b"r"
+        _encode(type(value).__name__, out)
+        _encode(value.__dict__.get(type(value).objects.pk_name), out)
+    else:
+        raise TypeError(f"Cannot journal value of type {type(value).__name__}")
+
+
+def _encode_text(tag, text, out):
+    data = text.encode("utf-8")
+    out += tag
+    out += _SIZE.pack(len(data))
+    out += data
+
+
+_TAG_NONE, _TAG_TRUE, _TAG_FALSE = ord("N"), ord("T"), ord("F")
+_TAG_INT, _TAG_BIGINT, _TAG_FLOAT = ord("i"), ord("I"), ord("d")
+_TAG_STR, _TAG_BYTES, _TAG_LIST, _TAG_DICT, _TAG_REF = ord("s"), ord("b"), ord("l"), ord("m"), ord("r")
+
+
+def _decode(buffer, pos):
+    """ (مقدار، موقعیت بعدی)؛ buffer می‌تواند bytes یا mmap باشد """
+    tag = buffer[pos]
+    pos += 1
+    if tag == _TAG_INT:
+        return _INT.unpack_from(buffer, pos)[0], pos + 8
+    if tag == _TAG_STR:
+        size = _SIZE.unpack_from(buffer, pos)[0]
+        pos += 4
+        return str(buffer[pos:pos + size], "utf-8"), pos + size
+    if tag == _TAG_NONE:
+        return None, pos
+    if tag == _TAG_TRUE:
+        return True, pos
+    if tag == _TAG_FALSE:
+        return False, pos
+    if tag == _TAG_FLOAT:
+        return _FLOAT.unpack_from(buffer, pos)[0], pos + 8
+    if tag == _TAG_LIST:
+        count = _SIZE.unpack_from(buffer, pos)[0]
+        pos += 4
+        items = []
+        for _ in range(count):
+            item, pos = _decode(buffer, pos)
+            items.append(item)
+        return items, pos
+    if tag == _TAG_DICT:
+        count = _SIZE.unpack_from(buffer, pos)[0]
+        pos += 4
+        items = {}
+        for _ in range(count):
+            key, pos = _decode(buffer, pos)
+            items[key], pos = _decode(buffer, pos)
+        return items, pos
+    if tag == _TAG_BYTES:
+        size = _SIZE.unpack_from(buffer, pos)[0]
+        pos += 4
+        return bytes(buffer[pos:pos + size]), pos + size
+    if tag == _TAG_BIGINT:
+        size = _SIZE.unpack_from(buffer, pos)[0]
+        pos += 4
+        return int(str(buffer[pos:pos + size], "utf-8")), pos + size
+    if tag == _TAG_REF:
+        model, pos = _decode(buffer, pos)
+        pk, pos = _decode(buffer, pos)
+        return ModelRef(model, pk), pos
+    raise ValueError(f"Corrupt journal value tag {tag!r}")
+
+
+def _frame(payload):
+    return _FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _iter_frames(buffer, pos, verify = True):
+    """
+    پیمایش (شروع، پایان) payload رکوردها از buffer بدون decode.
+    با اولین رکورد ناقص یا خراب (مثلاً نوشتن نیمه‌کاره هنگام crash) متوقف می‌شود.
+    با verify = False فقط طول رکوردها بررسی می‌شود و crc با _frame_ok هنگام decode.
+    """
+    end = len(buffer)
+    while pos + _FRAME.size <= end:
+        size, crc = _FRAME.unpack_from(buffer, pos)
+        start = pos + _FRAME.size
+        if start + size > end:
+            return
+        if verify and zlib.crc32(buffer[start:start + size]) != crc:
+            return
+        pos = start + size
+        yield start, pos
+
+
+def _frame_ok(buffer, start, end):
+    """ بررسی crc یک رکورد که (start، end) آن از _iter_frames آمده """
+    return zlib.crc32(buffer[start:end]) == _FRAME.unpack_from(buffer, start - _FRAME.size)[1]
+
+
+def _write_file(path, data):
+    with open(path, "wb") as fp:
+        fp.write(data)
+        fp.flush()
+        os.fsync(fp.fileno())
+
+
+def _iter_records(buffer, pos):
+    """ پیمایش (رکورد، موقعیت بعد از رکورد) از buffer """
+    for start, end in _iter_frames(buffer, pos):
+        yield _decode(buffer, start)[0], end
+
+
+# هر رکورد یک لیست است: "l" + تعداد، سپس op به‌صورت "i" + int64 و (برای رکوردهای مدل) نام مدل
+_OP_OFFSET = 1 + _SIZE.size
+
+
+def _peek_op(buffer, start):
+    """ (op، نام مدل یا None) بدون decode کل رکورد """
+    op = _INT.unpack_from(buffer, start + _OP_OFFSET + 1)[0]
+    if op in (OP_STATE, OP_STATE_DELETE):
+        return op, None
+    return op, _decode(buffer, start + _OP_OFFSET + 1 + _INT.size)[0]
+
+
+# -------------------------
+# کدگذاری فیلدهای مدل
+# -------------------------
+def _field_codecs(model_cls, get):
+    """
+    (نام، encode، decode) برای هر فیلد؛ روابط با primary key نگه داشته می‌شوند
+    و هنگام بارگذاری به LazyRelation با get(کلاس مقصد، کلید) تبدیل می‌شوند.
+    """
+    codecs = []
+    for name, field, kind in model_cls._serial_plan:
+        target = getattr(field, 'to', None)
+        if kind == VALUE_SCALAR or not (isinstance(target, type) and issubclass(target, BaseModel)):
+            codecs.append((name, None, None))
+        elif kind == VALUE_MANY:
+            codecs.append((name, _encode_keys, _lazy_many(target, get)))
+        else:
+            codecs.append((name, _encode_key, _lazy_one(target, get)))
+    return tuple(codecs)
+
+
+def _encode_key(value):
+    if value is None:
+        return None
+    if isinstance(value, LazyRelation):
+        return value.key
+    return value.__dict__.get(type(value).objects.pk_name)
+
+
+def _encode_keys(value):
+    if isinstance(value, LazyRelation):
+        return list(value.key)
+    return [_encode_key(item) for item in value or ()]
+
+
+def _lazy_one(target, get):
+    def load(key):
+        return get(target, key)
+
+    def decode(key):
+        return None if key is None else LazyRelation(load, key)
+    return decode
+
+
+def _lazy_many(target, get):
+    def load(keys):
+        items = (get(target, key) for key in keys)
+        return [item for item in items if item is not None]
+
+    def decode(keys):
+        return LazyRelation(load, keys or [])
+    return decode
+
+
+class _Compaction:
+    """ یک compact_async در جریان: snapshot در thread جدا نوشته می‌شود """
+    __slots__ = ('generation', 'path', 'tail', 'callbacks', 'error', 'thread')
+
+    def __init__(self, generation, path, callback):
+        self.generation = generation
+        self.path = path
+        # رکوردهایی که بعد از ساخت snapshot ثبت می‌شوند؛ به لاگ نسل جدید منتقل می‌شوند
+        self.tail = bytearray()
+        self.callbacks = [callback] if callback else []
+        self.error = None
+        self.thread = None
+
+
+# -------------------------
+# ژورنال
+# -------------------------
+class ChangeJournal:
+    """
+    ژورنال append-only تغییرات مدل‌ها و state کانتینر برای راه‌اندازی سریع بعد از crash:
+        journal = ChangeJournal(path, models = (Author, Book))
+        journal.load()          # map کردن snapshot + replay دنباله‌ی لاگ
+        journal.get(Book, 1)    # ساخت on-demand از ردیف snapshot
+        journal.track(book)     # ثبت وضعیت و تغییرات بعدی
+
+    - تغییر فیلدها (رویدادهای on_<field>_change که در on_change تجمیع می‌شوند) رکوردهای باینری کوچک
+      با crc32 هستند؛ رکوردها در بافر جمع و یک‌بار در هر فریم نوشته می‌شوند
+    - بعد از compact_every رکورد، کل وضعیت به‌صورت ردیفی در snapshot نوشته و لاگ خالی می‌شود
+      (با compact_async: نوشتن فایل در thread جدا، تا فریم‌های UI منتظر fsync نمانند)
+    - هنگام بارگذاری فقط state و دنباله‌ی لاگ خوانده می‌شوند؛ ردیف‌های هر مدل در اولین get/objects
+      همان مدل decode و هر object فقط هنگام درخواست با hydrate ساخته می‌شود
+    فقط مدل‌های دارای primary_key قابل ثبت هستند.
+    """
+    log_name = "journal.log"
+    snapshot_name = "journal.snapshot"
+
+    def __init__(self, path, models = (), compact_every = 10000, fsync = False):
+        self.path = str(path)
+        os.makedirs(self.path, exist_ok = True)
+        self.log_path = os.path.join(self.path, self.log_name)
+        self.snapshot_path = os.path.join(self.path, self.snapshot_name)
+        self.compact_every = compact_every
+        self.fsync = fsync
+
+        self.models = {}
+        self._codecs = {}
+        self._encoders = {}
+        self.state = {}
+        # object -> [کلید ثبت‌شده، uid های bind]
+        self._tracking = weakref.WeakKeyDictionary()
+        self._buffer = bytearray()
+        self._records = 0
+        self._generation = 0
+        self._log = None
+        self._compaction = None
+        self._trigger = Clock.create_trigger(lambda dt: self.flush())
+
+        # وضعیت ذخیره‌شده‌ی ردیف‌ها (مقادیر کدگذاری‌شده): نام مدل -> {کلید: {فیلد: مقدار}}
+        # فقط برای مدل‌هایی که decode شده‌اند؛ بقیه هنوز در snapshot (mmap) هستند
+        self._rows = {}
+        # نام مدل -> موقعیت رکوردهای OP_ROWS در snapshot که هنوز decode نشده‌اند
+        self._chunks = {}
+        # نام مدل -> رکوردهای لاگ که باید بعد از decode روی ردیف‌های همان مدل اعمال شوند
+        self._pending = {}
+        self._snapshot = None
+
+        for model_cls in models:
+            self.register(model_cls)
+
+    def register(self, model_cls):
+        if model_cls.objects.pk_name is None:
+            raise ValueError(f"{model_cls.__name__} needs a primary_key field to be journaled")
+        self.models[model_cls.__name__] = model_cls
+        codecs = self._codecs[model_cls] = _field_codecs(model_cls, self.get)
+        self._encoders[model_cls] = {name: encode for name, encode, _ in codecs}
+        return model_cls
+
+    # -------------------------
+    # ثبت تغییرات
+    # -------------------------
+    def track(self, *objs):
+        """ ثبت وضعیت کامل objectها و اتصال به رویدادهای تغییرشان """
+        for obj in objs:
+            if obj in self._tracking:
+                continue
+            model_cls = type(obj)
+            if model_cls not in self._codecs:
+                self.register(model_cls)
+            key = obj.__dict__.get(model_cls.objects.pk_name)
+            self._append((OP_PUT, model_cls.__name__, key, self._encode_values(obj)))
+            self._bind(obj, key)
+
+    def untrack(self, obj):
+        entry = self._tracking.pop(obj, None)
+        if entry is not None:
+            obj.unbind_uid('on_change', entry[1])
+            obj.unbind_uid('on_delete', entry[2])
+
+    def _bind(self, obj, key):
+        # on_change همه‌ی on_<field>_change / on_<field>_diff ها (و batchها) را در یک رویداد دارد
+        self._tracking[obj] = [
+            key,
+            obj.fbind('on_change', self._on_change),
+            obj.fbind('on_delete', self._on_delete),
+        ]
+
+    def _on_change(self, obj, changed):
+        entry = self._tracking.get(obj)
+        if entry is None:
+            return
+        model_cls = type(obj)
+        values = {name: self._encode_field(obj, name) for name in changed if name in model_cls._fields}
+        if not values:
+            return
+        self._append((OP_UPDATE, model_cls.__name__, entry[0], values))
+        pk_name = model_cls.objects.pk_name
+        if pk_name in values:
+            # تغییر primary key: رکوردهای بعدی با کلید جدید
+            entry[0] = values[pk_name]
+
+    def _on_delete(self, obj):
+        entry = self._tracking.pop(obj, None)
+        if entry is not None:
+            self._append((OP_DELETE, type(obj).__name__, entry[0]))
+
+    def set_state(self, key, value):
+        """
+        ثبت یک کلید state سراسری (BaseContainer.set_state).
+        مقداری که قابل کدگذاری نیست (مثلاً یک widget) ثبت نمی‌شود و فقط هشدار می‌دهد؛
+        کانتینر آن را در حافظه نگه می‌دارد ولی بعد از راه‌اندازی دوباره بازیابی نمی‌شود.
+        """
+        payload = bytearray()
+        try:
+            _encode((OP_STATE, key, value), payload)
+        except TypeError as e:
+            Logger.warning(f"ChangeJournal: state {key!r} is not journaled: {e}")
+            return
+        self.state[key] = value
+        self._append_payload(payload)
+
+    def delete_state(self, key):
+        # مقدار None هم یک مقدار ثبت‌شده است
+        if key in self.state:
+            del self.state[key]
+            self._append((OP_STATE_DELETE, key))
+
+    def _encode_field(self, obj, name):
+        value = obj.__dict__.get(name, obj._fields[name].default)
+        encode = self._encoders[type(obj)][name]
+        return encode(value) if encode else value
+
+    def _encode_row(self, obj):
+        data = obj.__dict__
+        fields = obj._fields
+        row = []
+        for name, encode, _ in self._codecs[type(obj)]:
+            value = data.get(name, fields[name].default)
+            row.append(encode(value) if encode else value)
+        return row
+
+    def _encode_values(self, obj):
+        return dict(zip(self._encoders[type(obj)], self._encode_row(obj)))
+
+    def _append(self, record):
+        payload = bytearray()
+        _encode(record, payload)
+        self._append_payload(payload)
+        if record[0] not in (OP_STATE, OP_STATE_DELETE):
+            self._apply_model(record)
+
+    def _append_payload(self, payload):
+        frame = _frame(payload)
+        self._buffer += frame
+        if self._compaction is not None:
+            self._compaction.tail += frame
+        self._records += 1
+        self._trigger()
+
+    # -------------------------
+    # نوشتن روی دیسک
+    # -------------------------
+    def _open_log(self):
+        if self._log is None:
+            self._log = open(self.log_path, "ab")
+            if not self._log.tell():
+                self._log.write(_HEADER.pack(LOG_MAGIC, FORMAT_VERSION, self._generation))
+        return self._log
+
+    def flush(self):
+        """ نوشتن رکوردهای بافرشده (به‌طور خودکار یک‌بار در هر فریم) """
+        self._write_buffer()
+        if self.compact_every and self._records >= self.compact_every and self._compaction is None:
+            self.compact_async()
+
+    def _write_buffer(self):
+        if self._buffer:
+            log = self._open_log()
+            log.write(self._buffer)
+            log.flush()
+            if self.fsync:
+                os.fsync(log.fileno())
+            self._buffer.clear()
+
+    def compact(self):
+        """
+        نوشتن کل وضعیت در snapshot جدید و شروع لاگ خالی: همه‌ی نمونه‌های زنده‌ی مدل‌های ثبت‌شده
+        به‌علاوه‌ی ردیف‌هایی که هنوز object نشده‌اند، و state.
+        snapshot ابتدا در فایل موقت نوشته و سپس با os.replace جایگزین می‌شود.
+        همه‌چیز (از جمله fsync) روی thread فراخواننده انجام می‌شود؛ روی main thread از
+        compact_async استفاده کنید (compaction خودکار بعد از compact_every همان است).
+        """
+        if self._compaction is not None:
+            self._finish_compaction(self._compaction)
+        generation, data = self._build_snapshot()
+        temp_path = self.snapshot_path + ".tmp"
+        _write_file(temp_path, data)
+        self._install_snapshot(generation, temp_path)
+
+    def compact_async(self, callback = None):
+        """
+        مثل compact، ولی فقط ردیف‌ها همین‌جا ساخته می‌شوند (مثل SQLiteStorage.save_async)؛
+        نوشتن و fsync فایل در thread جدا و جایگزینی فایل‌ها در فریم بعد روی main thread انجام می‌شود.
+        رکوردهای ثبت‌شده در این فاصله هم در لاگ فعلی و هم در لاگ نسل جدید نوشته می‌شوند.
+        callback(None یا exception) بعد از پایان صدا زده می‌شود.
+        """
+        job = self._compaction
+        if job is not None:
+            if callback is not None:
+                job.callbacks.append(callback)
+            return
+        # رکوردهای قبل از snapshot تا پایان compaction در لاگ فعلی هم باشند
+        self._write_buffer()
+        generation, data = self._build_snapshot()
+        job = self._compaction = _Compaction(generation, self.snapshot_path + ".async.tmp", callback)
+
+        def write():
+            try:
+                _write_file(job.path, data)
+            except Exception as e:
+                job.error = e
+            Clock.schedule_once(lambda dt: self._finish_compaction(job))
+
+        job.thread = threading.Thread(target = write, name = "ChangeJournal", daemon = True)
+        job.thread.start()
+
+    def _finish_compaction(self, job):
+        if self._compaction is not job:
+            # قبلاً با compact یا close تمام شده
+            return
+        job.thread.join()
+        self._compaction = None
+        if job.error is None:
+            self._install_snapshot(job.generation, job.path, bytes(job.tail))
+        else:
+            Logger.warning(f"ChangeJournal: compaction failed: {job.error}")
+        for callback in job.callbacks:
+            callback(job.error)
+
+    def _build_snapshot(self):
+        """ (نسل جدید، محتوای فایل snapshot)؛ روی main thread چون objectهای زنده را می‌خواند """
+        generation = self._generation + 1
+        out = bytearray(_HEADER.pack(SNAPSHOT_MAGIC, FORMAT_VERSION, generation))
+        for model_cls, codecs in self._codecs.items():
+            name = model_cls.__name__
+            names = [codec[0] for codec in codecs]
+            pk_name = model_cls.objects.pk_name
+            objs = list(model_cls.objects.instances)
+            for obj in objs:
+                if obj not in self._tracking:
+                    self._bind(obj, obj.__dict__.get(pk_name))
+            # ردیف‌های ذخیره‌شده‌ای که object زنده ندارند (هرگز درخواست نشده یا جمع‌آوری شده‌اند)
+            live = {obj.__dict__.get(pk_name) for obj in objs}
+            rows = [self._encode_row(obj) for obj in objs]
+            rows.extend(
+                [values.get(field) for field in names]
+                for key, values in self._model_rows(name).items() if key not in live
+            )
+            for start in range(0, len(rows), SNAPSHOT_CHUNK):
+                payload = bytearray()
+                _encode((OP_ROWS, name, names, rows[start:start + SNAPSHOT_CHUNK]), payload)
+                out += _frame(payload)
+        for key, value in self.state.items():
+            payload = bytearray()
+            _encode((OP_STATE, key, value), payload)
+            out += _frame(payload)
+        return generation, out
+
+    def _install_snapshot(self, generation, temp_path, tail = b""):
+        """ جایگزینی snapshot و شروع لاگ نسل جدید با رکوردهای tail (ثبت‌شده بعد از ساخت snapshot) """
+        self._close_snapshot()
+        os.replace(temp_path, self.snapshot_path)
+
+        # لاگ نسل قبلی دیگر replay نمی‌شود، حتی اگر قبل از بازنویسی‌اش crash شود
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        self._generation = generation
+        self._buffer.clear()
+        with open(self.log_path, "wb") as fp:
+            fp.write(_HEADER.pack(LOG_MAGIC, FORMAT_VERSION, generation))
+            fp.write(tail)
+            if self.fsync and tail:
+                fp.flush()
+                os.fsync(fp.fileno())
+
+        # ردیف‌های decode شده آزاد می‌شوند؛ از این پس دوباره از snapshot جدید خوانده می‌شوند
+        self._rows = {}
+        self._chunks = {}
+        self._pending = {}
+        self._map_snapshot({})
+        self._records = 0
+        for record, _ in _iter_records(tail, 0):
+            self._records += 1
+            if record[0] not in (OP_STATE, OP_STATE_DELETE):
+                self._apply_model(record)
+
+    def close(self):
+        if self._compaction is not None:
+            self._finish_compaction(self._compaction)
+        self._write_buffer()
+        self._trigger.cancel()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        self._close_snapshot()
+
+    def _close_snapshot(self):
+        if self._snapshot is not None:
+            self._snapshot.close()
+            self._snapshot = None
+
+    # -------------------------
+    # بارگذاری
+    # -------------------------
+    def load(self):
+        """
+        بازسازی وضعیت: snapshot فقط map و فهرست می‌شود، state و دنباله‌ی لاگ همین‌جا خوانده می‌شوند.
+        objectها ساخته نمی‌شوند؛ با get / objects (یا resolve روابط) به‌صورت on-demand ساخته و track می‌شوند.
+        """
+        self._close_snapshot()
+        self._rows = {}
+        self._chunks = {}
+        self._pending = {}
+        state = {}
+        generation = self._map_snapshot(state)
+        tail = self._replay_log(generation, state)
+
+        self._generation = generation
+        self._records = tail
+        self.state = {key: self._resolve_refs(value) for key, value in state.items()}
+
+    def _map_snapshot(self, state):
+        if not os.path.exists(self.snapshot_path) or not os.path.getsize(self.snapshot_path):
+            return 0
+        with open(self.snapshot_path, "rb") as fp:
+            buffer = mmap.mmap(fp.fileno(), 0, access = mmap.ACCESS_READ)
+        magic, version, generation = _HEADER.unpack_from(buffer, 0)
+        if magic != SNAPSHOT_MAGIC or version != FORMAT_VERSION:
+            buffer.close()
+            raise ValueError(f"Unsupported journal snapshot: {self.snapshot_path}")
+        self._snapshot = buffer
+        # crc ردیف‌ها هنگام load خوانده نمی‌شود (O(حجم snapshot))؛ هر رکورد هنگام decode بررسی می‌شود
+        for start, end in _iter_frames(buffer, _HEADER.size, verify = False):
+            op, model = _peek_op(buffer, start)
+            if op == OP_ROWS:
+                # فقط موقعیت؛ ردیف‌ها در اولین درخواست همین مدل decode می‌شوند
+                self._chunks.setdefault(model, []).append((start, end))
+            elif _frame_ok(buffer, start, end):
+                self._apply(_decode(buffer, start)[0], state)
+            else:
+                Logger.warning(f"ChangeJournal: corrupt snapshot record skipped in {self.snapshot_path}")
+        return generation
+
+    def _replay_log(self, generation, state):
+        """ اعمال رکوردهای لاگ هم‌نسل snapshot؛ دنباله‌ی خراب/ناقص حذف می‌شود """
+        if not os.path.exists(self.log_path):
+            return 0
+        with open(self.log_path, "rb") as fp:
+            buffer = fp.read()
+        if len(buffer) < _HEADER.size:
+            os.remove(self.log_path)
+            return 0
+        magic, version, log_generation = _HEADER.unpack_from(buffer, 0)
+        if magic != LOG_MAGIC or version != FORMAT_VERSION or log_generation != generation:
+            # لاگ قدیمی‌تر از snapshot (crash وسط compaction)
+            os.remove(self.log_path)
+            return 0
+
+        count = 0
+        end = _HEADER.size
+        for record, end in _iter_records(buffer, _HEADER.size):
+            self._apply(record, state)
+            count += 1
+        if end < len(buffer):
+            with open(self.log_path, "r+b") as fp:
+                fp.truncate(end)
+        return count
+
+    def _apply(self, record, state):
+        op = record[0]
+        if op == OP_STATE:
+            state[record[1]] = record[2]
+        elif op == OP_STATE_DELETE:
+            state.pop(record[1], None)
+        else:
+            self._apply_model(record)
+
+    def _apply_model(self, record):
+        """ اعمال یک رکورد مدل روی ردیف‌های ذخیره‌شده؛ برای مدل decode نشده تا زمان decode صبر می‌کند """
+        model = record[1]
+        rows = self._rows.get(model)
+        if rows is None:
+            self._pending.setdefault(model, []).append(record)
+            return
+        op = record[0]
+        if op == OP_UPDATE:
+            _, _, key, changes = record
+            values = rows.get(key)
+            if values is None:
+                return
+            values.update(changes)
+            model_cls = self.models.get(model)
+            if model_cls is not None:
+                new_key = changes.get(model_cls.objects.pk_name, key)
+                if new_key != key:
+                    rows[new_key] = rows.pop(key)
+        elif op == OP_PUT:
+            rows[record[2]] = dict(record[3])
+        elif op == OP_DELETE:
+            rows.pop(record[2], None)
+        elif op == OP_ROWS:
+            _, _, names, items = record
+            pk_index = names.index(self.models[model].objects.pk_name)
+            for row in items:
+                rows[row[pk_index]] = dict(zip(names, row))
+
+    def _model_rows(self, model):
+        """ ردیف‌های یک مدل؛ در اولین درخواست از snapshot decode و رکوردهای معلق لاگ روی آن اعمال می‌شوند """
+        rows = self._rows.get(model)
+        if rows is not None:
+            return rows
+        rows = self._rows[model] = {}
+        buffer = self._snapshot
+        for start, end in self._chunks.pop(model, ()):
+            if not _frame_ok(buffer, start, end):
+                Logger.warning(f"ChangeJournal: corrupt snapshot rows of {model} skipped")
+                continue
+            self._apply_model(_decode(buffer, start)[0])
+        for record in self._pending.pop(model, ()):
+            self._apply_model(record)
+        return rows
+
+    # -------------------------
+    # ساخت on-demand
+    # -------------------------
+    def get(self, model_cls, key):
+        """
+        object با این کلید: نمونه‌ی موجود در identity map، یا ساخته‌شده از ردیف ذخیره‌شده
+        (بدون اعتبارسنجی، با hydrate) که از این پس track می‌شود. اگر ردیفی نباشد None.
+        """
+        values = self._model_rows(model_cls.__name__).get(key)
+        obj = model_cls.objects.get_by_pk(key)
+        if obj is not None:
+            # نمونه‌ی زنده معتبرتر است؛ فقط اگر ردیف ژورنال‌شده دارد track می‌شود
+            if values is not None and obj not in self._tracking:
+                self._bind(obj, key)
+            return obj
+        if values is None:
+            return None
+        decoded = {
+            name: decode(values[name]) if decode else values[name]
+            for name, _, decode in self._codecs[model_cls] if name in values
+        }
+        obj = model_cls.hydrate(decoded)
+        self._bind(obj, key)
+        return obj
+
+    def keys(self, model_cls):
+        """ کلید همه‌ی ردیف‌های ذخیره‌شده‌ی یک مدل (بدون ساخت object) """
+        return list(self._model_rows(model_cls.__name__))
+
+    def objects(self, model_cls):
+        """ ساخت (یا برگرداندن) همه‌ی objectهای ذخیره‌شده‌ی یک مدل """
+        get = self.get
+        return [get(model_cls, key) for key in self.keys(model_cls)]
+
+    def _resolve_refs(self, value):
+        if isinstance(value, ModelRef):
+            model_cls = self.models.get(value.model)
+            return self.get(model_cls, value.pk) if model_cls is not None else None
+        if isinstance(value, list):
+            return [self._resolve_refs(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self._resolve_refs(item) for key, item in value.items()}
+        return value
@@ -1,41 +1,608 @@
+from contextlib import contextmanager
+
 from kivy.event import EventDispatcher
-from .field import ModelField
+from .field import (
+    BooleanField,
+    ComputedField,
+    FloatField,
+    IntegerField,
+    LazyRelation,
+    ManyToManyField,
+    ModelField,
+    OneToManyField,
+    StringField,
+)
+from .query import ModelManager
+from .registry import CASCADE, PROTECT, SET_NULL, ProtectedError, relation_registry
+from .updates import update_queue
+
+
+@contextmanager
+def batch(*models):
+    """
+    تعویق و ادغام رویدادهای تغییر چند مدل تا پایان بلاک:
+        with batch(user, profile):
+            ...
+    اگر بلاک با exception تمام شود، رویدادهای جمع‌شده دور ریخته می‌شوند؛ مقادیری که قبل از خطا
+    ست شده‌اند برنمی‌گردند (rollback نیست) و dirty باقی می‌مانند.
+    """
+    for model in models:
+        model.begin_batch()
+    try:
+        yield models
+    except BaseException:
+        for model in models:
+            model.end_batch(discard = True)
+        raise
+    for model in models:
+        model.end_batch()
+
+def delete(*objs):
+    """
+    حذف گروهی مدل‌ها با اعمال on_delete روی ForeignKeyهای ورودی:
+    - CASCADE: فرزندان هم حذف می‌شوند
+    - SET_NULL: فیلد فرزند None می‌شود (رویدادها در یک batch)
+    - PROTECT: اگر فرزندی خارج از مجموعه‌ی حذف بماند، ProtectedError و هیچ تغییری اعمال نمی‌شود
+    """
+    # dict برای حفظ ترتیب و جلوگیری از تکرار
+    to_delete = {}
+    to_null = []
+    protected = []
+    stack = list(objs)
+    while stack:
+        obj = stack.pop()
+        if obj in to_delete:
+            continue
+        to_delete[obj] = None
+        for _, _, _, related_name, field in relation_registry.incoming_for_instance(obj):
+            # از طریق descriptor تا فرزندان lazy ثبت‌شده هم دیده شوند
+            children = getattr(obj, related_name)
+            if not children:
+                continue
+            if field.on_delete == CASCADE:
+                stack.extend(children)
+            elif field.on_delete == SET_NULL:
+                to_null.extend((child, field) for child in children)
+            elif field.on_delete == PROTECT:
+                protected.extend(children)
+
+    blocked = [child for child in protected if child not in to_delete]
+    if blocked:
+        raise ProtectedError(f"Cannot delete: referenced by protected {blocked[0]!r}")
+
+    to_null = [(child, field) for child, field in to_null if child not in to_delete]
+    # مثل PROTECT، بررسی None برای همه‌ی فیلدها قبل از اولین تغییر
+    for field in {field: None for _, field in to_null}:
+        field.check(None)
+    with batch(*{child: None for child, _ in to_null}):
+        for child, field in to_null:
+            field.__set__(child, None)
+
+    for obj in to_delete:
+        obj._detach()
+    for obj in to_delete:
+        obj.dispatch('on_delete')
+    return list(to_delete)
+
+
+# فیلدهایی که مقدارشان همیشه ساده است و در سریال‌سازی بدون بررسی کپی می‌شوند
+SCALAR_FIELDS = (IntegerField, StringField, BooleanField, FloatField)
+# نوع مقدار در plan سریال‌سازی
+VALUE_SCALAR, VALUE_ANY, VALUE_MANY = 0, 1, 2
+
+
+class DumpState(dict):
+    """
+    وضعیت یک dump: id(object) -> ورودی، به‌همراه شمارنده‌ی "$id" ها.
+    شناسه‌ها ترتیبی هستند (نه id()) تا خروجی برای داده‌ی یکسان همیشه یکسان باشد.
+    """
+    __slots__ = ('last_id',)
+
+    def __init__(self):
+        super().__init__()
+        self.last_id = 0
+
+    def next_id(self):
+        self.last_id += 1
+        return self.last_id
+
+
 # -------------------------
 # کلاس پایه مدل
 # -------------------------
 class BaseModel(EventDispatcher):
+    # رویداد تجمیعی: مجموعه نام فیلدهای تغییرکرده / حذف نمونه
+    __events__ = ('on_change', 'on_delete')
+
+    # جدول فیلدها یک‌بار برای هر کلاس (با در نظر گرفتن MRO) ساخته می‌شود
+    _fields = {}
+    _computed = {}
+    _initials = ()
+    _serial_plan = ()
+    _tracked = False
+
+    # وضعیت batch (فقط هنگام batch روی نمونه ست می‌شود)
+    _batch_depth = 0
+    _batch_pending = None
+    _batch_diffs = None
+    _batch_computed = None
+
+    # فیلدهای تغییرکرده -> مقدار اصلی (بعد از اولین تغییر ساخته می‌شود)
+    _original = None
+
+    # on_change فقط وقتی dispatch می‌شود که شنونده (یا هندلر override شده) داشته باشد
+    _change_observed = False
+    _change_handled = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._compile_schema()
+
+    @classmethod
+    def _compile_schema(cls):
+        """
+        ساخت schema کلاس:
+        - همه فیلدها از کل سلسله‌مراتب (فیلد فرزند، فیلد هم‌نام والد را override می‌کند)
+        - رویدادهای on_<field>_change از طریق __events__ (ثبت خودکار توسط Kivy)
+        - مقادیر پیش‌فرض (پیش‌فرض‌های mutable برای هر نمونه کپی می‌شوند)
+        """
+        fields = {}
+        computed = {}
+        for klass in reversed(cls.__mro__):
+            for attr_name, attr_value in klass.__dict__.items():
+                if isinstance(attr_value, ModelField):
+                    fields[attr_name] = attr_value
+                    computed.pop(attr_name, None)
+                elif isinstance(attr_value, ComputedField):
+                    computed[attr_name] = attr_value
+                    fields.pop(attr_name, None)
+                else:
+                    # فیلد والد با یک attribute معمولی پوشانده شده
+                    fields.pop(attr_name, None)
+                    computed.pop(attr_name, None)
+
+        events = []
+        initials = []
+        serial_plan = []
+        for name, field in fields.items():
+            if isinstance(field, SCALAR_FIELDS):
+                kind = VALUE_SCALAR
+            elif isinstance(field, (OneToManyField, ManyToManyField)):
+                kind = VALUE_MANY
+            else:
+                kind = VALUE_ANY
+            serial_plan.append((name, field, kind))
+
+            field_events = [field.event_name]
+            if kind == VALUE_MANY:
+                field_events.append(field.diff_event_name)
+            for event in field_events:
+                events.append(event)
+                # هندلر پیش‌فرض رویداد؛ اگر کلاس خودش هندلر داشته باشد دست نمی‌خورد
+                if not hasattr(cls, event):
+                    setattr(cls, event, BaseModel._on_fields_change)
+
+            default = field.default
+            copier = default.copy if isinstance(default, (list, set, dict)) else None
+            initials.append((name, field, default, copier))
+
+        for name, field in computed.items():
+            events.append(field.event_name)
+            if not hasattr(cls, field.event_name):
+                setattr(cls, field.event_name, BaseModel._on_fields_change)
+
+        cls._fields = fields
+        cls._computed = computed
+        cls._initials = tuple(initials)
+        cls._serial_plan = tuple(serial_plan)
+        cls.__events__ = tuple(events)
+        cls._change_handled = cls.on_change is not BaseModel.on_change
+
+        # identity map و ایندکس‌ها جداگانه برای هر کلاس
+        cls.objects = ModelManager(cls)
+        cls._tracked = any(field.indexed for field in fields.values())
+
     def __init__(self, **kwargs):
         super().__init__()
 
-        # ثبت همه فیلدها و تعریف رویدادها
-        self._fields = {}
-        for attr_name, attr_value in self.__class__.__dict__.items():
-            if isinstance(attr_value, ModelField):
-                self._fields[attr_name] = attr_value
-                # ثبت رویداد تغییر فیلد
-                setattr(self,f'on_{attr_name}_change', self._on_fields_change)
-                self.register_event_type(f'on_{attr_name}_change')
+        # مقدار اولیه از kwargs یا مقدار پیش‌فرض فیلد
+        for name, field, default, copier in self._initials:
+            if name in kwargs:
+                value = kwargs[name]
+            else:
+                value = copier() if copier else default
+            field.set_initial(self, value)
 
-                # مقدار اولیه از kwargs یا مقدار پیش‌فرض فیلد
-                initial_value = kwargs.get(attr_name, attr_value.default)
-                setattr(self, attr_name, initial_value)
+        # فقط مدل‌هایی که primary_key یا index دارند در Model.objects ثبت می‌شوند
+        if self._tracked:
+            self.objects.add(self)
 
-    def to_dict(self):
-        """ تبدیل مدل به دیکشنری ساده """
-        data = {}
+    @classmethod
+    def hydrate(cls, values):
+        """
+        ساخت نمونه از داده‌ی مورد اعتماد (لایه‌ی ذخیره‌سازی خودمان) بدون اعتبارسنجی فیلدها.
+        __init__ زیرکلاس‌ها اجرا نمی‌شود؛ برای ورودی کاربر/شبکه از cls(**values) استفاده کنید.
+        """
+        obj = cls.__new__(cls)
+        EventDispatcher.__init__(obj)
+        data = obj.__dict__
+        for name, field, default, copier in cls._initials:
+            if name in values:
+                value = values[name]
+            else:
+                value = copier() if copier else default
+            if field.value_types is not None:
+                # فیلد ساده: نه اعتبارسنجی و نه اتصال رابطه
+                data[name] = value
+            else:
+                field.set_trusted(obj, value)
+        if cls._tracked:
+            cls.objects.add(obj)
+        return obj
+
+    @classmethod
+    def validate_many(cls, rows):
+        """
+        اعتبارسنجی ستونی گروهی از dictها (هر فیلد یک‌بار با field.validate_many)؛
+        لیست dictهای تمیزشده برمی‌گردد و ورودی تغییر نمی‌کند.
+        """
+        result = [dict(row) for row in rows]
+        for name, field in cls._fields.items():
+            present = [row for row in result if name in row]
+            if not present:
+                continue
+            cleaned = field.validate_many([row[name] for row in present])
+            for row, value in zip(present, cleaned):
+                row[name] = value
+        return result
+
+    # -------------------------
+    # اعلان تغییرات و batch
+    # -------------------------
+    def field_changed(self, field, old_value, value):
+        """ توسط ModelField پس از تغییر مقدار صدا زده می‌شود """
+        if field.indexed:
+            self.objects.reindex(self, field, old_value, value)
+        self.invalidate_dependents(field.name)
+
+        original = self._original
+        if original is None:
+            original = self._original = {}
+        if field.name not in original:
+            original[field.name] = old_value
+        elif original[field.name] == value:
+            # برگشت به مقدار اصلی: دیگر dirty نیست
+            del original[field.name]
+
+        if self._batch_depth:
+            # فقط مقدار قبل از شروع batch نگه داشته می‌شود
+            if field.name not in self._batch_pending:
+                self._batch_pending[field.name] = (field, old_value)
+            return
+        self.dispatch(field.event_name, value)
+        if self._change_observed or self._change_handled:
+            self.dispatch('on_change', {field.name})
+
+    def computed_changed(self, field):
+        """ توسط ComputedState پس از باطل شدن کش صدا زده می‌شود (در batch تا پایان آن نگه داشته می‌شود) """
+        if self._batch_depth:
+            computed = self._batch_computed
+            if computed is None:
+                computed = self._batch_computed = {}
+            computed[field.name] = field
+            return
+        self.dispatch(field.event_name)
+
+    def invalidate_dependents(self, name):
+        """ باطل کردن ComputedFieldهایی که در آخرین محاسبه این فیلد را خوانده‌اند """
+        dependents = self.__dict__.get('_dependents')
+        if dependents:
+            states = dependents.pop(name, None)
+            if states:
+                for state in list(states):
+                    state.invalidate()
+
+    def batch(self):
+        """ with model.batch(): ... """
+        return batch(self)
+
+    def queue_update(self, **values):
+        """ تغییر فیلدها از هر thread؛ در فریم بعد روی main thread و در یک batch اعمال می‌شود """
+        update_queue.update(self, **values)
+
+    def begin_batch(self):
+        if not self._batch_depth:
+            self._batch_pending = {}
+        self._batch_depth += 1
+
+    def end_batch(self, discard = False):
+        """ پایان batch؛ با discard (خطا در بلاک) رویدادهای جمع‌شده فرستاده نمی‌شوند """
+        self._batch_depth -= 1
+        if self._batch_depth:
+            return
+
+        pending, self._batch_pending = self._batch_pending, None
+        diffs, self._batch_diffs = self._batch_diffs, None
+        computed, self._batch_computed = self._batch_computed, None
+        if discard:
+            return
+        changed = set()
+        for name, (field, original) in pending.items():
+            value = self.__dict__.get(name, field.default)
+            # فیلدی که به مقدار اولیه‌اش برگشته رویداد ندارد
+            if value != original:
+                changed.add(name)
+                self.dispatch(field.event_name, value)
+        if diffs:
+            # همه‌ی تغییرات درجای یک لیست در یک diff
+            for name, (field, ops) in diffs.items():
+                changed.add(name)
+                self.dispatch(field.diff_event_name, ops)
+        if computed:
+            for field in computed.values():
+                self.dispatch(field.event_name)
+        if changed and (self._change_observed or self._change_handled):
+            self.dispatch('on_change', changed)
+
+    def collection_will_change(self, field, snapshot):
+        """
+        پس از موفقیت اولین تغییر درجای لیست/مجموعه‌ی یک فیلد صدا زده می‌شود؛
+        snapshot (کپی قبل از تغییر) برای ردیابی dirty نگه داشته می‌شود.
+        """
+        original = self._original
+        if original is None:
+            original = self._original = {}
+        if field.name not in original:
+            original[field.name] = snapshot
+
+    def collection_changed(self, field, ops, aggregate = True):
+        """ رویداد diff برای فیلدهای چندتایی (در batch ادغام می‌شود) """
+        self.invalidate_dependents(field.name)
+        if self._batch_depth:
+            diffs = self._batch_diffs
+            if diffs is None:
+                diffs = self._batch_diffs = {}
+            entry = diffs.get(field.name)
+            if entry is None:
+                diffs[field.name] = (field, list(ops))
+            else:
+                entry[1].extend(ops)
+            return
+        self.dispatch(field.diff_event_name, ops)
+        if aggregate and (self._change_observed or self._change_handled):
+            self.dispatch('on_change', {field.name})
+
+    # -------------------------
+    # ردیابی شنونده‌های on_change
+    # -------------------------
+    def fbind(self, name, func, *args, **kwargs):
+        if name == 'on_change':
+            self._change_observed = True
+        return super().fbind(name, func, *args, **kwargs)
+
+    def bind(self, **kwargs):
+        if 'on_change' in kwargs:
+            self._change_observed = True
+        return super().bind(**kwargs)
+
+    def funbind(self, name, func, *args, **kwargs):
+        result = super().funbind(name, func, *args, **kwargs)
+        if name == 'on_change':
+            self._update_change_observed()
+        return result
+
+    def unbind(self, **kwargs):
+        result = super().unbind(**kwargs)
+        if 'on_change' in kwargs:
+            self._update_change_observed()
+        return result
+
+    def unbind_uid(self, name, uid):
+        result = super().unbind_uid(name, uid)
+        if name == 'on_change':
+            self._update_change_observed()
+        return result
+
+    def _update_change_observed(self):
+        self._change_observed = bool(self.get_property_observers('on_change'))
+
+    # -------------------------
+    # حذف
+    # -------------------------
+    def delete(self):
+        """ حذف این نمونه با اعمال on_delete روابط ورودی؛ لیست همه‌ی حذف‌شده‌ها را برمی‌گرداند """
+        return delete(self)
+
+    def _detach(self):
+        """ خروج از Model.objects و قطع روابط خروجی بدون تغییر مقادیر """
+        self.objects.discard(self)
+        data = self.__dict__
         for name, field in self._fields.items():
-            value = getattr(self, name)
-            if isinstance(value, BaseModel):
-                data[name] = value.to_dict()
+            if name not in data:
+                continue
+            if isinstance(data[name], LazyRelation):
+                field.unbind_lazy(self, data[name])
+            else:
+                field.rebind(self, data[name], None)
+
+    # -------------------------
+    # ردیابی تغییرات (dirty)
+    # -------------------------
+    def is_dirty(self):
+        return bool(self._original)
+
+    def changed_fields(self):
+        """ نام فیلدهایی که از آخرین reset_dirty تغییر کرده‌اند """
+        return set(self._original) if self._original else set()
+
+    def original_values(self):
+        """ مقدار فیلدهای تغییرکرده قبل از تغییر """
+        return dict(self._original) if self._original else {}
+
+    def reset_dirty(self, names = None):
+        """
+        بعد از ذخیره/همگام‌سازی موفق صدا زده می‌شود؛
+        با names فقط همان فیلدها پاک می‌شوند (بقیه‌ی تغییرات هنوز ذخیره نشده‌اند).
+        """
+        if names is None or not self._original:
+            self._original = None
+            return
+        for name in names:
+            self._original.pop(name, None)
+
+    def to_patch(self, names = None):
+        """
+        فقط فیلدهای تغییرکرده (یا names)؛ مقادیر ساده مثل to_dict ولی objectهای مرتبط
+        فقط با primary key (و لیستی از کلیدها برای فیلدهای چندتایی) نوشته می‌شوند.
+        """
+        if names is None:
+            if not self._original:
+                return {}
+            names = self._original
+        data = self.__dict__
+        patch = {}
+        for name in names:
+            value = data.get(name, self._fields[name].default)
+            if isinstance(value, LazyRelation):
+                # کلید(ها) بدون بارگذاری رابطه
+                key = value.key
+                patch[name] = list(key) if isinstance(key, (list, tuple)) else key
+            elif isinstance(value, BaseModel):
+                patch[name] = value._patch_key()
             elif isinstance(value, (list, set)):
-                data[name] = [v.to_dict() if isinstance(v, BaseModel) else v for v in value]
+                patch[name] = [item._patch_key() if isinstance(item, BaseModel) else item for item in value]
             else:
-                data[name] = value
+                patch[name] = value
+        return patch
+
+    def _patch_key(self):
+        """ primary key برای patch؛ مدل بدون primary key کامل (to_dict) نوشته می‌شود """
+        pk_name = self.objects.pk_name
+        if pk_name is None:
+            return self.to_dict()
+        return self.__dict__.get(pk_name)
+
+    # -------------------------
+    # سریال‌سازی
+    # -------------------------
+    @staticmethod
+    def _plain(value, seen, tag_all = False):
+        if isinstance(value, BaseModel):
+            return value._dump(seen, tag_all)
+        if isinstance(value, (list, set)):
+            return [v._dump(seen, tag_all) if isinstance(v, BaseModel) else v for v in value]
+        return value
+
+    def _dump(self, seen, tag_all = False):
+        """
+        تبدیل به dict با plan کامپایل‌شده‌ی کلاس؛ seen یک DumpState است.
+        فقط چرخه‌ها (object ی که هنوز روی پشته‌ی بازگشت است، مثلاً ForeignKey دوطرفه)
+        به‌صورت {"$ref": n} نوشته می‌شوند و dict آن object "$id" می‌گیرد؛ ارجاع مشترک
+        بدون چرخه کامل تکرار می‌شود. با tag_all همه‌ی dictها از ابتدا "$id" دارند و هر
+        حضور بعدی $ref است (برای stream).
+        """
+        key = id(self)
+        entry = seen.get(key)
+        if entry is not None:
+            if tag_all:
+                return {'$ref': entry[0]}
+            if '$id' not in entry:
+                entry['$id'] = seen.next_id()
+            return {'$ref': entry['$id']}
+        if tag_all:
+            # در حالت stream خود object (نه dict) نگه داشته می‌شود تا dictهای نوشته‌شده آزاد شوند
+            data = {'$id': seen.next_id()}
+            seen[key] = (data['$id'], self)
+        else:
+            data = seen[key] = {}
+        plain = self._plain
+        values = self.__dict__
+        for name, field, kind in self._serial_plan:
+            if kind == VALUE_SCALAR:
+                data[name] = values.get(name, field.default)
+            else:
+                data[name] = plain(getattr(self, name), seen, tag_all)
+        if not tag_all:
+            # خروج از پشته‌ی بازگشت
+            del seen[key]
         return data
 
+    def to_dict(self):
+        """ تبدیل مدل به دیکشنری ساده """
+        return self._dump(DumpState())
+
+    @classmethod
+    def _load(cls, data, refs, trusted = False):
+        ref = data.get('$ref')
+        if ref is not None:
+            return refs[ref]
+
+        scalars = {}
+        relations = []
+        for name, field, kind in cls._serial_plan:
+            if name not in data:
+                continue
+            if kind == VALUE_SCALAR:
+                scalars[name] = data[name]
+            else:
+                relations.append((field, kind, data[name]))
+
+        pk_name = cls.objects.pk_name
+        existing = cls.objects.get_by_pk(scalars.get(pk_name)) if pk_name else None
+        if existing is not None:
+            if '$id' in data:
+                refs[data['$id']] = existing
+            with batch(existing):
+                for name, value in scalars.items():
+                    setattr(existing, name, value)
+                for field, kind, value in relations:
+                    setattr(existing, field.name, cls._load_value(field, kind, value, refs, trusted))
+            return existing
+
+        # ساخت مستقیم: بدون dispatch و بدون ثبت تغییر
+        obj = cls.hydrate(scalars) if trusted else cls(**scalars)
+        if '$id' in data:
+            refs[data['$id']] = obj
+        for field, kind, value in relations:
+            value = cls._load_value(field, kind, value, refs, trusted)
+            if trusted:
+                field.set_trusted(obj, value)
+            else:
+                field.set_initial(obj, value)
+        return obj
+
+    @staticmethod
+    def _load_value(field, kind, value, refs, trusted = False):
+        target = getattr(field, 'to', None)
+        if not (isinstance(target, type) and issubclass(target, BaseModel)):
+            return value
+        if kind == VALUE_MANY:
+            return [target._load(item, refs, trusted) if isinstance(item, dict) else item for item in value or ()]
+        return target._load(value, refs, trusted) if isinstance(value, dict) else value
+
+    @classmethod
+    def from_dict(cls, data, trusted = False):
+        """
+        ساخت (یا به‌روزرسانی نمونه‌ی موجود با همان primary_key) از خروجی to_dict.
+        trusted=True فقط برای داده‌ای که خودمان نوشته‌ایم: اعتبارسنجی فیلدها انجام نمی‌شود.
+        """
+        return cls._load(data, {}, trusted)
+
+    @classmethod
+    def from_dicts(cls, items, trusted = False):
+        """ ساخت گروهی؛ "$ref" ها بین همه‌ی آیتم‌ها resolve می‌شوند """
+        refs = {}
+        return [cls._load(data, refs, trusted) for data in items]
+
     def __repr__(self):
         field_values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._fields)
         return f"<{self.__class__.__name__} {field_values}>"
 
     def _on_fields_change(self,*args):
-        pass
\ No newline at end of file
+        pass
+
+    def on_change(self, changed):
+        pass
+
+    def on_delete(self):
+        pass
@@ -0,0 +1,288 @@
+import weakref
+from difflib import SequenceMatcher
+
+
+# -------------------------
+# عملیات diff
+# -------------------------
+# ('insert', index, items)            درج items از index
+# ('remove', index, items)            حذف len(items) آیتم از index
+# ('replace', index, old, new)        جایگزینی old با new از index
+# ('move', from_index, to_index)      جابجایی یک آیتم
+# ('reset', items)                    محتوای کامل جدید (sort / reverse)
+# ('add', items) / ('discard', items) برای set
+# عملیات به ترتیب روی لیست قبلی اعمال می‌شوند.
+
+
+def diff_lists(old, new):
+    """ کمترین diff بین دو لیست (مقایسه با identity/hash آیتم‌ها) """
+    ops = []
+    matcher = SequenceMatcher(None, old, new, autojunk = False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'insert':
+            ops.append(('insert', j1, new[j1:j2]))
+        elif tag == 'delete':
+            ops.append(('remove', j1, old[i1:i2]))
+        elif tag == 'replace':
+            ops.append(('replace', j1, old[i1:i2], new[j1:j2]))
+    return ops
+
+
+def diff_sets(old, new):
+    ops = []
+    removed = [item for item in old if item not in new]
+    added = [item for item in new if item not in old]
+    if removed:
+        ops.append(('discard', removed))
+    if added:
+        ops.append(('add', added))
+    return ops
+
+
+class ObservableMixin:
+    """
+    پایه‌ی مشترک لیست/مجموعه‌ی مشاهده‌پذیر یک فیلد رابطه‌ای:
+    قبل از تغییر یک snapshot گرفته می‌شود و فقط اگر تغییر موفق بود
+    collection_will_change (ثبت dirty) و collection_changed روی مدل مالک صدا زده می‌شوند.
+    """
+
+    def _attach(self, owner, field):
+        self._owner_ref = weakref.ref(owner) if owner is not None else None
+        self._field = field
+
+    def _owner(self):
+        return self._owner_ref() if self._owner_ref is not None else None
+
+    def _check(self, items):
+        field = self._field
+        if field is not None:
+            field.validate_items(items)
+        return items
+
+    def _before(self):
+        """
+        (مالک، snapshot) قبل از تغییر؛ snapshot فقط وقتی گرفته می‌شود که فیلد هنوز dirty نیست.
+        اگر خود عملیات خطا بدهد (مثلاً pop روی لیست خالی) چیزی ثبت نمی‌شود.
+        """
+        owner = self._owner()
+        if owner is None:
+            return None
+        original = owner._original
+        if original is not None and self._field.name in original:
+            return owner, None
+        return owner, self.copy()
+
+    def _after(self, state, ops, added = (), removed = ()):
+        if state is None or not ops:
+            return
+        owner, snapshot = state
+        field = self._field
+        if snapshot is not None:
+            owner.collection_will_change(field, snapshot)
+        for item in removed:
+            field.unbind_related(owner, item)
+        for item in added:
+            field.bind_related(owner, item)
+        owner.collection_changed(field, ops)
+
+
+# -------------------------
+# لیست مشاهده‌پذیر
+# -------------------------
+class ObservableList(ObservableMixin, list):
+    """ لیست مقادیر OneToManyField با رویداد diff برای هر تغییر درجا """
+
+    def __init__(self, iterable = (), owner = None, field = None):
+        super().__init__(iterable)
+        self._attach(owner, field)
+
+    def append(self, item):
+        self._check((item,))
+        state = self._before()
+        super().append(item)
+        self._after(state, [('insert', len(self) - 1, [item])], added = (item,))
+
+    def extend(self, items):
+        items = self._check(list(items))
+        state = self._before()
+        index = len(self)
+        super().extend(items)
+        self._after(state, [('insert', index, items)], added = items)
+
+    def __iadd__(self, items):
+        self.extend(items)
+        return self
+
+    def __imul__(self, count):
+        if count <= 0:
+            self.clear()
+        elif count > 1:
+            self.extend(list(self) * (count - 1))
+        return self
+
+    def insert(self, index, item):
+        self._check((item,))
+        state = self._before()
+        index = min(max(index + len(self) if index < 0 else index, 0), len(self))
+        super().insert(index, item)
+        self._after(state, [('insert', index, [item])], added = (item,))
+
+    def pop(self, index = -1):
+        state = self._before()
+        size = len(self)
+        # خود list اندیس خارج از بازه را با IndexError رد می‌کند؛ اندیس منفی فقط برای op عادی می‌شود
+        item = super().pop(index)
+        self._after(state, [('remove', index + size if index < 0 else index, [item])], removed = (item,))
+        return item
+
+    def remove(self, item):
+        self.pop(self.index(item))
+
+    def clear(self):
+        state = self._before()
+        items = list(self)
+        super().clear()
+        if items:
+            self._after(state, [('remove', 0, items)], removed = items)
+
+    def move(self, from_index, to_index):
+        """ جابجایی یک آیتم بدون حذف/درج رابطه """
+        state = self._before()
+        size = len(self)
+        item = super().pop(from_index)
+        super().insert(to_index, item)
+        # اندیس‌های op همیشه نامنفی و همان جایی که insert واقعاً گذاشت
+        from_index = from_index + size if from_index < 0 else from_index
+        to_index = min(max(to_index + size - 1 if to_index < 0 else to_index, 0), size - 1)
+        self._after(state, [('move', from_index, to_index)])
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            value = self._check(list(value))
+            state = self._before()
+            old = self[index]
+            super().__setitem__(index, value)
+            if step == 1:
+                ops = [('replace', start, old, value)]
+            else:
+                ops = [('reset', list(self))]
+            self._after(state, ops, added = value, removed = old)
+            return
+        self._check((value,))
+        state = self._before()
+        old = self[index]
+        super().__setitem__(index, value)
+        index = index + len(self) if index < 0 else index
+        self._after(state, [('replace', index, [old], [value])], added = (value,), removed = (old,))
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            state = self._before()
+            old = self[index]
+            super().__delitem__(index)
+            ops = [('remove', start, old)] if step == 1 else [('reset', list(self))]
+            self._after(state, ops, removed = old)
+            return
+        self.pop(index)
+
+    def sort(self, *args, **kwargs):
+        state = self._before()
+        super().sort(*args, **kwargs)
+        self._after(state, [('reset', list(self))])
+
+    def reverse(self):
+        state = self._before()
+        super().reverse()
+        self._after(state, [('reset', list(self))])
+
+
+# -------------------------
+# مجموعه‌ی مشاهده‌پذیر
+# -------------------------
+class ObservableSet(ObservableMixin, set):
+    """ مجموعه‌ی مقادیر ManyToManyField با رویداد add / discard """
+
+    def __init__(self, iterable = (), owner = None, field = None):
+        super().__init__(iterable)
+        self._attach(owner, field)
+
+    def add(self, item):
+        if item in self:
+            return
+        self._check((item,))
+        state = self._before()
+        super().add(item)
+        self._after(state, [('add', [item])], added = (item,))
+
+    def update(self, *iterables):
+        added = [item for iterable in iterables for item in iterable if item not in self]
+        added = self._check(list(dict.fromkeys(added)))
+        if not added:
+            return
+        state = self._before()
+        super().update(added)
+        self._after(state, [('add', added)], added = added)
+
+    def __ior__(self, items):
+        self.update(items)
+        return self
+
+    def discard(self, item):
+        if item not in self:
+            return
+        state = self._before()
+        super().discard(item)
+        self._after(state, [('discard', [item])], removed = (item,))
+
+    def remove(self, item):
+        if item not in self:
+            raise KeyError(item)
+        self.discard(item)
+
+    def pop(self):
+        state = self._before()
+        item = super().pop()
+        self._after(state, [('discard', [item])], removed = (item,))
+        return item
+
+    def difference_update(self, *iterables):
+        removed = [item for iterable in iterables for item in iterable if item in self]
+        removed = list(dict.fromkeys(removed))
+        if not removed:
+            return
+        state = self._before()
+        super().difference_update(removed)
+        self._after(state, [('discard', removed)], removed = removed)
+
+    def __isub__(self, items):
+        self.difference_update(items)
+        return self
+
+    def intersection_update(self, *iterables):
+        keep = set(self).intersection(*iterables)
+        self.difference_update([item for item in self if item not in keep])
+
+    def __iand__(self, items):
+        self.intersection_update(items)
+        return self
+
+    def symmetric_difference_update(self, items):
+        items = set(items)
+        removed = [item for item in items if item in self]
+        added = [item for item in items if item not in self]
+        self.difference_update(removed)
+        self.update(added)
+
+    def __ixor__(self, items):
+        self.symmetric_difference_update(items)
+        return self
+
+    def clear(self):
+        if not self:
+            return
+        state = self._before()
+        removed = list(self)
+        super().clear()
+        self._after(state, [('discard', removed)], removed = removed)
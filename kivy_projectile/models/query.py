@@ -0,0 +1,455 @@
+import operator
+import weakref
+from bisect import bisect_left, bisect_right
+from itertools import chain
+
+
+# بزرگ‌ترین کاراکتر یونیکد برای جست‌وجوی پیشوندی روی ایندکس مرتب
+_MAX_CHAR = "\U0010ffff"
+
+LOOKUP_OPS = {
+    'exact': operator.eq,
+    'ne': operator.ne,
+    'lt': operator.lt,
+    'lte': operator.le,
+    'gt': operator.gt,
+    'gte': operator.ge,
+    'in': lambda value, choices: value in choices,
+    'startswith': lambda value, prefix: value.startswith(prefix),
+    'contains': lambda value, part: part in value,
+    'isnull': lambda value, flag: (value is None) == flag,
+}
+
+
+def _match(value, op, expected):
+    if value is None and op not in ('exact', 'ne', 'isnull', 'in'):
+        return False
+    return LOOKUP_OPS[op](value, expected)
+
+
+# -------------------------
+# ایندکس‌ها
+# -------------------------
+class HashIndex:
+    """
+    ایندکس hash: مقدار -> مجموعه‌ی objectها (برای exact / in / isnull).
+    سطل‌ها WeakSet هستند تا ایندکس نمونه‌ها را زنده نگه ندارد.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.buckets = {}
+
+    def add(self, obj, value):
+        bucket = self.buckets.get(value)
+        if bucket is None:
+            bucket = self.buckets[value] = weakref.WeakSet()
+        bucket.add(obj)
+
+    def remove(self, obj, value):
+        bucket = self.buckets.get(value)
+        if bucket is not None:
+            bucket.discard(obj)
+            if not bucket:
+                del self.buckets[value]
+
+    def lookup(self, op, value):
+        """ مجموعه‌ی نتیجه (فقط خواندنی) یا None اگر این ایندکس جواب نمی‌دهد """
+        if op == 'exact':
+            return self.buckets.get(value, ())
+        if op == 'in':
+            result = set()
+            for item in value:
+                result.update(self.buckets.get(item, ()))
+            return result
+        if op == 'isnull' and value:
+            return self.buckets.get(None, ())
+        return None
+
+
+class SortedIndex:
+    """
+    ایندکس مرتب: کلیدها و objectها در دو لیست موازی مرتب نگه داشته می‌شوند
+    (برای بازه‌ها، startswith و order_by). مقادیر None جدا نگه داشته می‌شوند.
+    افزودن‌ها تا اولین خواندن بافر می‌شوند تا ساخت انبوه O(n log n) بماند.
+    objectها با weakref نگه داشته می‌شوند؛ ورودی‌های مرده در خواندن بعدی جمع می‌شوند.
+    """
+    # تا این تعداد افزودن معلق، درج تکی با bisect ارزان‌تر از sort دوباره است
+    INSORT_LIMIT = 64
+
+    def __init__(self, name):
+        self.name = name
+        self.keys = []
+        self.objs = []
+        self.nulls = weakref.WeakSet()
+        self.pending = []
+        # تعداد weakref هایی که objectشان از بین رفته و هنوز از لیست‌ها حذف نشده‌اند
+        self._dead = 0
+
+    def __len__(self):
+        self._flush()
+        return len(self.objs) + len(self.nulls)
+
+    def _collect(self, ref):
+        # callback ی weakref؛ حین gc لیست‌ها تغییر نمی‌کنند، فقط شمارش می‌شود
+        self._dead += 1
+
+    def add(self, obj, value):
+        if value is None:
+            self.nulls.add(obj)
+        else:
+            self.pending.append((value, weakref.ref(obj, self._collect)))
+
+    def remove(self, obj, value):
+        if value is None:
+            self.nulls.discard(obj)
+            return
+        objs = self.objs
+        for index in range(bisect_left(self.keys, value), bisect_right(self.keys, value)):
+            if objs[index]() is obj:
+                del self.keys[index]
+                del objs[index]
+                return
+        pending = self.pending
+        for index in range(len(pending) - 1, -1, -1):
+            if pending[index][1]() is obj:
+                del pending[index]
+                return
+
+    def _purge(self):
+        """ حذف ورودی‌هایی که objectشان جمع‌آوری شده است """
+        self._dead = 0
+        pairs = [(value, ref) for value, ref in zip(self.keys, self.objs) if ref() is not None]
+        self.keys = [value for value, _ in pairs]
+        self.objs = [ref for _, ref in pairs]
+        self.pending = [(value, ref) for value, ref in self.pending if ref() is not None]
+
+    def _flush(self):
+        if self._dead:
+            self._purge()
+        pending = self.pending
+        if not pending:
+            return
+        self.pending = []
+        keys, objs = self.keys, self.objs
+        if len(pending) <= self.INSORT_LIMIT:
+            for value, obj in pending:
+                index = bisect_right(keys, value)
+                keys.insert(index, value)
+                objs.insert(index, obj)
+            return
+        pairs = sorted(chain(zip(keys, objs), pending), key = operator.itemgetter(0))
+        self.keys = [value for value, _ in pairs]
+        self.objs = [obj for _, obj in pairs]
+
+    def _range(self, op, value):
+        keys = self.keys
+        if op == 'exact':
+            return bisect_left(keys, value), bisect_right(keys, value)
+        if op == 'lt':
+            return 0, bisect_left(keys, value)
+        if op == 'lte':
+            return 0, bisect_right(keys, value)
+        if op == 'gt':
+            return bisect_right(keys, value), len(keys)
+        if op == 'gte':
+            return bisect_left(keys, value), len(keys)
+        if op == 'startswith':
+            return bisect_left(keys, value), bisect_left(keys, value + _MAX_CHAR)
+        return None
+
+    def lookup(self, op, value):
+        if op == 'isnull' and value:
+            return self.nulls
+        self._flush()
+        if op == 'in':
+            result = set()
+            for item in value:
+                lo, hi = self._range('exact', item)
+                result.update(_alive(self.objs[lo:hi]))
+            return result
+        bounds = self._range(op, value)
+        if bounds is None:
+            return None
+        lo, hi = bounds
+        return set(_alive(self.objs[lo:hi]))
+
+    def ordered(self, reverse = False):
+        """ همه‌ی objectها به ترتیب کلید؛ None ها همیشه در انتها """
+        self._flush()
+        refs = reversed(self.objs) if reverse else self.objs
+        yield from _alive(refs)
+        yield from list(self.nulls)
+
+
+def _alive(refs):
+    """ objectهای زنده‌ی یک دنباله از weakref ها """
+    for ref in refs:
+        obj = ref()
+        if obj is not None:
+            yield obj
+
+
+INDEX_TYPES = {
+    True: HashIndex,
+    'hash': HashIndex,
+    'sorted': SortedIndex,
+}
+
+
+# -------------------------
+# QuerySet
+# -------------------------
+class QuerySet:
+    """
+    کوئری تنبل روی نمونه‌های زنده‌ی یک مدل:
+        Book.objects.filter(title__startswith="py", year__gte=2000).order_by("-year")
+    شرط‌هایی که ایندکس دارند با ایندکس و بقیه با پیمایش نتیجه‌ی محدودشده بررسی می‌شوند.
+    """
+
+    def __init__(self, manager, conditions = (), ordering = ()):
+        self.manager = manager
+        self.conditions = tuple(conditions)
+        self.ordering = tuple(ordering)
+        self._result = None
+
+    def _parse(self, lookup, value):
+        name, sep, op = lookup.rpartition('__')
+        if not sep or op not in LOOKUP_OPS:
+            name, op = lookup, 'exact'
+        if name not in self.manager.model_cls._fields:
+            raise KeyError(f"{self.manager.model_cls.__name__} has no field {name!r}")
+        key = self.manager.query_keys.get(name)
+        if key is not None and op not in ('isnull', 'startswith', 'contains'):
+            value = [key(item) for item in value] if op == 'in' else key(value)
+        return name, op, value
+
+    def filter(self, **lookups):
+        conditions = self.conditions + tuple(self._parse(k, v) for k, v in lookups.items())
+        return QuerySet(self.manager, conditions, self.ordering)
+
+    def order_by(self, *names):
+        for name in names:
+            if name.lstrip('-') not in self.manager.model_cls._fields:
+                raise KeyError(f"{self.manager.model_cls.__name__} has no field {name.lstrip('-')!r}")
+        return QuerySet(self.manager, self.conditions, names)
+
+    def all(self):
+        return QuerySet(self.manager, self.conditions, self.ordering)
+
+    # -------------------------
+    # اجرا
+    # -------------------------
+    def _candidates(self):
+        manager = self.manager
+        found = []
+        residual = []
+        for condition in self.conditions:
+            result = manager.lookup(*condition)
+            if result is None:
+                residual.append(condition)
+            else:
+                found.append(result)
+
+        if found:
+            # اشتراک از کوچک‌ترین مجموعه شروع می‌شود
+            found.sort(key = len)
+            items = set(found[0]).intersection(*found[1:])
+        else:
+            items = None
+
+        if residual:
+            source = manager.instances if items is None else items
+            value_of = manager.value_of
+            items = [
+                obj for obj in source
+                if all(_match(value_of(obj, name), op, value) for name, op, value in residual)
+            ]
+        return items
+
+    def _evaluate(self):
+        if self._result is not None:
+            return self._result
+        items = self._candidates()
+        manager = self.manager
+
+        if not self.ordering:
+            result = list(manager.instances if items is None else items)
+        elif items is None and len(self.ordering) == 1 and isinstance(
+                manager.indexes.get(self.ordering[0].lstrip('-')), SortedIndex):
+            # بدون شرط: پیمایش مستقیم ایندکس مرتب، بدون sort
+            name = self.ordering[0]
+            result = list(manager.indexes[name.lstrip('-')].ordered(reverse = name.startswith('-')))
+        else:
+            result = list(manager.instances if items is None else items)
+            # sort پایدار از آخرین کلید به اولین؛ None ها همیشه در انتها
+            value_of = manager.value_of
+            for name in reversed(self.ordering):
+                reverse = name.startswith('-')
+                name = name.lstrip('-')
+
+                def key(obj, name = name, reverse = reverse):
+                    value = value_of(obj, name)
+                    return (value is not None, value) if reverse else (value is None, value)
+
+                result.sort(key = key, reverse = reverse)
+
+        self._result = result
+        return result
+
+    def __iter__(self):
+        return iter(self._evaluate())
+
+    def __len__(self):
+        return len(self._evaluate())
+
+    def __getitem__(self, index):
+        return self._evaluate()[index]
+
+    def __repr__(self):
+        return f"<QuerySet {self._evaluate()!r}>"
+
+    def count(self):
+        return len(self._evaluate())
+
+    def exists(self):
+        return bool(self._evaluate())
+
+    def first(self):
+        result = self._evaluate()
+        return result[0] if result else None
+
+    def get(self, **lookups):
+        result = self.filter(**lookups)._evaluate() if lookups else self._evaluate()
+        if len(result) != 1:
+            raise LookupError(
+                f"{self.manager.model_cls.__name__}.get() returned {len(result)} objects"
+            )
+        return result[0]
+
+
+# -------------------------
+# مدیر مدل (identity map + ایندکس‌ها)
+# -------------------------
+class ModelManager:
+    """
+    برای هر کلاس مدل (Model.objects):
+    - identity map بر اساس فیلد primary_key
+    - ایندکس‌های hash/مرتب برای فیلدهای index=True / index='sorted'
+    ایندکس‌ها از طریق BaseModel.field_changed به‌صورت افزایشی به‌روز می‌شوند.
+    همه‌ی ارجاع‌ها ضعیف هستند: نمونه‌ای که جای دیگری نگه داشته نشود خودبه‌خود حذف می‌شود.
+    """
+
+    def __init__(self, model_cls):
+        self.model_cls = model_cls
+        self.pk_name = None
+        self.identity = weakref.WeakValueDictionary()
+        self.indexes = {}
+        # WeakKeyDictionary به‌جای WeakSet تا ترتیب ساخت حفظ شود
+        self.instances = weakref.WeakKeyDictionary()
+        self.defaults = {}
+        # فیلد -> تابع تبدیل مقدار برای مقایسه (مثلاً ForeignKey: کلید اصلی مقصد، حتی اگر lazy باشد)
+        self.query_keys = {}
+
+        for name, field in model_cls._fields.items():
+            self.defaults[name] = field.default
+            query_key = getattr(field, 'query_key', None)
+            if query_key is not None:
+                self.query_keys[name] = query_key
+            if field.primary_key:
+                self.pk_name = name
+            if field.index:
+                self.indexes[name] = INDEX_TYPES[field.index](name)
+
+    def value_of(self, obj, name):
+        """ مقدار فیلد برای کوئری/ایندکس، بدون بارگذاری رابطه‌های lazy """
+        value = obj.__dict__.get(name, self.defaults[name])
+        key = self.query_keys.get(name)
+        return key(value) if key is not None else value
+
+    def add(self, obj):
+        if obj in self.instances:
+            return
+        data = obj.__dict__
+        if self.pk_name is not None:
+            pk = data.get(self.pk_name)
+            if pk is not None:
+                existing = self.identity.get(pk)
+                if existing is not None and existing is not obj:
+                    raise ValueError(f"Duplicate {self.model_cls.__name__} primary key: {pk!r}")
+                self.identity[pk] = obj
+        self.instances[obj] = None
+        for name, index in self.indexes.items():
+            index.add(obj, self.value_of(obj, name))
+
+    def discard(self, obj):
+        if obj not in self.instances:
+            return
+        del self.instances[obj]
+        data = obj.__dict__
+        if self.pk_name is not None:
+            pk = data.get(self.pk_name)
+            if self.identity.get(pk) is obj:
+                del self.identity[pk]
+        for name, index in self.indexes.items():
+            index.remove(obj, self.value_of(obj, name))
+
+    def check_pk(self, obj, value):
+        """
+        توسط ModelField.__set__ پیش از نوشتن primary_key جدید صدا زده می‌شود
+        تا مقدار تکراری قبل از هر تغییر (rebind، observerها) رد شود.
+        """
+        if value is None or obj not in self.instances:
+            return
+        existing = self.identity.get(value)
+        if existing is not None and existing is not obj:
+            raise ValueError(f"Duplicate {self.model_cls.__name__} primary key: {value!r}")
+
+    def reindex(self, obj, field, old_value, value):
+        if obj not in self.instances:
+            return
+        name = field.name
+        if name == self.pk_name:
+            if self.identity.get(old_value) is obj:
+                del self.identity[old_value]
+            if value is not None:
+                self.identity[value] = obj
+        index = self.indexes.get(name)
+        if index is not None:
+            key = self.query_keys.get(name)
+            if key is not None:
+                old_value, value = key(old_value), key(value)
+            index.remove(obj, old_value)
+            index.add(obj, value)
+
+    def lookup(self, name, op, value):
+        """ مجموعه‌ی نتیجه از identity map یا ایندکس؛ None یعنی نیاز به پیمایش """
+        if name == self.pk_name and op in ('exact', 'in'):
+            if op == 'exact':
+                obj = self.identity.get(value)
+                return (obj,) if obj is not None else ()
+            identity = self.identity
+            return {obj for obj in map(identity.get, value) if obj is not None}
+        index = self.indexes.get(name)
+        return index.lookup(op, value) if index is not None else None
+
+    # -------------------------
+    # API کوئری
+    # -------------------------
+    def get_by_pk(self, pk, default = None):
+        return self.identity.get(pk, default)
+
+    def all(self):
+        return QuerySet(self)
+
+    def filter(self, **lookups):
+        return QuerySet(self).filter(**lookups)
+
+    def order_by(self, *names):
+        return QuerySet(self).order_by(*names)
+
+    def get(self, **lookups):
+        return QuerySet(self).get(**lookups)
+
+    def count(self):
+        return len(self.instances)
@@ -2,6 +2,15 @@
 from collections import defaultdict
 from typing import List, Tuple, Type
 
+# رفتارهای on_delete برای ForeignKey
+CASCADE = "cascade"
+SET_NULL = "set_null"
+PROTECT = "protect"
+
+
+class ProtectedError(ValueError):
+    pass
+
 class RelationRegistry:
     """
     ثبت روابط ForeignKey برای اینکه:
@@ -24,5 +33,12 @@ class RelationRegistry:
         """روابطی که به model_cls اشاره می‌کنند."""
         return list(self._by_to_model.get(model_cls, []))
 
+    def incoming_for_instance(self, obj) -> List[Tuple[type, str, type, str, object]]:
+        """روابطی که به کلاس obj یا یکی از کلاس‌های والدش اشاره می‌کنند."""
+        entries = []
+        for klass in type(obj).__mro__:
+            entries.extend(self._by_to_model.get(klass, ()))
+        return entries
+
 # singleton
 relation_registry = RelationRegistry()
@@ -0,0 +1,85 @@
+import json
+
+from .model import DumpState
+
+# اندازه‌ی هر بار خواندن از فایل
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = " \t\n\r"
+
+
+def iter_json_array(fp, chunk_size = CHUNK_SIZE):
+    """
+    پیمایش آیتم‌های یک آرایه‌ی JSON سطح بالا از فایل، بدون ساختن کل لیست در حافظه.
+    فقط بافر آیتم جاری نگه داشته می‌شود.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = fp.read(chunk_size)
+        if not chunk:
+            eof = True
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    def skip(chars):
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in chars:
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            fill()
+
+    skip(_WHITESPACE)
+    if buffer[pos:pos + 1] != "[":
+        raise ValueError("Expected a JSON array")
+    pos += 1
+
+    while True:
+        skip(_WHITESPACE + ",")
+        if pos >= len(buffer):
+            raise ValueError("Unterminated JSON array")
+        if buffer[pos] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            fill()
+            continue
+        if end == len(buffer) and not eof:
+            # ممکن است یک عدد در مرز chunk بریده شده باشد
+            fill()
+            continue
+        pos = end
+        yield item
+
+
+def dump_json(objs, fp):
+    """
+    نوشتن stream گونه‌ی مدل‌ها به‌صورت آرایه‌ی JSON؛ هر object جداگانه نوشته می‌شود.
+    همه‌ی dictها "$id" دارند تا ارجاع‌های بعدی ("$ref") بدون بازنویسی قابل resolve باشند.
+    """
+    seen = DumpState()
+    fp.write("[")
+    for index, obj in enumerate(objs):
+        if index:
+            fp.write(",")
+        json.dump(obj._dump(seen, tag_all = True), fp)
+    fp.write("]")
+
+
+def load_json(model_cls, fp, chunk_size = CHUNK_SIZE, trusted = False):
+    """
+    ساخت stream گونه‌ی مدل‌ها از آرایه‌ی JSON (مثلاً پاسخ کش‌شده‌ی API).
+    trusted=True برای فایل‌هایی که خود dump_json نوشته است (بدون اعتبارسنجی).
+    """
+    refs = {}
+    for data in iter_json_array(fp, chunk_size):
+        yield model_cls._load(data, refs, trusted)
@@ -0,0 +1,397 @@
+import json
+import queue
+import sqlite3
+import threading
+import weakref
+
+from kivy.clock import Clock
+
+from .field import (
+    BooleanField,
+    FloatField,
+    ForeignKey,
+    IntegerField,
+    LazyRelation,
+    ManyToManyField,
+    OneToManyField,
+    StringField,
+)
+
+# محدودیت تعداد پارامتر در هر کوئری SQLite
+MAX_VARIABLES = 900
+
+
+# -------------------------
+# نگاشت فیلد -> ستون
+# -------------------------
+def _encode_bool(value):
+    return None if value is None else int(value)
+
+
+def _decode_bool(value):
+    return None if value is None else bool(value)
+
+
+# (کلاس فیلد، نوع ستون، encode، decode)؛ ترتیب مهم است (اولین تطابق)
+COLUMN_TYPES = (
+    (BooleanField, "INTEGER", _encode_bool, _decode_bool),
+    (IntegerField, "INTEGER", None, None),
+    (FloatField, "REAL", None, None),
+    (StringField, "TEXT", None, None),
+)
+
+
+class TableSpec:
+    """ نگاشت یک کلاس مدل به جدول (یک‌بار برای هر کلاس ساخته می‌شود) """
+
+    def __init__(self, storage, model_cls):
+        self.model_cls = model_cls
+        self.table = getattr(model_cls, "table_name", None) or model_cls.__name__.lower()
+        self.pk = model_cls.objects.pk_name
+        if self.pk is None:
+            raise ValueError(f"{model_cls.__name__} needs a primary_key field to be stored")
+
+        self.columns = []
+        self.encoders = []
+        self.decoders = []
+        definitions = []
+        for name, field in model_cls._fields.items():
+            sql_type, encode, decode = self._column_for(storage, field)
+            self.columns.append(name)
+            self.encoders.append(encode)
+            self.decoders.append(decode)
+            constraint = " PRIMARY KEY" if name == self.pk else ""
+            definitions.append(f'"{name}" {sql_type}{constraint}')
+
+        quoted = ", ".join(f'"{name}"' for name in self.columns)
+        updates = ", ".join(f'"{name}" = excluded."{name}"' for name in self.columns if name != self.pk)
+        self.create_sql = f'CREATE TABLE IF NOT EXISTS "{self.table}" ({", ".join(definitions)})'
+        self.upsert_sql = (
+            f'INSERT INTO "{self.table}" ({quoted}) VALUES ({", ".join("?" * len(self.columns))}) '
+            f'ON CONFLICT("{self.pk}") DO '
+            + (f"UPDATE SET {updates}" if updates else "NOTHING")
+        )
+        self.select_sql = f'SELECT {quoted} FROM "{self.table}"'
+        self.delete_sql = f'DELETE FROM "{self.table}" WHERE "{self.pk}" = ?'
+        self._update_sql = {}
+
+    def _column_for(self, storage, field):
+        if isinstance(field, ForeignKey):
+            target = field.to
+            return "", _relation_key_encoder(), _lazy_decoder(storage.get, target)
+        if isinstance(field, (OneToManyField, ManyToManyField)):
+            target = field.to
+            container = set if isinstance(field, ManyToManyField) else list
+            return "TEXT", _relation_keys_encoder(), _lazy_decoder(storage.get_many, target, container)
+        for field_cls, sql_type, encode, decode in COLUMN_TYPES:
+            if isinstance(field, field_cls):
+                return sql_type, encode, decode
+        return "", None, None
+
+    def encode_column(self, obj, name):
+        """ مقدار فعلی یک ستون، همان‌طور که نوشته می‌شود """
+        value = obj.__dict__.get(name, obj._fields[name].default)
+        encode = self.encoders[self.columns.index(name)]
+        return encode(value) if encode else value
+
+    def encode(self, obj):
+        data = obj.__dict__
+        row = []
+        for name, encode in zip(self.columns, self.encoders):
+            value = data.get(name, obj._fields[name].default)
+            row.append(encode(value) if encode else value)
+        return row
+
+    def encode_update(self, obj, names):
+        """ (sql, ردیف) برای UPDATE فقط ستون‌های داده‌شده؛ sql برای هر ترکیب ستون‌ها کش می‌شود """
+        names = tuple(name for name in self.columns if name in names)
+        sql = self._update_sql.get(names)
+        if sql is None:
+            assignments = ", ".join(f'"{name}" = ?' for name in names)
+            sql = self._update_sql[names] = f'UPDATE "{self.table}" SET {assignments} WHERE "{self.pk}" = ?'
+        data = obj.__dict__
+        row = []
+        for name in names:
+            value = data.get(name, obj._fields[name].default)
+            encode = self.encoders[self.columns.index(name)]
+            row.append(encode(value) if encode else value)
+        # اگر خود کلید تغییر کرده، ردیف با کلید قبلی پیدا می‌شود
+        row.append(obj.original_values().get(self.pk, data.get(self.pk)))
+        return sql, row
+
+    def decode(self, row):
+        return {
+            name: decode(value) if decode else value
+            for name, decode, value in zip(self.columns, self.decoders, row)
+        }
+
+
+def _pk_of(obj):
+    return obj.__dict__.get(type(obj).objects.pk_name)
+
+
+def _relation_key_encoder():
+    def encode(value):
+        if value is None:
+            return None
+        if isinstance(value, LazyRelation):
+            return value.key
+        return _pk_of(value)
+    return encode
+
+
+def _relation_keys_encoder():
+    def encode(value):
+        if isinstance(value, LazyRelation):
+            keys = value.key
+        else:
+            keys = [_pk_of(obj) for obj in value or ()]
+        return json.dumps(list(keys))
+    return encode
+
+
+def _lazy_decoder(loader, target, container = None):
+    if container is None:
+        def decode(value):
+            return None if value is None else LazyRelation(lambda key: loader(target, key), value)
+    else:
+        def decode(value):
+            keys = json.loads(value) if value else []
+            return LazyRelation(lambda key: container(loader(target, key)), keys)
+    return decode
+
+
+# -------------------------
+# موتور ذخیره‌سازی SQLite
+# -------------------------
+class SQLiteStorage:
+    """
+    ذخیره‌ی مدل‌ها در SQLite:
+    - هر کلاس مدل یک جدول (نیاز به فیلد primary_key)
+    - ذخیره‌ی گروهی با executemany داخل یک تراکنش (upsert)
+    - ForeignKey / OneToManyField / ManyToManyField هنگام load به‌صورت lazy نگه داشته می‌شوند
+    - save_async: نوشتن در thread جدا و برگرداندن نتیجه روی main thread با Clock
+    """
+
+    def __init__(self, path, models = ()):
+        self.path = str(path)
+        self.connection = self._connect()
+        self._tables = {}
+        self._writer = None
+        self._queue = queue.Queue()
+        # objectهایی که ردیفشان در این دیتابیس وجود دارد (بارگذاری یا ذخیره‌شده)
+        self._persisted = weakref.WeakSet()
+        for model_cls in models:
+            self.register(model_cls)
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def register(self, model_cls):
+        spec = self._tables.get(model_cls)
+        if spec is None:
+            spec = self._tables[model_cls] = TableSpec(self, model_cls)
+            with self.connection:
+                self.connection.execute(spec.create_sql)
+        return spec
+
+    def _group_rows(self, objs):
+        """
+        تبدیل objectها به (sql, ردیف‌ها) روی thread صدازننده، گروه‌بندی بر اساس کلاس.
+        written: (spec، object، ستون‌ها، ردیف) برای _mark_saved پس از commit موفق.
+        """
+        grouped = {}
+        written = []
+        for obj in objs:
+            spec = self.register(type(obj))
+            row = spec.encode(obj)
+            grouped.setdefault(spec.upsert_sql, []).append(row)
+            written.append((spec, obj, spec.columns, row))
+        return grouped, written
+
+    def _group_changes(self, objs):
+        """
+        مثل _group_rows اما فقط ستون‌های تغییرکرده (UPDATE)؛
+        objectهایی که هنوز در این دیتابیس ردیفی ندارند کامل upsert می‌شوند.
+        """
+        grouped = {}
+        written = []
+        persisted = self._persisted
+        for obj in objs:
+            spec = self.register(type(obj))
+            if obj not in persisted:
+                row = spec.encode(obj)
+                grouped.setdefault(spec.upsert_sql, []).append(row)
+                written.append((spec, obj, spec.columns, row))
+                continue
+            changed = obj.changed_fields()
+            if not changed:
+                continue
+            sql, row = spec.encode_update(obj, changed)
+            grouped.setdefault(sql, []).append(row)
+            written.append((spec, obj, [name for name in spec.columns if name in changed], row))
+        return grouped, written
+
+    def _mark_saved(self, written):
+        """
+        پس از commit موفق، روی main thread: ثبت objectها به‌عنوان ذخیره‌شده و پاک کردن dirty
+        فقط برای فیلدهایی که از زمان snapshot تغییر نکرده‌اند.
+        """
+        persisted = self._persisted
+        for spec, obj, names, row in written:
+            persisted.add(obj)
+            changed = obj.changed_fields()
+            if changed:
+                obj.reset_dirty([
+                    name for name, value in zip(names, row)
+                    if name in changed and spec.encode_column(obj, name) == value
+                ])
+
+    @staticmethod
+    def _write(connection, grouped):
+        with connection:
+            for sql, rows in grouped.items():
+                connection.executemany(sql, rows)
+        return sum(len(rows) for rows in grouped.values())
+
+    # -------------------------
+    # نوشتن
+    # -------------------------
+    def save(self, objs):
+        """ ذخیره‌ی همزمان؛ تعداد ردیف‌های نوشته‌شده را برمی‌گرداند """
+        grouped, written = self._group_rows(objs)
+        count = self._write(self.connection, grouped)
+        self._mark_saved(written)
+        return count
+
+    def save_changes(self, objs):
+        """
+        ذخیره‌ی افزایشی: برای objectهایی که قبلاً ذخیره/بارگذاری شده‌اند فقط ستون‌های
+        changed_fields() با UPDATE نوشته می‌شوند و بقیه کامل upsert می‌شوند.
+        """
+        grouped, written = self._group_changes(objs)
+        count = self._write(self.connection, grouped)
+        self._mark_saved(written)
+        return count
+
+    def save_async(self, objs, callback = None, changes_only = False):
+        """
+        ردیف‌ها همین‌جا ساخته می‌شوند (snapshot)، نوشتن در thread جدا انجام می‌شود
+        و callback(تعداد یا exception) در فریم بعدی روی main thread صدا زده می‌شود.
+        وضعیت dirty فقط پس از commit موفق پاک می‌شود.
+        """
+        grouped, written = self._group_changes(objs) if changes_only else self._group_rows(objs)
+
+        def finish(result):
+            if not isinstance(result, Exception):
+                self._mark_saved(written)
+            if callback is not None:
+                callback(result)
+
+        self._ensure_writer()
+        self._queue.put((grouped, finish))
+
+    def _ensure_writer(self):
+        if self._writer is None:
+            self._writer = threading.Thread(target = self._writer_loop, name = "SQLiteStorage", daemon = True)
+            self._writer.start()
+
+    def _writer_loop(self):
+        connection = self._connect()
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            grouped, callback = job
+            try:
+                try:
+                    result = self._write(connection, grouped)
+                except Exception as e:
+                    # هر خطایی (نه فقط sqlite3.Error، مثلاً TypeError در binding) به callback می‌رسد
+                    result = e
+                if callback is not None:
+                    Clock.schedule_once(lambda dt, result = result, callback = callback: callback(result))
+            finally:
+                self._queue.task_done()
+        self._queue.task_done()
+        connection.close()
+
+    def flush(self):
+        """ منتظر ماندن تا همه‌ی save_async های قبلی نوشته شوند """
+        if self._writer is not None:
+            self._queue.join()
+
+    def delete(self, objs):
+        grouped = {}
+        for obj in objs:
+            spec = self.register(type(obj))
+            grouped.setdefault(spec, []).append((_pk_of(obj),))
+            self._persisted.discard(obj)
+        with self.connection:
+            for spec, keys in grouped.items():
+                self.connection.executemany(spec.delete_sql, keys)
+
+    # -------------------------
+    # خواندن
+    # -------------------------
+    def _hydrate(self, spec, row):
+        """
+        نمونه‌ی موجود در identity map برگردانده می‌شود، در غیر این صورت ساخته می‌شود.
+        ردیف‌ها را خودمان نوشته‌ایم، پس ساخت بدون اعتبارسنجی (hydrate) انجام می‌شود.
+        """
+        model_cls = spec.model_cls
+        values = spec.decode(row)
+        existing = model_cls.objects.get_by_pk(values[spec.pk])
+        obj = existing if existing is not None else model_cls.hydrate(values)
+        self._persisted.add(obj)
+        return obj
+
+    def load(self, model_cls, where = None, params = (), batch_size = 1000):
+        """ بارگذاری ردیف‌ها؛ where یک عبارت SQL اختیاری است """
+        spec = self.register(model_cls)
+        sql = spec.select_sql + (f" WHERE {where}" if where else "")
+        cursor = self.connection.execute(sql, params)
+        result = []
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            result.extend(self._hydrate(spec, row) for row in rows)
+        return result
+
+    def get(self, model_cls, pk):
+        existing = model_cls.objects.get_by_pk(pk)
+        if existing is not None:
+            return existing
+        spec = self.register(model_cls)
+        row = self.connection.execute(f'{spec.select_sql} WHERE "{spec.pk}" = ?', (pk,)).fetchone()
+        return self._hydrate(spec, row) if row is not None else None
+
+    def get_many(self, model_cls, pks):
+        """ بارگذاری چند object با حداقل کوئری؛ ترتیب pks حفظ می‌شود """
+        spec = self.register(model_cls)
+        found = {}
+        missing = []
+        for pk in pks:
+            obj = model_cls.objects.get_by_pk(pk)
+            if obj is not None:
+                found[pk] = obj
+            else:
+                missing.append(pk)
+        for start in range(0, len(missing), MAX_VARIABLES):
+            chunk = missing[start:start + MAX_VARIABLES]
+            sql = f'{spec.select_sql} WHERE "{spec.pk}" IN ({", ".join("?" * len(chunk))})'
+            for row in self.connection.execute(sql, chunk):
+                obj = self._hydrate(spec, row)
+                found[_pk_of(obj)] = obj
+        return [found[pk] for pk in pks if pk in found]
+
+    def close(self):
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+        self.connection.close()
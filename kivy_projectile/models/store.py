@@ -0,0 +1,323 @@
+import operator
+import sys
+from array import array
+
+from .field import BooleanField, FloatField, IntegerField, StringField
+
+try:
+    import numpy
+except ImportError:  # numpy اختیاری است؛ بدون آن از حلقه‌های سطح C پایتون استفاده می‌شود
+    numpy = None
+
+
+# نوع بافر پیوسته برای هر فیلد عددی
+ARRAY_TYPECODES = (
+    (BooleanField, 'b'),
+    (IntegerField, 'q'),
+    (FloatField, 'd'),
+)
+
+COMPARE_OPS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+
+def _typecode_for(field):
+    for field_cls, typecode in ARRAY_TYPECODES:
+        if isinstance(field, field_cls):
+            return typecode
+    return None
+
+
+# -------------------------
+# ستون
+# -------------------------
+class Column:
+    """
+    یک ستون از ModelStore:
+    - فیلدهای عددی/بولی در array پیوسته (+ ماسک null)
+    - StringField در لیست رشته‌های intern شده
+    - بقیه فیلدها در لیست معمولی
+    """
+    __slots__ = ('name', 'field', 'typecode', 'values', 'nulls')
+
+    def __init__(self, name, field):
+        self.name = name
+        self.field = field
+        self.typecode = _typecode_for(field)
+        self.values = array(self.typecode) if self.typecode else []
+        # فقط ستون‌های array نیاز به ماسک null دارند
+        self.nulls = bytearray() if self.typecode else None
+
+    def prepare(self, value):
+        """
+        اعتبارسنجی یک مقدار و بررسی جا شدن آن در بافر ستون؛ ستون تغییر نمی‌کند.
+        مقدار خارج از بازه‌ی array (مثلاً 2**70 برای 'q') ValueError می‌دهد.
+        """
+        value = self.field.check(value)
+        if self.typecode and value is not None:
+            try:
+                array(self.typecode, (value,))
+            except OverflowError:
+                raise ValueError(f"{self.name}: {value!r} is out of range for column") from None
+        return value
+
+    def append(self, value):
+        self.push(self.prepare(value))
+
+    def push(self, value):
+        """ افزودن مقداری که prepare شده؛ دیگر خطایی رخ نمی‌دهد """
+        if self.typecode:
+            self.nulls.append(value is None)
+            self.values.append(0 if value is None else value)
+        elif isinstance(value, str):
+            self.values.append(sys.intern(value))
+        else:
+            self.values.append(value)
+
+    def pack(self, values):
+        """
+        مقادیر اعتبارسنجی‌شده (validate_many) -> (بافر، ماسک null) آماده‌ی افزودن.
+        تبدیل پیش از تغییر ستون انجام می‌شود تا سرریز array ستون را نیمه‌کاره نگذارد.
+        """
+        if not self.typecode:
+            return [sys.intern(value) if isinstance(value, str) else value for value in values], None
+        has_null = None in values
+        try:
+            buffer = array(self.typecode, [0 if value is None else value for value in values] if has_null else values)
+        except OverflowError:
+            raise ValueError(f"{self.name}: value out of range for column") from None
+        nulls = bytes(value is None for value in values) if has_null else bytes(len(values))
+        return buffer, nulls
+
+    def push_many(self, packed):
+        buffer, nulls = packed
+        self.values.extend(buffer)
+        if nulls is not None:
+            self.nulls.extend(nulls)
+
+    def extend(self, values):
+        """ افزودن مقادیر از قبل اعتبارسنجی‌شده (validate_many) """
+        self.push_many(self.pack(values))
+
+    def get(self, index):
+        if self.typecode:
+            if self.nulls[index]:
+                return None
+            value = self.values[index]
+            return bool(value) if self.typecode == 'b' else value
+        return self.values[index]
+
+    def set(self, index, value):
+        value = self.prepare(value)
+        if self.typecode:
+            self.nulls[index] = value is None
+            self.values[index] = 0 if value is None else value
+        elif isinstance(value, str):
+            self.values[index] = sys.intern(value)
+        else:
+            self.values[index] = value
+
+    def take(self, order):
+        """ بازچینی ستون بر اساس لیست اندیس‌ها """
+        values = self.values
+        if self.typecode:
+            self.values = array(self.typecode, [values[i] for i in order])
+            nulls = self.nulls
+            self.nulls = bytearray(nulls[i] for i in order)
+        else:
+            self.values = [values[i] for i in order]
+
+    def as_numpy(self):
+        """ نمای بدون کپی روی بافر ستون (فقط ستون‌های array و در صورت نصب numpy) """
+        if numpy is None or not self.typecode:
+            return None
+        return numpy.frombuffer(self.values, dtype = self.values.typecode)
+
+    def nbytes(self):
+        if self.typecode:
+            return self.values.itemsize * len(self.values) + len(self.nulls)
+        return sys.getsizeof(self.values)
+
+
+# -------------------------
+# نمای سبک یک ردیف
+# -------------------------
+class RowView:
+    """ دسترسی به یک ردیف بدون ساخت BaseModel """
+    __slots__ = ('_store', '_index')
+
+    def __init__(self, store, index):
+        object.__setattr__(self, '_store', store)
+        object.__setattr__(self, '_index', index)
+
+    def __getattr__(self, name):
+        column = self._store.columns.get(name)
+        if column is None:
+            raise AttributeError(name)
+        return column.get(self._index)
+
+    def __setattr__(self, name, value):
+        column = self._store.columns.get(name)
+        if column is None:
+            raise AttributeError(name)
+        column.set(self._index, value)
+
+    def to_dict(self):
+        return self._store.row_dict(self._index)
+
+    def materialize(self):
+        """
+        BaseModel کامل همین ردیف فقط در صورت نیاز؛ اگر نمونه‌ای با همین کلید اصلی زنده باشد
+        همان برگردانده می‌شود، وگرنه با hydrate (مقادیر ستون‌ها قبلاً اعتبارسنجی شده‌اند) ساخته می‌شود.
+        """
+        model_cls = self._store.model_cls
+        pk_name = model_cls.objects.pk_name
+        if pk_name is not None:
+            existing = model_cls.objects.get_by_pk(getattr(self, pk_name))
+            if existing is not None:
+                return existing
+        return model_cls.hydrate(self.to_dict())
+
+    def __repr__(self):
+        return f"<{self._store.model_cls.__name__}Row {self._index}>"
+
+
+# -------------------------
+# ModelStore
+# -------------------------
+class ModelStore:
+    """
+    ذخیره‌ی ستونی تعداد زیادی رکورد از یک کلاس BaseModel:
+        store = ModelStore(Product)
+        store.extend(rows)
+        store.sum('price'), store.where(store.compare('price', '>', 10))
+    """
+
+    def __init__(self, model_cls, rows = None):
+        self.model_cls = model_cls
+        self.columns = {name: Column(name, field) for name, field in model_cls._fields.items()}
+        self._length = 0
+        if rows:
+            self.extend(rows)
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("ModelStore index out of range")
+        return RowView(self, index)
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield RowView(self, index)
+
+    # -------------------------
+    # افزودن
+    # -------------------------
+    def append(self, row):
+        """ row می‌تواند dict یا نمونه‌ای از BaseModel باشد """
+        if not isinstance(row, dict):
+            row = {name: getattr(row, name) for name in self.columns}
+        # اول همه‌ی مقادیر بررسی می‌شوند تا خطا در یک ستون طول ستون‌ها را ناهمسان نکند
+        prepared = [(column, column.prepare(row.get(name, column.field.default))) for name, column in self.columns.items()]
+        for column, value in prepared:
+            column.push(value)
+        self._length += 1
+
+    def extend(self, rows):
+        """
+        افزودن گروهی: هر ستون یک‌جا با field.validate_many بررسی می‌شود
+        و اگر ستونی نامعتبر باشد هیچ ردیفی اضافه نمی‌شود.
+        """
+        names = list(self.columns)
+        rows = [row if isinstance(row, dict) else {name: getattr(row, name) for name in names} for row in rows]
+        packed = {}
+        for name, column in self.columns.items():
+            default = column.field.default
+            packed[name] = column.pack(column.field.validate_many([row.get(name, default) for row in rows]))
+        for name, column in self.columns.items():
+            column.push_many(packed[name])
+        self._length += len(rows)
+
+    def row_dict(self, index):
+        return {name: column.get(index) for name, column in self.columns.items()}
+
+    def column(self, name):
+        return self.columns[name].values
+
+    # -------------------------
+    # عملیات ستونی
+    # -------------------------
+    def sum(self, name):
+        column = self.columns[name]
+        np_values = column.as_numpy()
+        if np_values is not None:
+            # مقادیر null با صفر ذخیره شده‌اند و در جمع اثری ندارند
+            return np_values.sum().item()
+        if column.typecode:
+            return sum(column.values)
+        return sum(value for value in column.values if value is not None)
+
+    def compare(self, name, op, value):
+        """ ماسک bytearray برای مقایسه‌ی یک ستون با مقدار (ردیف‌های null همیشه 0) """
+        compare = COMPARE_OPS[op]
+        column = self.columns[name]
+        np_values = column.as_numpy()
+        if np_values is not None:
+            result = compare(np_values, value) & (numpy.frombuffer(column.nulls, dtype = 'u1') == 0)
+            return bytearray(result.astype('u1').tobytes())
+        if column.typecode:
+            return bytearray(
+                not null and compare(item, value) for item, null in zip(column.values, column.nulls)
+            )
+        return bytearray(item is not None and compare(item, value) for item in column.values)
+
+    def mask(self, name, predicate):
+        """ ماسک bytearray با یک تابع دلخواه روی مقادیر ستون """
+        column = self.columns[name]
+        return bytearray(bool(predicate(column.get(i))) for i in range(self._length))
+
+    def where(self, mask):
+        """ اندیس ردیف‌هایی که ماسک آن‌ها ۱ است """
+        if numpy is not None:
+            return numpy.flatnonzero(numpy.frombuffer(mask, dtype = 'u1')).tolist()
+        return [index for index, flag in enumerate(mask) if flag]
+
+    def filter(self, mask):
+        return [RowView(self, index) for index in self.where(mask)]
+
+    def argsort(self, name, reverse = False):
+        """ ترتیب اندیس‌ها بر اساس یک ستون؛ null ها همیشه در انتها """
+        column = self.columns[name]
+        np_values = column.as_numpy()
+        if np_values is not None and not any(column.nulls):
+            if not reverse:
+                return numpy.argsort(np_values, kind = 'stable').tolist()
+            # نزولی پایدار (هم‌ارز sort(reverse = True) پایتون): مرتب‌سازی صعودی روی
+            # آرایه‌ی وارونه و وارونه کردن نتیجه، تا ترتیب مقادیر برابر حفظ شود
+            last = len(np_values) - 1
+            return (last - numpy.argsort(np_values[::-1], kind = 'stable')[::-1]).tolist()
+        values = [column.get(i) for i in range(self._length)]
+        present = [i for i in range(self._length) if values[i] is not None]
+        missing = [i for i in range(self._length) if values[i] is None]
+        present.sort(key = values.__getitem__, reverse = reverse)
+        return present + missing
+
+    def sort(self, name, reverse = False):
+        """ مرتب‌سازی درجا‌ی همه‌ی ستون‌ها بر اساس یک ستون """
+        order = self.argsort(name, reverse = reverse)
+        for column in self.columns.values():
+            column.take(order)
+
+    def nbytes(self):
+        """ حافظه‌ی تقریبی بافرهای ستون‌ها (بدون خود رشته‌ها) """
+        return sum(column.nbytes() for column in self.columns.values())
@@ -0,0 +1,125 @@
+import threading
+import time
+
+from kivy.clock import Clock
+from kivy.logger import Logger
+
+
+class UpdateQueue:
+    """
+    صف تغییرات مدل‌ها از threadهای دیگر که یک‌بار در هر فریم روی main thread اعمال می‌شود:
+        update_queue.set(book, "title", "...")     # از هر thread
+        book.queue_update(title = "...", price = 10)
+
+    - چند نوشتن روی یک فیلد قبل از اعمال، فقط آخرین مقدار را نگه می‌دارد
+    - تغییرات هر object در یک batch اعمال می‌شوند (یک on_change)
+    - اعتبارسنجی مقدار همان موقع در thread صدازننده انجام می‌شود تا خطا به خود آن برسد
+    - خطای یک نوشتن هنگام اعمال (مثلاً از یک listener) ثبت و شمرده می‌شود و بقیه‌ی نوشتن‌ها اعمال می‌شوند
+    - depth و زمان انتظار/اعمال برای اندازه‌گیری گزارش می‌شوند
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # object -> {نام فیلد: مقدار}
+        self._pending = {}
+        self._depth = 0
+        self._oldest = None
+        self._trigger = Clock.create_trigger(self.drain)
+
+        self.writes = 0
+        self.collapsed = 0
+        self.drains = 0
+        # نوشتن‌هایی که هنگام اعمال خطا دادند
+        self.errors = 0
+        # تأخیر از قدیمی‌ترین نوشتن تا اعمال، و مدت خود اعمال (ثانیه)
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self.last_drain_time = 0.0
+
+    @property
+    def depth(self):
+        """ تعداد (object، فیلد) های منتظر اعمال """
+        return self._depth
+
+    def set(self, obj, name, value):
+        field = obj._fields.get(name)
+        if field is None:
+            raise AttributeError(f"{type(obj).__name__} has no field {name!r}")
+        field.check(value)
+        self._enqueue(obj, {name: value})
+
+    def update(self, obj, **values):
+        fields = obj._fields
+        for name, value in values.items():
+            field = fields.get(name)
+            if field is None:
+                raise AttributeError(f"{type(obj).__name__} has no field {name!r}")
+            field.check(value)
+        self._enqueue(obj, values)
+
+    def _enqueue(self, obj, values):
+        with self._lock:
+            pending = self._pending.get(obj)
+            if pending is None:
+                pending = self._pending[obj] = {}
+            for name, value in values.items():
+                if name in pending:
+                    self.collapsed += 1
+                else:
+                    self._depth += 1
+                pending[name] = value
+            self.writes += len(values)
+            if self._oldest is None:
+                self._oldest = time.perf_counter()
+        self._trigger()
+
+    def drain(self, *args):
+        """ اعمال همه‌ی تغییرات منتظر (روی main thread؛ به‌طور خودکار یک‌بار در هر فریم) """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            oldest, self._oldest = self._oldest, None
+            self._depth = 0
+        if not pending:
+            return
+
+        start = time.perf_counter()
+        try:
+            for obj, values in pending.items():
+                self._apply(obj, values)
+        finally:
+            end = time.perf_counter()
+            self.drains += 1
+            self.last_latency = start - oldest
+            self.max_latency = max(self.max_latency, self.last_latency)
+            self.last_drain_time = end - start
+
+    def _apply(self, obj, values):
+        """ اعمال نوشتن‌های یک object در یک batch؛ خطا فقط همان نوشتن را از دست می‌دهد """
+        try:
+            with obj.batch():
+                for name, value in values.items():
+                    try:
+                        setattr(obj, name, value)
+                    except Exception:
+                        self.errors += 1
+                        Logger.exception(f"UpdateQueue: {type(obj).__name__}.{name} = {value!r} failed")
+        except Exception:
+            # خطا هنگام فرستادن رویدادهای batch (listener ها)
+            self.errors += 1
+            Logger.exception(f"UpdateQueue: change events of {type(obj).__name__} failed")
+
+    def stats(self):
+        return {
+            "depth": self._depth,
+            "writes": self.writes,
+            "collapsed": self.collapsed,
+            "drains": self.drains,
+            "errors": self.errors,
+            "last_latency": self.last_latency,
+            "max_latency": self.max_latency,
+            "last_drain_time": self.last_drain_time,
+        }
+
+
+# singleton
+update_queue = UpdateQueue()
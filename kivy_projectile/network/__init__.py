@@ -0,0 +1,5 @@
+from .client import ConnectionPool, HTTPConnection, HTTPError, HTTPResponse
+from .cache import HTTPCache
+from .sync import SyncEngine
+
+__all__ = ["ConnectionPool", "HTTPConnection", "HTTPError", "HTTPResponse", "HTTPCache", "SyncEngine"]
@@ -0,0 +1,348 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+
+from .client import HTTPResponse
+
+# هدرهایی که همراه بدنه ذخیره می‌شوند
+STORED_HEADERS = ("content-type", "etag", "last-modified", "cache-control", "date", "expires")
+
+
+def _parse_cache_control(value):
+    directives = {}
+    for part in value.split(","):
+        name, _, argument = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"') or True
+    return directives
+
+
+def _http_time(value):
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def freshness_lifetime(headers, default = 0):
+    """ طول عمر تازگی پاسخ (ثانیه)؛ None یعنی نباید ذخیره شود """
+    directives = _parse_cache_control(headers.get("cache-control", ""))
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0
+    max_age = directives.get("max-age")
+    if max_age not in (None, True):
+        try:
+            return max(int(max_age), 0)
+        except ValueError:
+            return 0
+    if "expires" in headers:
+        expires = _http_time(headers["expires"])
+        date = _http_time(headers.get("date", "")) or time.time()
+        return max(expires - date, 0) if expires is not None else 0
+    return default
+
+
+def _vary_names(headers):
+    """ نام هدرهای درخواست در Vary (حروف کوچک، مرتب)؛ None برای Vary: * """
+    names = sorted({name.strip().lower() for name in headers.get("vary", "").split(",") if name.strip()})
+    return None if "*" in names else tuple(names)
+
+
+def _lower_keys(headers):
+    return {name.lower(): value for name, value in (headers or {}).items()}
+
+
+def _selected(names, request_headers):
+    """ مقدار هدرهای Vary در درخواست؛ بخشی از کلید نسخه‌ی کش‌شده """
+    return {name: request_headers.get(name, "") for name in names}
+
+
+class CacheEntry:
+    """
+    یک پاسخ کش‌شده. اگر پاسخ Vary داشته باشد، vary نام آن هدرهاست و request مقدارشان
+    در درخواستی که پاسخ برای آن ذخیره شد؛ زیر کلید خود url فقط یک ورودی راهنما
+    (status صفر، بدون بدنه) با همین vary نگه داشته می‌شود.
+    """
+    __slots__ = ('url', 'status', 'headers', 'body', 'stored_at', 'max_age', 'vary', 'request')
+
+    def __init__(self, url, status, headers, body, stored_at, max_age, vary = (), request = None):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.stored_at = stored_at
+        self.max_age = max_age
+        self.vary = tuple(vary)
+        self.request = request
+
+    @property
+    def key(self):
+        return HTTPCache.key_for(self.url, self.request)
+
+    @property
+    def is_variant_index(self):
+        return self.status == 0
+
+    def is_fresh(self, now = None):
+        return ((now or time.time()) - self.stored_at) < self.max_age
+
+    def conditional_headers(self):
+        headers = {}
+        if "etag" in self.headers:
+            headers["If-None-Match"] = self.headers["etag"]
+        if "last-modified" in self.headers:
+            headers["If-Modified-Since"] = self.headers["last-modified"]
+        return headers
+
+    def same_content(self, response):
+        """ آیا پاسخ 200 تازه همان محتوای این ورودی است؟ (ETag یکسان، یا در نبود آن بدنه‌ی یکسان) """
+        etag = self.headers.get("etag")
+        if etag is not None and response.headers.get("etag") is not None:
+            return etag == response.headers["etag"]
+        return self.body == response.body
+
+    def response(self):
+        response = HTTPResponse(self.status, "OK", dict(self.headers), self.body, self.url)
+        response.from_cache = True
+        return response
+
+    @property
+    def size(self):
+        return len(self.body)
+
+
+# -------------------------
+# کش پاسخ‌ها
+# -------------------------
+class HTTPCache:
+    """
+    کش پاسخ‌های GET روی دیسک (هر url یک فایل) با سقف حجم و حذف LRU:
+    - پاسخ تازه مستقیم از کش؛ پاسخ کهنه فوراً برگردانده و در پس‌زمینه با
+      If-None-Match / If-Modified-Since بازاعتبارسنجی می‌شود (stale-while-revalidate)
+    - hot_entries پاسخ آخر در حافظه نگه داشته می‌شوند تا خواندن دیسک هم لازم نباشد
+    - شمارنده‌های hits / stale_hits / misses / ... برای اندازه‌گیری
+    از main thread و thread شبکه همزمان قابل استفاده است.
+    """
+    # فایل‌های بزرگ‌تر از این در حافظه نگه داشته نمی‌شوند
+    HOT_MAX_BODY = 256 * 1024
+
+    def __init__(self, path, max_bytes = 50 * 1024 * 1024, hot_entries = 64, default_max_age = 0):
+        self.path = str(path)
+        os.makedirs(self.path, exist_ok = True)
+        self.max_bytes = max_bytes
+        self.hot_entries = hot_entries
+        self.default_max_age = default_max_age
+
+        self._lock = threading.RLock()
+        # کلید -> حجم فایل، به ترتیب آخرین استفاده (قدیمی‌ترین اول)
+        self._index = OrderedDict()
+        self._hot = OrderedDict()
+        self.disk_bytes = 0
+
+        self.hits = 0
+        self.hot_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.stores = 0
+        self.evictions = 0
+
+        self._scan()
+
+    def _scan(self):
+        """ بازسازی ایندکس LRU از فایل‌های موجود (فقط stat، بدون خواندن محتوا) """
+        entries = []
+        with os.scandir(self.path) as it:
+            for item in it:
+                if item.name.endswith(".tmp"):
+                    os.remove(item.path)
+                elif item.is_file():
+                    stat = item.stat()
+                    entries.append((stat.st_mtime, item.name, stat.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self.disk_bytes += size
+        self._evict()
+
+    @staticmethod
+    def key_for(url, varied = None):
+        """ کلید فایل: url به‌علاوه‌ی مقدار هدرهای Vary درخواست (اگر پاسخ Vary داشته باشد) """
+        if varied:
+            url += "\n" + "\n".join(f"{name}: {value}" for name, value in sorted(varied.items()))
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+    def _file(self, key):
+        return os.path.join(self.path, key)
+
+    # -------------------------
+    # خواندن
+    # -------------------------
+    def lookup(self, url, headers = None):
+        """
+        CacheEntry (تازه یا کهنه) یا None؛ شمارنده‌ها به‌روز می‌شوند.
+        headers: هدرهای درخواست، برای انتخاب نسخه‌ی درست پاسخ‌هایی که Vary دارند.
+        """
+        with self._lock:
+            entry = self._get(self.key_for(url), url)
+            if entry is not None and entry.is_variant_index:
+                varied = _selected(entry.vary, _lower_keys(headers))
+                entry = self._get(self.key_for(url, varied), url)
+                if entry is not None and entry.request != varied:
+                    entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.is_fresh():
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+            return entry
+
+    def _get(self, key, url):
+        entry = self._hot.get(key)
+        if entry is not None:
+            self._hot.move_to_end(key)
+            self._index.move_to_end(key)
+            self.hot_hits += 1
+            return entry
+        if key not in self._index:
+            return None
+        entry = self._read(key)
+        if entry is None or entry.url != url:
+            return None
+        self._index.move_to_end(key)
+        self._remember(key, entry)
+        return entry
+
+    def _read(self, key):
+        try:
+            with open(self._file(key), "rb") as fp:
+                meta = json.loads(fp.readline())
+                body = fp.read()
+            # ترتیب LRU بعد از راه‌اندازی دوباره هم حفظ شود
+            os.utime(self._file(key))
+        except (OSError, ValueError):
+            self._discard(key)
+            return None
+        return CacheEntry(
+            meta["url"], meta["status"], meta["headers"], body, meta["stored_at"], meta["max_age"],
+            meta.get("vary", ()), meta.get("request"),
+        )
+
+    def _remember(self, key, entry):
+        if self.hot_entries and entry.size <= self.HOT_MAX_BODY:
+            self._hot[key] = entry
+            self._hot.move_to_end(key)
+            while len(self._hot) > self.hot_entries:
+                self._hot.popitem(last = False)
+
+    # -------------------------
+    # نوشتن
+    # -------------------------
+    def store(self, url, response, request_headers = None):
+        """
+        ذخیره‌ی پاسخ 200 یک GET (اگر Cache-Control اجازه دهد).
+        - درخواست دارای Authorization فقط با Cache-Control: public ذخیره می‌شود
+        - با Vary، پاسخ زیر کلید url + مقدار همان هدرهای درخواست ذخیره می‌شود (Vary: * ذخیره نمی‌شود)
+        """
+        if response.status != 200:
+            return None
+        request_headers = _lower_keys(request_headers)
+        if "authorization" in request_headers and \
+                "public" not in _parse_cache_control(response.headers.get("cache-control", "")):
+            return None
+        max_age = freshness_lifetime(response.headers, self.default_max_age)
+        vary = _vary_names(response.headers)
+        if max_age is None or vary is None:
+            self.invalidate(url)
+            return None
+        headers = {name: response.headers[name] for name in STORED_HEADERS if name in response.headers}
+        now = time.time()
+        if vary:
+            varied = _selected(vary, request_headers)
+            entry = CacheEntry(url, response.status, headers, response.body, now, max_age, vary, varied)
+            # راهنمای نسخه‌ها زیر کلید خود url
+            self._write(CacheEntry(url, 0, {}, b"", now, 0, vary))
+        else:
+            entry = CacheEntry(url, response.status, headers, response.body, now, max_age)
+        self._write(entry)
+        self.stores += 1
+        return entry
+
+    def revalidated_with(self, url, entry, response):
+        """ پاسخ 304: به‌روزرسانی هدرها و زمان ذخیره بدون تغییر بدنه """
+        with self._lock:
+            for name in STORED_HEADERS:
+                if name in response.headers:
+                    entry.headers[name] = response.headers[name]
+            entry.stored_at = time.time()
+            entry.max_age = freshness_lifetime(entry.headers, self.default_max_age) or 0
+            self._write(entry)
+            self.revalidated += 1
+        return entry
+
+    def _write(self, entry):
+        key = entry.key
+        meta = {
+            "url": entry.url,
+            "status": entry.status,
+            "headers": entry.headers,
+            "stored_at": entry.stored_at,
+            "max_age": entry.max_age,
+        }
+        if entry.vary:
+            meta["vary"] = list(entry.vary)
+            meta["request"] = entry.request
+        data = json.dumps(meta).encode("utf-8") + b"\n" + entry.body
+        temp_path = self._file(key) + ".tmp"
+        with self._lock:
+            with open(temp_path, "wb") as fp:
+                fp.write(data)
+            os.replace(temp_path, self._file(key))
+            self.disk_bytes += len(data) - self._index.pop(key, 0)
+            self._index[key] = len(data)
+            self._remember(key, entry)
+            self._evict()
+
+    def _evict(self):
+        while self.disk_bytes > self.max_bytes and self._index:
+            key = next(iter(self._index))
+            self._discard(key)
+            self.evictions += 1
+
+    def _discard(self, key):
+        with self._lock:
+            self.disk_bytes -= self._index.pop(key, 0)
+            self._hot.pop(key, None)
+            try:
+                os.remove(self._file(key))
+            except FileNotFoundError:
+                pass
+
+    def invalidate(self, url):
+        self._discard(self.key_for(url))
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._index):
+                self._discard(key)
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "hot_hits": self.hot_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "entries": len(self._index),
+            "hot_entries": len(self._hot),
+            "disk_bytes": self.disk_bytes,
+        }
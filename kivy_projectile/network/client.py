@@ -0,0 +1,227 @@
+import asyncio
+import json
+import ssl
+from urllib.parse import urlencode, urljoin, urlsplit
+
+# سقف تعداد هدرهای پاسخ برای جلوگیری از پاسخ‌های معیوب
+MAX_HEADERS = 100
+DEFAULT_TIMEOUT = 30
+
+
+def normalize_base_url(base_url):
+    """ ALLOWED_HOST ممکن است بدون scheme باشد (example.com) """
+    if not base_url:
+        return None
+    base_url = str(base_url)
+    if "://" not in base_url:
+        base_url = "https://" + base_url
+    return base_url.rstrip("/") + "/"
+
+
+def build_url(base_url, path, params = None):
+    url = urljoin(base_url, path.lstrip("/")) if base_url else path
+    if params:
+        url += ("&" if "?" in url else "?") + urlencode(params, doseq = True)
+    return url
+
+
+class HTTPError(Exception):
+    pass
+
+
+class HTTPResponse:
+    __slots__ = ('status', 'reason', 'headers', 'body', 'url', 'from_cache')
+
+    def __init__(self, status, reason, headers, body, url = None):
+        self.status = status
+        self.reason = reason
+        # نام هدرها با حروف کوچک
+        self.headers = headers
+        self.body = body
+        self.url = url
+        self.from_cache = False
+
+    @property
+    def ok(self):
+        return 200 <= self.status < 300
+
+    def json(self):
+        return json.loads(self.body) if self.body else None
+
+    def __repr__(self):
+        return f"<HTTPResponse {self.status} {self.url or ''}>"
+
+
+# -------------------------
+# اتصال keep-alive
+# -------------------------
+class HTTPConnection:
+    """ یک اتصال HTTP/1.1 روی asyncio که بین درخواست‌ها باز می‌ماند """
+
+    def __init__(self, scheme, host, port):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+        self.reusable = True
+
+    @property
+    def closed(self):
+        return self.writer is None or self.writer.is_closing() or self.reader.at_eof()
+
+    async def connect(self):
+        context = ssl.create_default_context() if self.scheme == "https" else None
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port, ssl = context)
+
+    async def request(self, method, target, headers, body):
+        lines = [f"{method} {target} HTTP/1.1", f"Host: {self.host_header}"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        if body is not None or method in ("POST", "PUT", "PATCH"):
+            lines.append(f"Content-Length: {len(body or b'')}")
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+        self.writer.write(head + body if body else head)
+        await self.writer.drain()
+        return await self._read_response(method)
+
+    @property
+    def host_header(self):
+        default = 443 if self.scheme == "https" else 80
+        return self.host if self.port == default else f"{self.host}:{self.port}"
+
+    async def _read_response(self, method):
+        reader = self.reader
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed by server")
+        parts = status_line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+        if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+            raise HTTPError(f"Malformed status line: {status_line!r}")
+        status = int(parts[1])
+        reason = parts[2] if len(parts) > 2 else ""
+
+        headers = {}
+        for _ in range(MAX_HEADERS):
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        else:
+            raise HTTPError("Too many response headers")
+
+        if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+            body = b""
+        elif "chunked" in headers.get("transfer-encoding", "").lower():
+            body = await self._read_chunked()
+        elif "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        else:
+            # بدون طول مشخص: تا بسته شدن اتصال
+            body = await reader.read()
+            self.reusable = False
+
+        if headers.get("connection", "").lower() == "close" or parts[0] == "HTTP/1.0":
+            self.reusable = False
+        return HTTPResponse(status, reason, headers, body)
+
+    async def _read_chunked(self):
+        reader = self.reader
+        chunks = []
+        while True:
+            size_line = await reader.readline()
+            size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+            if not size:
+                # trailer ها تا خط خالی
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+# -------------------------
+# pool اتصال‌ها
+# -------------------------
+class ConnectionPool:
+    """
+    اتصال‌های keep-alive برای هر (scheme, host, port)؛ حداکثر max_per_host درخواست همزمان.
+    فقط داخل event loop خودش استفاده می‌شود (SyncEngine).
+    """
+
+    def __init__(self, max_per_host = 4, timeout = DEFAULT_TIMEOUT):
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self._idle = {}
+        self._limits = {}
+        # شمارنده‌ها برای اندازه‌گیری
+        self.connections_opened = 0
+        self.requests = 0
+
+    def _key(self, url):
+        parts = urlsplit(url)
+        scheme = parts.scheme or "http"
+        port = parts.port or (443 if scheme == "https" else 80)
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+        return (scheme, parts.hostname, port), target
+
+    async def request(self, method, url, headers = None, body = None):
+        key, target = self._key(url)
+        limit = self._limits.get(key)
+        if limit is None:
+            limit = self._limits[key] = asyncio.Semaphore(self.max_per_host)
+        headers = dict(headers or {})
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+
+        async with limit:
+            # اتصال بیکار ممکن است سمت سرور بسته شده باشد: یک‌بار با اتصال تازه تکرار می‌شود
+            for attempt in range(2):
+                connection, reused = await self._acquire(key)
+                try:
+                    response = await asyncio.wait_for(
+                        connection.request(method, target, headers, body), self.timeout
+                    )
+                except (ConnectionError, asyncio.IncompleteReadError) as e:
+                    connection.close()
+                    if reused and not attempt:
+                        continue
+                    raise HTTPError(f"{method} {url} failed: {e}") from e
+                except BaseException:
+                    connection.close()
+                    raise
+                self.requests += 1
+                self._release(key, connection)
+                response.url = url
+                return response
+
+    async def _acquire(self, key):
+        idle = self._idle.get(key)
+        while idle:
+            connection = idle.pop()
+            if not connection.closed:
+                return connection, True
+            connection.close()
+        connection = HTTPConnection(*key)
+        await asyncio.wait_for(connection.connect(), self.timeout)
+        self.connections_opened += 1
+        return connection, False
+
+    def _release(self, key, connection):
+        if connection.reusable and not connection.closed:
+            self._idle.setdefault(key, []).append(connection)
+        else:
+            connection.close()
+
+    def close(self):
+        for connections in self._idle.values():
+            for connection in connections:
+                connection.close()
+        self._idle.clear()
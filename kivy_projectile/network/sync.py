@@ -0,0 +1,306 @@
+import asyncio
+import json
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+from kivy.clock import Clock
+
+from .client import DEFAULT_TIMEOUT, ConnectionPool, HTTPError, build_url, normalize_base_url
+
+
+class SyncEngine:
+    """
+    سرویس همگام‌سازی پس‌زمینه روی base_url اپ:
+        sync = SyncEngine(app.base_url)
+        sync.get("items/", callback = on_items)
+        sync.push(book)                      # ارسال فیلدهای تغییرکرده (to_patch)
+
+    - یک event loop asyncio در thread جدا با اتصال‌های keep-alive برای هر host (ConnectionPool)
+    - patch های هر مدل تا ارسال بعدی روی هم ادغام می‌شوند و با یک POST گروهی به patch_path می‌روند
+    - نتیجه‌ها (پاسخ یا exception) جمع و یک‌بار در هر فریم روی main thread به callbackها داده می‌شوند
+    - با cache (HTTPCache)، GET ها از کش جواب داده و در صورت کهنگی در پس‌زمینه بازاعتبارسنجی می‌شوند
+    """
+
+    def __init__(self, base_url, patch_path = "sync/", batch_interval = 0.05, max_batch = 200,
+                 max_connections = 4, timeout = DEFAULT_TIMEOUT, headers = None, cache = None):
+        self.base_url = normalize_base_url(base_url)
+        self.cache = cache
+        # بازاعتبارسنجی‌های در جریان: کلید ورودی کش -> [future, callbacks]
+        self._revalidating = {}
+        self.patch_path = patch_path
+        self.batch_interval = batch_interval
+        self.max_batch = max_batch
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.headers = dict(headers or {})
+
+        self.pool = None
+        self._loop = None
+        self._thread = None
+        self._ready = threading.Event()
+
+        # object -> [patch ادغام‌شده، callbackها]؛ بین main thread و loop مشترک است
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._flush_scheduled = False
+        # ارسال‌های زمان‌بندی‌شده‌ی در جریان (روی loop)؛ flush منتظر آن‌ها هم می‌ماند
+        self._flushing = set()
+
+        # نتیجه‌های آماده برای main thread
+        self._results = deque()
+        self._deliver = Clock.create_trigger(self._deliver_results)
+
+        # شمارنده‌ها برای اندازه‌گیری
+        self.patches_pushed = 0
+        self.patches_coalesced = 0
+        self.batches_sent = 0
+        self.deliveries = 0
+
+    # -------------------------
+    # چرخه‌ی عمر
+    # -------------------------
+    def start(self):
+        if self._thread is not None:
+            return self
+        self._ready.clear()
+        self._thread = threading.Thread(target = self._run, name = "SyncEngine", daemon = True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def _run(self):
+        loop = self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self.pool = ConnectionPool(self.max_connections, self.timeout)
+        loop.call_soon(self._ready.set)
+        try:
+            loop.run_forever()
+        finally:
+            self.pool.close()
+            loop.close()
+
+    def stop(self, timeout = 5):
+        """ ارسال patch های باقی‌مانده و بستن loop و اتصال‌ها """
+        if self._thread is None:
+            return
+        self.flush(timeout)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._thread = None
+        self._loop = None
+
+    def _submit(self, coroutine):
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    # -------------------------
+    # درخواست‌ها
+    # -------------------------
+    def request(self, method, path, data = None, params = None, headers = None, callback = None):
+        """
+        درخواست غیرهمزمان؛ data به JSON تبدیل می‌شود.
+        callback(پاسخ یا exception) در فریم بعد از رسیدن پاسخ روی main thread صدا زده می‌شود.
+        یک concurrent.futures.Future هم برگردانده می‌شود.
+        """
+        url = build_url(self.base_url, path, params)
+        merged = dict(self.headers)
+        body = None
+        if data is not None:
+            body = json.dumps(data).encode("utf-8")
+            merged["Content-Type"] = "application/json"
+        merged.update(headers or {})
+        return self._submit(self._request(method, url, merged, body, (callback,) if callback else ()))
+
+    def get(self, path, params = None, callback = None, headers = None, cached = True):
+        """
+        GET با کش (اگر cache داده شده باشد):
+        - پاسخ تازه: callback همین حالا با پاسخ کش‌شده و بدون درخواست شبکه
+        - پاسخ کهنه: callback همین حالا با پاسخ کهنه، سپس درخواست شرطی؛
+          فقط اگر محتوا عوض شده باشد callback دوباره (در فریم بعد) با پاسخ جدید صدا زده می‌شود
+        - اگر همین ورودی در حال بازاعتبارسنجی باشد، درخواست دوم فرستاده نمی‌شود:
+          همان future برگردانده و callback به همان درخواست در جریان اضافه می‌شود
+        - نبود در کش: مثل request و ذخیره‌ی پاسخ
+        """
+        if self.cache is None or not cached:
+            return self.request("GET", path, params = params, headers = headers, callback = callback)
+
+        url = build_url(self.base_url, path, params)
+        merged = dict(self.headers)
+        merged.update(headers or {})
+        callbacks = [callback] if callback else []
+        entry = self.cache.lookup(url, merged)
+        if entry is None:
+            return self._submit(self._cached_get(url, merged, entry, callbacks))
+
+        response = entry.response()
+        if callback is not None:
+            callback(response)
+        if entry.is_fresh():
+            future = Future()
+            future.set_result(response)
+            return future
+        key = entry.key
+        with self._pending_lock:
+            inflight = self._revalidating.get(key)
+            if inflight is not None:
+                inflight[1].extend(callbacks)
+                return inflight[0]
+            inflight = self._revalidating[key] = [None, callbacks]
+        merged.update(entry.conditional_headers())
+        inflight[0] = self._submit(self._cached_get(url, merged, entry, callbacks, key))
+        return inflight[0]
+
+    async def _cached_get(self, url, headers, entry, callbacks, key = None):
+        """
+        callbacks لیستی است که تا پایان درخواست ممکن است callback های دیگری
+        (از get های هم‌زمان روی همان ورودی) به آن اضافه شوند؛ برای همین ورودی
+        _revalidating تا بعد از ذخیره و تحویل نتیجه نگه داشته می‌شود.
+        """
+        try:
+            try:
+                response = await self.pool.request("GET", url, headers)
+            except (HTTPError, OSError, asyncio.TimeoutError) as e:
+                if entry is None:
+                    self._complete(callbacks, e)
+                    raise
+                # نسخه‌ی کهنه قبلاً تحویل داده شده
+                return entry.response()
+
+            if response.status == 304 and entry is not None:
+                self.cache.revalidated_with(url, entry, response)
+                return entry.response()
+            self.cache.store(url, response, headers)
+            if entry is None or not entry.same_content(response):
+                self._complete(callbacks, response)
+            return response
+        finally:
+            if key is not None:
+                with self._pending_lock:
+                    self._revalidating.pop(key, None)
+
+    def post(self, path, data = None, callback = None, headers = None):
+        return self.request("POST", path, data = data, headers = headers, callback = callback)
+
+    async def _request(self, method, url, headers, body, callbacks):
+        try:
+            result = await self.pool.request(method, url, headers, body)
+        except (HTTPError, OSError, asyncio.TimeoutError) as e:
+            result = e
+        self._complete(callbacks, result)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    # -------------------------
+    # patch مدل‌ها
+    # -------------------------
+    def push(self, obj, callback = None):
+        """
+        صف کردن تغییرات obj (to_patch) برای ارسال گروهی؛ روی main thread صدا زده شود.
+        push های بعدی تا ارسال روی همان patch ادغام می‌شوند. وضعیت dirty فقط بعد از پاسخ
+        موفق (2xx) و فقط برای فیلدهایی که از زمان ارسال تغییر نکرده‌اند پاک می‌شود.
+        """
+        changes = obj.to_patch()
+        if not changes and callback is None:
+            return
+        pk_name = type(obj).objects.pk_name
+        pk = obj.original_values().get(pk_name, obj.__dict__.get(pk_name)) if pk_name else None
+
+        with self._pending_lock:
+            entry = self._pending.get(obj)
+            if entry is None:
+                self._pending[obj] = [{"model": type(obj).__name__, "pk": pk, "changes": changes},
+                                      [callback] if callback else []]
+            else:
+                entry[0]["changes"].update(changes)
+                if callback is not None:
+                    entry[1].append(callback)
+                self.patches_coalesced += 1
+            self.patches_pushed += 1
+            schedule = not self._flush_scheduled
+            self._flush_scheduled = True
+        if schedule:
+            self.start()
+            self._loop.call_soon_threadsafe(self._schedule_flush)
+
+    def _schedule_flush(self):
+        self._loop.call_later(self.batch_interval, self._start_flush)
+
+    def _start_flush(self):
+        task = self._loop.create_task(self._flush_patches())
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
+
+    def _take_pending(self):
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+            self._flush_scheduled = False
+        return list(pending.items())
+
+    async def _flush_patches(self):
+        entries = self._take_pending()
+        url = build_url(self.base_url, self.patch_path)
+        headers = dict(self.headers)
+        headers["Content-Type"] = "application/json"
+        sends = []
+        for start in range(0, len(entries), self.max_batch):
+            chunk = entries[start:start + self.max_batch]
+            body = json.dumps([patch for _, (patch, _) in chunk]).encode("utf-8")
+            sent = [(obj, patch["changes"]) for obj, (patch, _) in chunk]
+            # اول وضعیت dirty، بعد callback های کاربر (هر دو روی main thread)
+            callbacks = [lambda result, sent = sent: self._settle(sent, result)]
+            callbacks.extend(callback for _, (_, chunk_callbacks) in chunk for callback in chunk_callbacks)
+            self.batches_sent += 1
+            sends.append(self._send_batch(url, headers, body, callbacks))
+        if sends:
+            await asyncio.gather(*sends)
+
+    async def _send_batch(self, url, headers, body, callbacks):
+        try:
+            result = await self.pool.request("POST", url, headers, body)
+        except (HTTPError, OSError, asyncio.TimeoutError) as e:
+            result = e
+        self._complete(callbacks, result)
+
+    @staticmethod
+    def _settle(sent, result):
+        """ پس از پاسخ موفق: پاک کردن dirty فیلدهایی که مقدار فعلی‌شان همان مقدار ارسال‌شده است """
+        if isinstance(result, Exception) or not result.ok:
+            return
+        for obj, changes in sent:
+            changed = obj.changed_fields()
+            if not changed:
+                continue
+            current = obj.to_patch(changed & changes.keys())
+            obj.reset_dirty([name for name, value in current.items() if changes[name] == value])
+
+    def flush(self, timeout = None):
+        """ ارسال فوری patch های صف‌شده و صبر تا پایان (برای stop و تست) """
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._flush_all(), self._loop).result(timeout)
+
+    async def _flush_all(self):
+        await self._flush_patches()
+        while self._flushing:
+            await asyncio.gather(*self._flushing, return_exceptions = True)
+
+    # -------------------------
+    # تحویل روی main thread
+    # -------------------------
+    def _complete(self, callbacks, result):
+        # روی thread شبکه: فقط صف و یک trigger (چند trigger در یک فریم یکی می‌شوند)
+        if callbacks:
+            self._results.append((callbacks, result))
+            self._deliver()
+
+    def _deliver_results(self, *args):
+        results = self._results
+        count = len(results)
+        for _ in range(count):
+            callbacks, result = results.popleft()
+            for callback in callbacks:
+                callback(result)
+        if count:
+            self.deliveries += 1
@@ -24,6 +24,7 @@ class BaseContainer(MDResponsiveLayout, MDScreen):
 
         self.name = "container"
         self.state = {}
+        self.journal = None
         self.responsive_view = {}
         self.ids = {}  # مثل ids در KV اما دستی
 
@@ -36,10 +37,30 @@ class BaseContainer(MDResponsiveLayout, MDScreen):
     # ----------------------
     def set_state(self, key, value):
         self.state[key] = value
+        if self.journal is not None:
+            self.journal.set_state(key, value)
 
     def get_state(self, key, default=None):
         return self.state.get(key, default)
 
+    def delete_state(self, key):
+        self.state.pop(key, None)
+        if self.journal is not None:
+            self.journal.delete_state(key)
+
+    def attach_journal(self, journal):
+        """
+        بازیابی state از ChangeJournal (بعد از journal.load()) و ثبت تغییرات بعدی set_state در آن.
+        تغییر مستقیم self.state ثبت نمی‌شود.
+        """
+        self.journal = journal
+        local = dict(self.state)
+        self.state.update(journal.state)
+        # مقادیری که قبل از اتصال ست شده‌اند و در ژورنال نیستند
+        for key, value in local.items():
+            if key not in journal.state:
+                journal.set_state(key, value)
+
     # ----------------------
     # رجیستر/آنرجیستر
     # ----------------------
@@ -21,6 +21,10 @@ setup(
         'kivy>=2.3.0',
         'kivymd>=1.1.1',
     ],
+    extras_require={
+        # استخراج رنگ از تصویر (apply_image) و مسیرهای سریع برداری
+        'theme': ['numpy', 'pillow'],
+    },
     classifiers=[
         'Programming Language :: Python :: 3',
         'License :: OSI Approved :: MIT License',
@@ -0,0 +1,68 @@
+# tests/conftest.py
+import os
+import sys
+
+# Kivy بدون پردازش آرگومان‌های pytest و بدون لاگ کنسول/فایل
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+os.environ.setdefault("KIVY_NO_FILELOG", "1")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture
+def tick():
+    """ اجرای فریم‌های Clock (برای triggerها و callbackهای main thread) """
+    from kivy.clock import Clock
+
+    def run(frames = 1):
+        for _ in range(frames):
+            Clock.tick()
+    return run
+
+
+@pytest.fixture
+def http_server():
+    """
+    سرور HTTP/1.1 محلی به‌جای API واقعی:
+        http_server.routes[("GET", "/items/")] = lambda request: (200, {"ETag": "1"}, b"[]")
+    هر درخواست (method، path، headers، body) در http_server.requests ثبت می‌شود.
+    """
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _handle(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            request = (self.command, self.path, dict(self.headers), body)
+            self.server.requests.append(request)
+            route = self.server.routes.get((self.command, self.path.split("?")[0]))
+            status, headers, payload = route(request) if route else (404, {}, b"")
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            if payload:
+                self.wfile.write(payload)
+
+        do_GET = do_POST = _handle
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.routes = {}
+    server.requests = []
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}/"
+    thread = threading.Thread(target = server.serve_forever, args = (0.05,), daemon = True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,103 @@
+# tests/test_batch.py
+import pytest
+
+from kivy_projectile.models import BaseModel, batch
+from kivy_projectile.models.field import IntegerField, StringField
+
+
+class Item(BaseModel):
+    name = StringField(default = "")
+    count = IntegerField(default = 0)
+
+
+def record(obj, *events):
+    calls = []
+    for event in events:
+        obj.fbind(event, lambda instance, *args, event = event: calls.append((event,) + args))
+    return calls
+
+
+def test_batch_coalesces_field_events():
+    item = Item()
+    calls = record(item, "on_name_change", "on_count_change", "on_change")
+    with item.batch():
+        item.name = "a"
+        item.name = "b"
+        item.count = 1
+        assert calls == []
+    assert ("on_name_change", "b") in calls
+    assert ("on_count_change", 1) in calls
+    assert calls[-1] == ("on_change", {"name", "count"})
+    assert len(calls) == 3
+
+
+def test_batch_skips_fields_restored_to_original():
+    item = Item(count = 1)
+    calls = record(item, "on_count_change", "on_change")
+    with item.batch():
+        item.count = 2
+        item.count = 1
+    assert calls == []
+
+
+def test_batch_across_models_and_nesting():
+    first, second = Item(), Item()
+    first_calls, second_calls = record(first, "on_change"), record(second, "on_change")
+    with batch(first, second):
+        with first.batch():
+            first.count = 1
+        assert first_calls == []
+        second.count = 2
+    assert first_calls == [("on_change", {"count"})]
+    assert second_calls == [("on_change", {"count"})]
+
+
+def test_on_change_dispatched_only_with_listeners():
+    item = Item()
+    dispatched = []
+    original = item.dispatch
+
+    def spy(name, *args):
+        dispatched.append(name)
+        return original(name, *args)
+
+    item.dispatch = spy
+    item.count = 1
+    assert dispatched == ["on_count_change"]
+
+    calls = record(item, "on_change")
+    item.count = 2
+    assert dispatched[-1] == "on_change"
+    assert calls == [("on_change", {"count"})]
+
+
+def test_on_change_listener_tracking_after_unbind():
+    item = Item()
+    uid = item.fbind("on_change", lambda *args: None)
+    assert item._change_observed
+    item.unbind_uid("on_change", uid)
+    assert not item._change_observed
+
+
+def test_on_change_handler_override_is_dispatched():
+    class Handled(Item):
+        def on_change(self, changed):
+            self.seen = changed
+
+    item = Handled()
+    item.count = 3
+    assert item.seen == {"count"}
+
+
+def test_batch_error_discards_queued_events():
+    item = Item()
+    calls = record(item, "on_count_change", "on_change")
+    with pytest.raises(RuntimeError):
+        with item.batch():
+            item.count = 5
+            raise RuntimeError("half applied")
+    assert calls == []
+    # مقدار برنمی‌گردد و batch بسته شده است
+    assert item.count == 5 and item.changed_fields() == {"count"}
+    item.count = 6
+    assert calls[0] == ("on_count_change", 6)
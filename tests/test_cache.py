@@ -0,0 +1,98 @@
+# tests/test_cache.py
+import threading
+
+import pytest
+
+from kivy_projectile.network.cache import HTTPCache
+from kivy_projectile.network.client import HTTPResponse
+from kivy_projectile.network.sync import SyncEngine
+
+
+URL = "http://example.test/items/"
+
+
+def ok(body, **headers):
+    return HTTPResponse(200, "OK", {name.replace("_", "-"): value for name, value in headers.items()}, body)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return HTTPCache(tmp_path / "cache")
+
+
+def test_vary_headers_are_part_of_the_key(cache, tmp_path):
+    cache.store(URL, ok(b"fa", cache_control = "max-age=60", vary = "Accept-Language"), {"Accept-Language": "fa"})
+    cache.store(URL, ok(b"en", cache_control = "max-age=60", vary = "Accept-Language"), {"accept-language": "en"})
+
+    assert cache.lookup(URL, {"Accept-Language": "fa"}).body == b"fa"
+    assert cache.lookup(URL, {"Accept-Language": "en"}).body == b"en"
+    assert cache.lookup(URL, {"Accept-Language": "de"}) is None
+    assert cache.lookup(URL) is None
+
+    # بعد از راه‌اندازی دوباره، نسخه‌ها از دیسک پیدا می‌شوند
+    reopened = HTTPCache(tmp_path / "cache")
+    assert reopened.lookup(URL, {"Accept-Language": "en"}).body == b"en"
+
+
+def test_vary_star_is_not_cached(cache):
+    assert cache.store(URL, ok(b"x", cache_control = "max-age=60", vary = "*")) is None
+    assert cache.lookup(URL) is None
+
+
+def test_authorized_requests_cached_only_when_public(cache):
+    auth = {"Authorization": "Bearer t"}
+    assert cache.store(URL, ok(b"private", cache_control = "max-age=60"), auth) is None
+    assert cache.lookup(URL, auth) is None
+
+    assert cache.store(URL, ok(b"shared", cache_control = "public, max-age=60"), auth) is not None
+    assert cache.lookup(URL, auth).body == b"shared"
+
+
+def test_concurrent_get_shares_revalidation(http_server, tmp_path, tick):
+    release = threading.Event()
+
+    def items(request):
+        release.wait(5)
+        return 200, {"ETag": "1", "Cache-Control": "no-cache"}, b"new"
+
+    http_server.routes[("GET", "/items/")] = items
+    cache = HTTPCache(tmp_path / "cache")
+    cache.store(http_server.base_url + "items/", ok(b"old", etag = "0", cache_control = "no-cache"))
+    engine = SyncEngine(http_server.base_url, cache = cache)
+    try:
+        first, second = [], []
+        future = engine.get("items/", callback = first.append)
+        assert engine.get("items/", callback = second.append) is future
+        assert [r.body for r in first] == [b"old"] and [r.body for r in second] == [b"old"]
+
+        release.set()
+        assert future.result(5).body == b"new"
+        tick()
+        assert [r.body for r in first] == [b"old", b"new"]
+        assert [r.body for r in second] == [b"old", b"new"]
+        assert len(http_server.requests) == 1
+    finally:
+        engine.stop()
+
+
+@pytest.mark.parametrize("cached_etag, etag, body", [
+    ("0", "0", b"changed"),     # ETag یکسان: همان محتوا
+    (None, "2", b"old"),        # بدون ETag قبلی: مقایسه‌ی بدنه
+])
+def test_unchanged_revalidation_does_not_call_back_again(http_server, tmp_path, tick, cached_etag, etag, body):
+    http_server.routes[("GET", "/items/")] = lambda request: (200, {"ETag": etag, "Cache-Control": "no-cache"}, body)
+    cache = HTTPCache(tmp_path / "cache")
+    url = http_server.base_url + "items/"
+    headers = {"etag": cached_etag} if cached_etag else {}
+    cache.store(url, ok(b"old", cache_control = "no-cache", **headers))
+    engine = SyncEngine(http_server.base_url, cache = cache)
+    try:
+        results = []
+        future = engine.get("items/", callback = results.append)
+        assert future.result(5).body == body
+        tick()
+        assert [r.body for r in results] == [b"old"]
+        assert cache.lookup(url).body == body
+        assert not engine._revalidating
+    finally:
+        engine.stop()
@@ -0,0 +1,58 @@
+# tests/test_computed.py
+from kivy_projectile.models import BaseModel, batch
+from kivy_projectile.models.field import ComputedField, ForeignKey, StringField
+
+
+class Person(BaseModel):
+    first = StringField(default = "")
+    last = StringField(default = "")
+    full_name = ComputedField(lambda self: f"{self.first} {self.last}".strip())
+
+
+class Badge(BaseModel):
+    person = ForeignKey(Person, null = True)
+    caption = ComputedField(lambda self: self.person.full_name.upper() if self.person else "")
+
+
+def events(obj, name):
+    calls = []
+    obj.fbind(name, lambda *args: calls.append(args))
+    return calls
+
+
+def test_value_is_cached_and_invalidated():
+    person = Person(first = "ada", last = "lovelace")
+    calls = events(person, "on_full_name_change")
+    assert person.full_name == "ada lovelace"
+    person.last = "byron"
+    assert len(calls) == 1
+    # بدون خواندن دوباره، تغییر بعدی رویداد تازه‌ای ندارد
+    person.first = "anne"
+    assert len(calls) == 1
+    assert person.full_name == "anne byron"
+
+
+def test_computed_event_waits_for_batch():
+    person = Person(first = "a", last = "b")
+    assert person.full_name == "a b"
+    calls = events(person, "on_full_name_change")
+    with person.batch():
+        person.first = "c"
+        assert calls == []
+        assert person.full_name == "c b"
+        person.last = "d"
+        assert calls == []
+    assert len(calls) == 1
+    assert person.full_name == "c d"
+
+
+def test_dependency_through_foreign_key():
+    person = Person(first = "x")
+    badge = Badge(person = person)
+    assert badge.caption == "X"
+    calls = events(badge, "on_caption_change")
+    with batch(badge):
+        person.first = "y"
+        assert calls == []
+    assert len(calls) == 1
+    assert badge.caption == "Y"
@@ -0,0 +1,89 @@
+# tests/test_delete.py
+import pytest
+
+from kivy_projectile.models import BaseModel, CASCADE, PROTECT, SET_NULL, ProtectedError, delete
+from kivy_projectile.models.field import ForeignKey, IntegerField, StringField
+
+
+class Owner(BaseModel):
+    uid = IntegerField(primary_key = True)
+
+
+class Pet(BaseModel):
+    name = StringField(default = "")
+    owner = ForeignKey(Owner, null = True, related_name = "pets", on_delete = CASCADE)
+
+
+class Visit(BaseModel):
+    pet = ForeignKey(Pet, null = True, related_name = "visits", on_delete = SET_NULL)
+
+
+class Licence(BaseModel):
+    owner = ForeignKey(Owner, null = True, related_name = "licences", on_delete = PROTECT)
+
+
+def test_reverse_set_follows_reassignment():
+    first, second = Owner(uid = 1), Owner(uid = 2)
+    pet = Pet(owner = first)
+    assert set(first.pets) == {pet}
+    pet.owner = second
+    assert set(first.pets) == set()
+    assert set(second.pets) == {pet}
+    pet.owner = None
+    assert set(second.pets) == set()
+
+
+def test_cascade_and_set_null():
+    owner = Owner(uid = 3)
+    pet = Pet(owner = owner)
+    visit = Visit(pet = pet)
+    deleted_events = []
+    pet.fbind("on_delete", lambda obj: deleted_events.append(obj))
+    changes = []
+    visit.fbind("on_pet_change", lambda obj, value: changes.append(value))
+
+    deleted = owner.delete()
+    assert set(deleted) == {owner, pet}
+    assert deleted_events == [pet]
+    assert visit.pet is None
+    assert changes == [None]
+    assert Owner.objects.get_by_pk(3) is None
+
+
+def test_protect_blocks_without_changes():
+    owner = Owner(uid = 4)
+    pet = Pet(owner = owner)
+    licence = Licence(owner = owner)
+    with pytest.raises(ProtectedError):
+        owner.delete()
+    assert pet.owner is owner
+    assert Owner.objects.get_by_pk(4) is owner
+    # حذف هم‌زمان فرزند محافظت‌شده مجاز است
+    assert set(delete(owner, licence)) == {owner, pet, licence}
+
+
+def test_set_null_requires_nullable_foreign_key():
+    with pytest.raises(ValueError):
+        class Tag(BaseModel):
+            owner = ForeignKey(Owner, null = False, related_name = "tags", on_delete = SET_NULL)
+
+
+def test_set_null_checked_before_any_change():
+    class StrictKey(ForeignKey):
+        def validate(self, value):
+            if value is None:
+                raise ValueError(f"{self.name} is required")
+            return value
+
+    class Collar(BaseModel):
+        owner = ForeignKey(Owner, null = True, related_name = "collars", on_delete = SET_NULL)
+
+    class Chip(BaseModel):
+        owner = StrictKey(Owner, null = True, related_name = "chips", on_delete = SET_NULL)
+
+    owner = Owner(uid = 30)
+    collar, chip = Collar(owner = owner), Chip(owner = owner)
+    with pytest.raises(ValueError):
+        owner.delete()
+    assert collar.owner is owner and chip.owner is owner
+    assert Owner.objects.get_by_pk(30) is owner
@@ -0,0 +1,74 @@
+# tests/test_extraction.py
+import time
+
+import pytest
+
+from kivy_projectile.app.theme import SeedExtractor, extract_seed_colors
+from kivy_projectile.app.theme.extraction import FALLBACK_SEED, load_pixels
+
+np = pytest.importorskip("numpy")
+
+BLUE = (30, 90, 200)
+ORANGE = (230, 120, 20)
+
+
+def two_color_image(ratio = 0.7, size = 100):
+    image = np.zeros((size, size, 3), np.uint8)
+    split = int(size * ratio)
+    image[:split] = BLUE
+    image[split:] = ORANGE
+    return image
+
+
+def test_dominant_color_comes_first():
+    assert extract_seed_colors(two_color_image(0.7)) == ["#1E5AC8", "#E67814"]
+    assert extract_seed_colors(two_color_image(0.2)) == ["#E67814", "#1E5AC8"]
+
+
+def test_gray_image_falls_back():
+    assert extract_seed_colors(np.full((50, 50, 3), 128, np.uint8)) == [FALLBACK_SEED]
+
+
+def test_transparent_pixels_are_ignored():
+    image = np.zeros((50, 50, 4), np.uint8)
+    image[..., :3] = ORANGE
+    image[:25, :, 3] = 255
+    image[25:, :, :3] = BLUE
+    assert extract_seed_colors(image) == ["#E67814"]
+
+
+def test_large_images_are_downsampled():
+    pixels = load_pixels(np.zeros((1000, 1000, 3), np.uint8), max_pixels = 100 * 100)
+    assert len(pixels) <= 100 * 100 and pixels.shape[1] == 3
+    with pytest.raises(ValueError):
+        load_pixels(np.zeros((10, 10), np.uint8))
+
+
+def test_extractor_caches_by_image_content(tick):
+    extractor = SeedExtractor()
+    try:
+        image = two_color_image()
+        assert extractor.extract(image) == extractor.extract(image.copy())
+        assert (extractor.hits, extractor.misses) == (1, 1)
+
+        results = []
+        extractor.extract_async(two_color_image(0.2), results.append).result(10)
+        # callback پس از پایان future روی main thread زمان‌بندی می‌شود
+        for _ in range(100):
+            tick()
+            if results:
+                break
+            time.sleep(0.01)
+        assert results == [["#E67814", "#1E5AC8"]]
+    finally:
+        extractor.shutdown()
+
+
+def test_missing_pillow_names_the_extra(monkeypatch, tmp_path):
+    from kivy_projectile.app.theme import BaseTheme, extraction
+
+    monkeypatch.setattr(extraction, "PILImage", None)
+    with pytest.raises(ImportError, match = r"kivy_projectile\[theme\]"):
+        BaseTheme().apply_image(str(tmp_path / "wallpaper.png"))
+    # آرایه‌ها بدون Pillow هم کار می‌کنند
+    assert load_pixels(two_color_image()).shape[1] == 3
@@ -0,0 +1,47 @@
+# tests/test_hct.py
+import pytest
+
+from kivy_projectile.app.theme import hct
+
+COLORS = ("#FF0000", "#00FF00", "#0000FF", "#6750A4", "#B3261E", "#605D62", "#FFFFFF", "#000000")
+
+
+def test_hct_of_red_matches_reference():
+    # مقادیر مرجع material-color-utilities
+    hue, chroma, tone = hct.hct_from_rgb(255, 0, 0)
+    assert hue == pytest.approx(27.408, abs = 1e-3)
+    assert chroma == pytest.approx(113.358, abs = 1e-3)
+    assert tone == pytest.approx(53.233, abs = 1e-3)
+
+
+@pytest.mark.parametrize("hex_color", COLORS)
+def test_solve_rgb_round_trips(hex_color):
+    rgb = hct.hex_to_rgb8(hex_color)
+    solved = hct.solve_rgb(*hct.hct_from_rgb(*rgb))
+    assert all(abs(a - b) <= 1 for a, b in zip(solved, rgb))
+
+
+def test_out_of_gamut_chroma_is_clamped():
+    r, g, b = hct.solve_rgb(120.0, 200.0, 50.0)
+    _, chroma, tone = hct.hct_from_rgb(r, g, b)
+    assert chroma < 200.0 and tone == pytest.approx(50.0, abs = 1.0)
+
+
+def test_vector_path_matches_scalar_path():
+    np = pytest.importorskip("numpy")
+    rgb = np.array([hct.hex_to_rgb8(hex_color) for hex_color in COLORS])
+    vector = hct.hct_from_rgb_array(rgb)
+    scalar = np.array([hct.hct_from_rgb(*color) for color in rgb.tolist()])
+    # hue رنگ‌های خاکستری تعریف‌نشده است
+    assert np.allclose(vector[:, 1:], scalar[:, 1:], atol = 1e-6)
+    assert np.allclose(vector[:6, 0], scalar[:6, 0], atol = 1e-6)
+
+    tones = (0, 10, 40, 60, 90, 100)
+    seeds = [hct.rgb_to_hex(*color) for color in np.random.default_rng(1).integers(0, 256, (32, 3)).tolist()]
+    assert len(seeds) * len(tones) >= hct.VECTOR_THRESHOLD
+    batched = hct.tonal_palettes(seeds, tones)
+    for seed, palette in zip(seeds, batched):
+        hue, chroma, _ = hct.hct_from_rgb(*hct.hex_to_rgb8(seed))
+        expected = [hct.solve_rgb(hue, chroma, tone) for tone in tones]
+        got = [hct.hex_to_rgb8(value) for value in palette]
+        assert all(abs(a - b) <= 1 for pair in zip(got, expected) for a, b in zip(*pair))
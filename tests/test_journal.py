@@ -0,0 +1,166 @@
+# tests/test_journal.py
+import gc
+import os
+
+from kivy_projectile.models import BaseModel, ChangeJournal
+from kivy_projectile.models.field import ForeignKey, IntegerField, StringField
+
+
+class Writer(BaseModel):
+    uid = IntegerField(primary_key = True)
+    name = StringField(default = "")
+
+
+class Essay(BaseModel):
+    uid = IntegerField(primary_key = True)
+    title = StringField(default = "")
+    writer = ForeignKey(Writer, null = True, related_name = "essays")
+
+
+def open_journal(path, **kwargs):
+    return ChangeJournal(path, models = (Writer, Essay), **kwargs)
+
+
+def write_sample(path):
+    journal = open_journal(path)
+    journal.load()
+    writer = Writer(uid = 1, name = "w")
+    essays = [Essay(uid = i, title = f"e{i}", writer = writer) for i in range(5)]
+    journal.track(writer, *essays)
+    journal.compact()
+    # دنباله‌ی لاگ بعد از snapshot
+    essays[0].title = "changed"
+    essays[4].delete()
+    journal.track(Essay(uid = 9, title = "tail"))
+    journal.set_state("theme", "dark")
+    journal.set_state("empty", None)
+    journal.close()
+    del writer, essays
+    gc.collect()
+
+
+def test_round_trip_is_lazy(tmp_path):
+    write_sample(tmp_path)
+    journal = open_journal(tmp_path)
+    journal.load()
+    assert journal.state == {"theme": "dark", "empty": None}
+    assert Essay.objects.count() == 0 and Writer.objects.count() == 0
+    assert journal._rows == {}
+
+    essay = journal.get(Essay, 0)
+    assert essay.title == "changed"
+    assert Essay.objects.count() == 1
+    assert journal.get(Essay, 4) is None
+    assert sorted(journal.keys(Essay)) == [0, 1, 2, 3, 9]
+
+    writer = essay.writer
+    assert writer.name == "w"
+    essays = journal.objects(Essay)
+    assert {e.uid for e in writer.essays} == {0, 1, 2, 3}
+    journal.close()
+
+
+def test_changes_after_lazy_load_survive_compaction(tmp_path):
+    write_sample(tmp_path)
+    journal = open_journal(tmp_path)
+    journal.load()
+    essay = journal.get(Essay, 1)
+    essay.title = "edited"
+    journal.compact()
+    journal.close()
+    del essay
+    gc.collect()
+
+    journal = open_journal(tmp_path)
+    journal.load()
+    assert journal.get(Essay, 1).title == "edited"
+    # ردیف‌هایی که هرگز درخواست نشدند هم در snapshot جدید هستند
+    assert sorted(journal.keys(Essay)) == [0, 1, 2, 3, 9]
+    assert journal.get(Essay, 2).title == "e2"
+    journal.close()
+
+
+def test_delete_state_of_none_value(tmp_path):
+    write_sample(tmp_path)
+    journal = open_journal(tmp_path)
+    journal.load()
+    journal.delete_state("empty")
+    journal.close()
+
+    journal = open_journal(tmp_path)
+    journal.load()
+    assert journal.state == {"theme": "dark"}
+    journal.close()
+
+
+def test_unencodable_state_is_skipped(tmp_path):
+    journal = open_journal(tmp_path)
+    journal.load()
+    journal.set_state("widget", object())
+    journal.set_state("ok", [1, 2])
+    assert journal.state == {"ok": [1, 2]}
+    journal.close()
+
+    journal = open_journal(tmp_path)
+    journal.load()
+    assert journal.state == {"ok": [1, 2]}
+    journal.close()
+
+
+def test_torn_tail_is_truncated(tmp_path):
+    write_sample(tmp_path)
+    log_path = os.path.join(tmp_path, ChangeJournal.log_name)
+    size = os.path.getsize(log_path)
+    with open(log_path, "ab") as fp:
+        fp.write(b"\x10\x00\x00\x00garbage")
+    journal = open_journal(tmp_path)
+    journal.load()
+    assert os.path.getsize(log_path) == size
+    assert journal.get(Essay, 9).title == "tail"
+    journal.close()
+
+
+def test_snapshot_rows_are_checked_when_decoded(tmp_path):
+    write_sample(tmp_path)
+    snapshot_path = os.path.join(tmp_path, ChangeJournal.snapshot_name)
+    with open(snapshot_path, "rb") as fp:
+        data = fp.read()
+    with open(snapshot_path, "wb") as fp:
+        fp.write(data.replace(b"e2", b"e7"))
+
+    journal = open_journal(tmp_path)
+    journal.load()
+    # load فقط فهرست می‌کند؛ رکورد خراب در اولین decode همان مدل کنار گذاشته می‌شود
+    assert "Essay" in journal._chunks
+    assert journal.keys(Writer) == [1]
+    assert journal.keys(Essay) == [9]
+    journal.close()
+
+
+def test_compact_async_keeps_changes_made_while_writing(tmp_path, tick):
+    write_sample(tmp_path)
+    journal = open_journal(tmp_path)
+    journal.load()
+    essay = journal.get(Essay, 1)
+    results = []
+    journal.compact_async(callback = results.append)
+    essay.title = "during"
+    journal.set_state("theme", "light")
+    journal.flush()
+    for _ in range(500):
+        if results:
+            break
+        journal._compaction.thread.join(0.01)
+        tick()
+    assert results == [None]
+    assert journal._generation == 2 and journal._records == 2
+    journal.close()
+    del essay
+    gc.collect()
+
+    journal = open_journal(tmp_path)
+    journal.load()
+    assert journal.state["theme"] == "light"
+    assert journal.get(Essay, 1).title == "during"
+    assert sorted(journal.keys(Essay)) == [0, 1, 2, 3, 9]
+    journal.close()
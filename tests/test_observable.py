@@ -0,0 +1,107 @@
+# tests/test_observable.py
+import pytest
+
+from kivy_projectile.models import BaseModel
+from kivy_projectile.models.field import CollectionField, ManyToManyField, OneToManyField, StringField
+from kivy_projectile.models.observable import ObservableList
+
+
+class Tag(BaseModel):
+    name = StringField(default = "")
+
+
+class Post(BaseModel):
+    tags = OneToManyField(Tag)
+    labels = ManyToManyField(Tag)
+
+
+def diffs(obj, event):
+    calls = []
+    obj.fbind(event, lambda instance, ops: calls.append(ops))
+    return calls
+
+
+def test_failed_mutation_does_not_mark_dirty():
+    post = Post()
+    with pytest.raises(IndexError):
+        post.tags.pop()
+    with pytest.raises(KeyError):
+        post.labels.pop()
+    assert not post.is_dirty()
+
+
+def test_snapshot_taken_before_first_change():
+    tag = Tag()
+    post = Post(tags = [tag])
+    post.tags.append(Tag())
+    post.tags.pop(0)
+    assert post.original_values() == {"tags": [tag]}
+    post.reset_dirty()
+    post.tags.clear()
+    assert post.changed_fields() == {"tags"}
+
+
+def test_imul_reports_insert():
+    tag = Tag()
+    post = Post(tags = [tag])
+    calls = diffs(post, "on_tags_diff")
+    post.tags *= 3
+    assert list(post.tags) == [tag] * 3
+    assert calls == [[("insert", 1, [tag, tag])]]
+    post.tags *= 0
+    assert list(post.tags) == []
+    assert calls[-1] == [("remove", 0, [tag, tag, tag])]
+
+
+def test_in_place_set_operators():
+    a, b, c = Tag(), Tag(), Tag()
+    post = Post(labels = {a, b})
+    calls = diffs(post, "on_labels_diff")
+    post.labels &= {b, c}
+    assert post.labels == {b}
+    post.labels ^= {b, c}
+    assert post.labels == {c}
+    assert calls == [[("discard", [a])], [("discard", [b])], [("add", [c])]]
+
+
+def test_collection_field_default_diff():
+    class Bag(CollectionField):
+        container = ObservableList
+
+    field = Bag()
+    a, b = Tag(), Tag()
+    assert field.diff([a], [a]) == []
+    assert field.diff([a], [b, a]) == [("reset", [b, a])]
+
+
+def test_out_of_range_negative_index_raises():
+    a, b, c = Tag(), Tag(), Tag()
+    post = Post(tags = [a, b, c])
+    calls = diffs(post, "on_tags_diff")
+    with pytest.raises(IndexError):
+        post.tags.pop(-5)
+    with pytest.raises(IndexError):
+        post.tags[-4] = Tag()
+    with pytest.raises(IndexError):
+        del post.tags[-4]
+    with pytest.raises(IndexError):
+        post.tags.move(-4, 0)
+    assert list(post.tags) == [a, b, c]
+    assert calls == [] and not post.is_dirty()
+
+
+def test_negative_indexes_are_normalized_in_ops():
+    a, b, c, d = Tag(), Tag(), Tag(), Tag()
+    post = Post(tags = [a, b, c])
+    calls = diffs(post, "on_tags_diff")
+    assert post.tags.pop(-1) is c
+    post.tags[-1] = d
+    post.tags.move(-1, -2)
+    post.tags.move(0, 10)
+    assert list(post.tags) == [a, d]
+    assert calls == [
+        [("remove", 2, [c])],
+        [("replace", 1, [b], [d])],
+        [("move", 1, 0)],
+        [("move", 0, 1)],
+    ]
@@ -0,0 +1,72 @@
+# tests/test_overlay.py
+import gc
+import weakref
+
+from kivy.properties import ListProperty
+from kivy.uix.widget import Widget
+
+from kivy_projectile.app.theme import BaseTheme, M3ThemableBehavior, ThemeOverlay
+
+
+class Swatch(M3ThemableBehavior, Widget):
+    bg_color = ListProperty([0, 0, 0, 0])
+
+
+def test_overlay_follows_parent_except_overrides():
+    theme = BaseTheme()
+    overlay = ThemeOverlay(theme, tokens = {"surface": ("#FFFFFF", "#101010")})
+    assert overlay.get_hex("surface") == "#FFFFFF"
+    assert overlay.get_hex("primary") == theme.get_hex("primary")
+
+    theme.mode = "dark"
+    assert overlay.get_hex("surface") == "#101010"
+    theme.source_primary = "#006A6A"
+    assert overlay.get_hex("primary") == theme.get_hex("primary")
+
+
+def test_parent_does_not_keep_overlay_alive():
+    theme = BaseTheme()
+    overlay = ThemeOverlay(theme, source_primary = "#006A6A")
+    ref = weakref.ref(overlay)
+    del overlay
+    gc.collect()
+    assert ref() is None
+    # اتصال‌ها هم قطع شده‌اند
+    theme.mode = "dark"
+
+    kept = ThemeOverlay(theme)
+    kept.detach()
+    kept.detach()
+    theme.mode = "light"
+    assert kept.get_hex("surface") != theme.get_hex("surface")
+
+
+def test_nested_overlay_uses_root_transition_budget(tick):
+    theme = BaseTheme(transition_duration = 10, transition_budget = 0.01)
+    inner = ThemeOverlay(ThemeOverlay(theme))
+    assert inner.transition_budget == 0.01
+
+    theme.mode = "dark"
+    tick(2)
+    assert inner.dispatcher.skip_offscreen
+    assert inner.dispatcher.frame_budget == 0.01
+    theme.transition.finish()
+    assert not inner.dispatcher.skip_offscreen
+
+
+def test_plain_subtree_added_anywhere_is_resolved():
+    overlay_a, overlay_b = ThemeOverlay(BaseTheme()), ThemeOverlay(BaseTheme())
+    first, second = Swatch(theme_overlay = overlay_a), Swatch(theme_overlay = overlay_b)
+    plain = Widget()
+    inner = Swatch(target_bg_prop = ["bg_color"])
+    plain.add_widget(inner)
+
+    # نه در ابتدای لیست children
+    first.add_widget(Widget())
+    first.add_widget(plain, index = 1)
+    assert inner.theme is overlay_a
+
+    first.remove_widget(plain)
+    second.add_widget(Widget())
+    second.add_widget(plain, index = 1)
+    assert inner.theme is overlay_b
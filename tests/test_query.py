@@ -0,0 +1,50 @@
+# tests/test_query.py
+import gc
+
+import pytest
+
+from kivy_projectile.models import BaseModel
+from kivy_projectile.models.field import IntegerField, StringField
+
+
+class Book(BaseModel):
+    uid = IntegerField(primary_key = True)
+    title = StringField(default = "", index = True)
+    year = IntegerField(null = True, index = 'sorted')
+
+
+def test_identity_map_and_indexes():
+    books = [Book(uid = i, title = f"t{i % 3}", year = 2000 + i) for i in range(6)]
+    assert Book.objects.get_by_pk(4) is books[4]
+    assert {book.uid for book in Book.objects.filter(title = "t1")} == {1, 4}
+    assert [book.uid for book in Book.objects.filter(year__gte = 2003).order_by("-year")] == [5, 4, 3]
+    books[0].year = 2010
+    assert Book.objects.order_by("-year").first() is books[0]
+
+
+def test_dropped_instances_are_released():
+    books = [Book(uid = 1000 + i, title = "weak", year = i if i % 2 else None) for i in range(1000)]
+    assert Book.objects.filter(title = "weak").count() == 1000
+    del books
+    gc.collect()
+    assert Book.objects.get_by_pk(1000) is None
+    assert Book.objects.filter(title = "weak").count() == 0
+    assert Book.objects.filter(year__isnull = True).count() == 0
+    assert not list(Book.objects.order_by("year"))
+    assert len(Book.objects.indexes["year"]) == 0
+    assert Book.objects.count() == 0
+
+
+def test_duplicate_pk_is_rejected_before_write():
+    book = Book(uid = 10)
+    taken = Book(uid = 11)
+    calls = []
+    book.fbind("on_uid_change", lambda *args: calls.append(args))
+    book.fbind("on_change", lambda *args: calls.append(args))
+    with pytest.raises(ValueError):
+        book.uid = 11
+    assert book.uid == 10
+    assert Book.objects.get_by_pk(10) is book
+    assert Book.objects.get_by_pk(11) is taken
+    assert calls == []
+    assert not book.is_dirty()
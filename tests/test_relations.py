@@ -0,0 +1,63 @@
+# tests/test_relations.py
+import gc
+import weakref
+
+from kivy_projectile.models import BaseModel
+from kivy_projectile.models.field import ForeignKey, ManyToManyField, OneToManyField, StringField
+
+
+class Tag(BaseModel):
+    label = StringField(default = "")
+
+
+class Post(BaseModel):
+    title = StringField(default = "")
+    tag = ForeignKey(Tag, related_name = "posts")
+    tags = OneToManyField(Tag)
+    topics = ManyToManyField(Tag)
+
+
+def observers(obj):
+    return len(obj.get_property_observers("on_change"))
+
+
+def test_reassignment_unbinds_previous_target():
+    first, second = Tag(), Tag()
+    post = Post(tag = first)
+    assert observers(first) == 1
+    post.tag = second
+    assert observers(first) == 0
+    assert observers(second) == 1
+    post.tag = None
+    assert observers(second) == 0
+
+
+def test_related_change_reaches_owner():
+    tag = Tag()
+    post = Post(tag = tag)
+    seen = []
+    post.fbind("on_tag_change", lambda instance, value: seen.append(value))
+    tag.label = "x"
+    assert seen == [tag]
+
+
+def test_duplicate_items_share_one_subscription():
+    tag = Tag()
+    post = Post(tags = [tag, tag])
+    assert observers(tag) == 1
+    post.tags.pop()
+    assert observers(tag) == 1
+    post.tags.pop()
+    assert observers(tag) == 0
+
+
+def test_related_object_does_not_pin_owner():
+    tag = Tag()
+    post = Post(tag = tag, topics = {tag})
+    owner = weakref.ref(post)
+    del post
+    gc.collect()
+    assert owner() is None
+    # اولین رویداد بعد از مرگ مالک، اشتراک مرده را پاک می‌کند
+    tag.label = "changed"
+    assert observers(tag) == 0
@@ -0,0 +1,49 @@
+# tests/test_schema.py
+import pytest
+
+from kivy_projectile.models import BaseModel
+from kivy_projectile.models.field import IntegerField, OneToManyField, StringField
+
+
+class Base(BaseModel):
+    name = StringField(default = "")
+    tags = OneToManyField(BaseModel)
+
+
+class Child(Base):
+    age = IntegerField(default = 0)
+
+
+class Shadowed(Child):
+    # فیلد والد با attribute معمولی پوشانده می‌شود
+    age = 5
+
+
+def test_fields_collected_across_mro():
+    assert list(Child._fields) == ["name", "tags", "age"]
+    assert "age" not in Shadowed._fields
+
+
+def test_events_declared_once_per_class():
+    assert "on_name_change" in Child.__events__
+    assert "on_age_change" in Child.__events__
+    assert "on_tags_diff" in Child.__events__
+    seen = []
+    obj = Child()
+    obj.bind(on_age_change = lambda instance, value: seen.append(value))
+    obj.age = 3
+    assert seen == [3]
+
+
+def test_mutable_defaults_are_copied_per_instance():
+    first, second = Child(), Child()
+    first.tags.append(Child())
+    assert len(first.tags) == 1
+    assert len(second.tags) == 0
+
+
+def test_kwargs_are_validated():
+    obj = Child(name = "a", age = 2)
+    assert (obj.name, obj.age) == ("a", 2)
+    with pytest.raises(TypeError):
+        Child(age = "x")
@@ -0,0 +1,50 @@
+# tests/test_serialization.py
+import io
+
+from kivy_projectile.models import BaseModel, dump_json, load_json
+from kivy_projectile.models.field import ForeignKey, OneToManyField, StringField
+
+
+class Node(BaseModel):
+    name = StringField(default = "")
+    peer = ForeignKey(BaseModel, null = True, related_name = "node_peers")
+
+
+class Group(BaseModel):
+    name = StringField(default = "")
+    members = OneToManyField(Node)
+
+
+def test_shared_reference_without_cycle_is_expanded():
+    shared = Node(name = "shared")
+    group = Group(name = "g", members = [Node(name = "a", peer = shared), Node(name = "b", peer = shared)])
+    data = group.to_dict()
+    peers = [member["peer"] for member in data["members"]]
+    assert peers == [{"name": "shared", "peer": None}] * 2
+    assert "$ref" not in repr(data) and "$id" not in repr(data)
+
+
+def test_cycle_uses_sequential_ids():
+    first, second = Node(name = "first"), Node(name = "second")
+    first.peer = second
+    second.peer = first
+    data = first.to_dict()
+    assert data == {"name": "first", "peer": {"name": "second", "peer": {"$ref": 1}}, "$id": 1}
+    assert first.to_dict() == data
+    assert Node(name = "x", peer = first).to_dict()["peer"] == data
+
+
+def test_stream_ids_are_deterministic():
+    shared = Node(name = "shared")
+    groups = [Group(name = "a", members = [shared]), Group(name = "b", members = [shared])]
+    outputs = []
+    for _ in range(2):
+        fp = io.StringIO()
+        dump_json(groups, fp)
+        outputs.append(fp.getvalue())
+    assert outputs[0] == outputs[1]
+    assert '"$id": 2' in outputs[0] and '{"$ref": 2}' in outputs[0]
+
+    first, second = load_json(Group, io.StringIO(outputs[0]))
+    assert first.members[0] is second.members[0]
+    assert first.members[0].name == "shared"
@@ -0,0 +1,139 @@
+# tests/test_storage.py
+import gc
+import sqlite3
+
+import pytest
+
+from kivy_projectile.models import BaseModel, SQLiteStorage
+from kivy_projectile.models.field import ForeignKey, IntegerField, StringField
+
+
+class Shelf(BaseModel):
+    uid = IntegerField(primary_key = True)
+    label = StringField(default = "")
+
+
+class Volume(BaseModel):
+    uid = IntegerField(primary_key = True)
+    title = StringField(default = "")
+    shelf = ForeignKey(Shelf, null = True, related_name = "volumes")
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = SQLiteStorage(tmp_path / "db.sqlite", [Shelf, Volume])
+    yield storage
+    storage.close()
+
+
+def populate(storage):
+    shelf = Shelf(uid = 1, label = "a")
+    volumes = [Volume(uid = i, title = f"v{i}", shelf = shelf) for i in range(3)]
+    storage.save([shelf] + volumes)
+    del shelf, volumes
+    gc.collect()
+    assert Shelf.objects.get_by_pk(1) is None
+
+
+@pytest.mark.parametrize("shelf_first", [True, False])
+def test_lazy_foreign_keys_fill_reverse_set(storage, shelf_first):
+    populate(storage)
+    if shelf_first:
+        shelf = storage.get(Shelf, 1)
+        volumes = storage.load(Volume)
+    else:
+        volumes = storage.load(Volume)
+        shelf = storage.get(Shelf, 1)
+    assert all(type(v.__dict__["shelf"]).__name__ == "LazyRelation" for v in volumes)
+    assert set(shelf.volumes) == set(volumes)
+    assert set(shelf.delete()) == {shelf} | set(volumes)
+
+
+def test_replacing_lazy_foreign_key_updates_reverse_set(storage):
+    populate(storage)
+    volumes = storage.load(Volume)
+    other = Shelf(uid = 2)
+    volumes[0].shelf = other
+    shelf = storage.get(Shelf, 1)
+    assert set(shelf.volumes) == set(volumes[1:])
+    assert set(other.volumes) == {volumes[0]}
+
+
+def test_filter_and_order_by_lazy_foreign_key(storage):
+    other = Shelf(uid = 2, label = "b")
+    storage.save([other, Volume(uid = 9, title = "v9", shelf = other)])
+    del other
+    populate(storage)
+    volumes = storage.load(Volume)
+    assert all(type(v.__dict__["shelf"]).__name__ == "LazyRelation" for v in volumes)
+    shelf = storage.get(Shelf, 1)
+
+    assert set(Volume.objects.filter(shelf = shelf)) == {v for v in volumes if v.uid < 3}
+    assert [v.uid for v in Volume.objects.filter(shelf__in = [2])] == [9]
+    assert [v.uid for v in Volume.objects.all().order_by("-shelf", "uid")] == [9, 0, 1, 2]
+    assert not Volume.objects.filter(shelf__isnull = True).exists()
+
+
+def test_writer_reports_any_exception(storage, monkeypatch, tick):
+    def broken(connection, grouped):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(storage, "_write", broken)
+    results = []
+    storage.save_async([Shelf(uid = 5)], callback = results.append)
+    storage.flush()
+    tick()
+    assert isinstance(results[0], RuntimeError)
+    # thread نویسنده هنوز زنده است
+    monkeypatch.undo()
+    storage.save_async([Shelf(uid = 6)], callback = results.append)
+    storage.flush()
+    tick()
+    assert results[1] == 1
+
+
+def stored_titles(storage):
+    return dict(storage.connection.execute('SELECT uid, title FROM "volume"').fetchall())
+
+
+def test_save_changes_inserts_new_objects(storage):
+    volume = Volume(uid = 20, title = "new")
+    volume.title = "renamed"
+    assert storage.save_changes([volume]) == 1
+    assert stored_titles(storage) == {20: "renamed"}
+    assert not volume.is_dirty()
+    volume.title = "again"
+    storage.save_changes([volume])
+    assert stored_titles(storage) == {20: "again"}
+
+
+def test_dirty_kept_when_write_fails(storage, monkeypatch):
+    volume = Volume(uid = 21)
+    storage.save([volume])
+    volume.title = "changed"
+
+    def broken(connection, grouped):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(storage, "_write", broken)
+    with pytest.raises(sqlite3.OperationalError):
+        storage.save_changes([volume])
+    assert volume.changed_fields() == {"title"}
+
+
+def test_async_save_clears_dirty_after_commit(storage, tick):
+    volume = Volume(uid = 22)
+    storage.save([volume])
+    volume.title = "first"
+    results = []
+    storage.save_async([volume], callback = results.append, changes_only = True)
+    # تغییر بعد از snapshot نباید با پایان نوشتن پاک شود
+    assert volume.is_dirty()
+    storage.flush()
+    volume.title = "second"
+    tick()
+    assert results == [1]
+    assert stored_titles(storage) == {22: "first"}
+    assert volume.changed_fields() == {"title"}
+    storage.save_changes([volume])
+    assert not volume.is_dirty()
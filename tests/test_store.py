@@ -0,0 +1,86 @@
+# tests/test_store.py
+import pytest
+
+from kivy_projectile.models import BaseModel, ModelStore
+from kivy_projectile.models import store as store_module
+from kivy_projectile.models.field import BooleanField, FloatField, IntegerField, StringField
+
+
+class Product(BaseModel):
+    name = StringField(default = "")
+    price = FloatField(default = 0.0)
+    stock = IntegerField(default = 0, null = True)
+    active = BooleanField(default = True)
+
+
+def lengths(store):
+    return {len(column.values) for column in store.columns.values()}
+
+
+def test_rows_round_trip():
+    store = ModelStore(Product, [{"name": "a", "price": 1.5, "stock": 3}, Product(name = "b", stock = None)])
+    store.append({"name": "c", "active": False})
+    assert len(store) == 3
+    assert store[0].to_dict() == {"name": "a", "price": 1.5, "stock": 3, "active": True}
+    assert store[1].stock is None
+    assert store[-1].active is False
+    assert store.sum("stock") == 3
+
+
+def test_append_failure_leaves_columns_aligned():
+    store = ModelStore(Product, [{"name": "a"}])
+    with pytest.raises(TypeError):
+        store.append({"name": 5, "price": 2.0})
+    with pytest.raises(ValueError):
+        store.append({"name": "b", "stock": 2 ** 70})
+    assert len(store) == 1
+    assert lengths(store) == {1}
+    assert len(store.columns["stock"].nulls) == 1
+
+
+def test_extend_overflow_adds_nothing():
+    store = ModelStore(Product)
+    with pytest.raises(ValueError):
+        store.extend([{"name": "a", "stock": 1}, {"name": "b", "stock": 2 ** 70}])
+    assert len(store) == 0
+    assert lengths(store) == {0}
+
+
+def test_set_overflow_keeps_row():
+    store = ModelStore(Product, [{"stock": 1}])
+    with pytest.raises(ValueError):
+        store[0].stock = 2 ** 70
+    assert store[0].stock == 1
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_argsort_descending_is_stable(monkeypatch, use_numpy):
+    if not use_numpy:
+        monkeypatch.setattr(store_module, "numpy", None)
+    elif store_module.numpy is None:
+        pytest.skip("numpy not installed")
+    store = ModelStore(Product, [{"price": price} for price in (1.0, 2.0, 1.0, 2.0, 0.5)])
+    assert store.argsort("price") == [4, 0, 2, 1, 3]
+    assert store.argsort("price", reverse = True) == [1, 3, 0, 2, 4]
+
+
+def test_argsort_puts_nulls_last():
+    store = ModelStore(Product, [{"stock": 2}, {"stock": None}, {"stock": 1}])
+    assert store.argsort("stock") == [2, 0, 1]
+    assert store.argsort("stock", reverse = True) == [0, 2, 1]
+
+
+def test_materialize_reuses_live_instance():
+    class Keyed(BaseModel):
+        uid = IntegerField(primary_key = True)
+        name = StringField(default = "")
+
+    store = ModelStore(Keyed, [{"uid": 1, "name": "a"}, {"uid": 2, "name": "b"}])
+    first = store[0].materialize()
+    assert first.name == "a" and not first.is_dirty()
+    assert store[0].materialize() is first
+    assert Keyed.objects.get_by_pk(2) is None
+    assert store[1].materialize() is Keyed.objects.get_by_pk(2)
+
+    plain = ModelStore(Product, [{"name": "x"}])
+    assert plain[0].materialize() is not plain[0].materialize()
@@ -0,0 +1,84 @@
+# tests/test_sync.py
+import json
+
+import pytest
+
+from kivy_projectile.models import BaseModel
+from kivy_projectile.models.field import ForeignKey, IntegerField, ManyToManyField, StringField
+from kivy_projectile.network.sync import SyncEngine
+
+
+class Team(BaseModel):
+    uid = IntegerField(primary_key = True)
+    name = StringField(default = "")
+
+
+class Player(BaseModel):
+    uid = IntegerField(primary_key = True)
+    name = StringField(default = "")
+    team = ForeignKey(Team, null = True, related_name = "players")
+    rivals = ManyToManyField(Team)
+
+
+@pytest.fixture
+def engine(http_server):
+    engine = SyncEngine(http_server.base_url, batch_interval = 0)
+    yield engine
+    engine.stop()
+
+
+def reply(status):
+    return lambda request: (status, {"Content-Type": "application/json"}, b"{}")
+
+
+def sent_patches(http_server):
+    return [json.loads(body) for method, path, _, body in http_server.requests if path == "/sync/"]
+
+
+def test_patch_sends_related_primary_keys(engine, http_server, tick):
+    http_server.routes[("POST", "/sync/")] = reply(200)
+    red, blue = Team(uid = 1), Team(uid = 2)
+    player = Player(uid = 10)
+    player.team = red
+    player.rivals.add(blue)
+    assert player.to_patch() == {"team": 1, "rivals": [2]}
+
+    results = []
+    engine.push(player, callback = results.append)
+    engine.flush(5)
+    tick()
+    assert sent_patches(http_server) == [[{"model": "Player", "pk": 10, "changes": {"team": 1, "rivals": [2]}}]]
+    assert results[0].status == 200
+    assert not player.is_dirty()
+
+
+def test_dirty_kept_on_error_response(engine, http_server, tick):
+    http_server.routes[("POST", "/sync/")] = reply(500)
+    player = Player(uid = 11)
+    player.name = "a"
+    results = []
+    engine.push(player, callback = results.append)
+    # تا پاسخ موفق، تغییرات dirty می‌مانند
+    assert player.changed_fields() == {"name"}
+    engine.flush(5)
+    tick()
+    assert results[0].status == 500
+    assert player.changed_fields() == {"name"}
+
+    http_server.routes[("POST", "/sync/")] = reply(200)
+    engine.push(player)
+    engine.flush(5)
+    tick()
+    assert sent_patches(http_server)[-1][0]["changes"] == {"name": "a"}
+    assert not player.is_dirty()
+
+
+def test_change_during_flight_stays_dirty(engine, http_server, tick):
+    http_server.routes[("POST", "/sync/")] = reply(200)
+    player = Player(uid = 12)
+    player.name = "first"
+    engine.push(player)
+    engine.flush(5)
+    player.name = "second"
+    tick()
+    assert player.changed_fields() == {"name"}
@@ -0,0 +1,213 @@
+# tests/test_theme.py
+import gc
+
+import pytest
+from kivy.properties import ListProperty
+from kivy.uix.widget import Widget
+
+from kivy_projectile.app.theme import BaseTheme, M3ThemableBehavior
+from kivy_projectile.app.theme.theme import SOURCE_ROLES, ThemeResolveError, rgba_from_hex, tonal_palette
+
+
+class Swatch(M3ThemableBehavior, Widget):
+    bg_color = ListProperty([0, 0, 0, 0])
+    fg_color = ListProperty([0, 0, 0, 0])
+
+
+def swatch(theme, **kwargs):
+    return Swatch(theme = theme, target_bg_prop = ["bg_color"], target_fg_prop = ["fg_color"], **kwargs)
+
+
+def record_changes(theme):
+    calls = []
+    theme.fbind("on_tokens_changed", lambda instance, changed: calls.append(set(changed)))
+    return calls
+
+
+def roles(source_name):
+    return {role for role, _, _ in SOURCE_ROLES[source_name]}
+
+
+def test_source_change_regenerates_only_its_roles():
+    theme = BaseTheme()
+    before = dict(theme.tokens)
+    calls = record_changes(theme)
+    theme.source_secondary = "#00696B"
+
+    assert len(calls) == 1 and calls[0] <= roles("source_secondary")
+    assert {token for token in theme.tokens if theme.tokens[token] != before[token]} == calls[0]
+
+
+def test_set_sources_publishes_once():
+    theme = BaseTheme()
+    calls = record_changes(theme)
+    theme.set_sources(source_primary = "#006A6A", source_tertiary = "#8B5000")
+
+    assert len(calls) == 1
+    assert calls[0] <= roles("source_primary") | roles("source_tertiary")
+    with pytest.raises(KeyError):
+        theme.set_sources(source_unknown = "#000000")
+
+
+def test_mode_switch_swaps_token_tables():
+    theme = BaseTheme()
+    light = dict(theme.tokens)
+    theme.mode = "dark"
+    dark = dict(theme.tokens)
+    theme.mode = "light"
+    assert theme.tokens == light and dark != light
+
+
+def test_tonal_palette_is_cached_and_read_only():
+    palette = tonal_palette("#6750A4")
+    assert tonal_palette("#6750A4") is palette
+    assert palette["0"] == "#000000" and palette["100"] == "#FFFFFF"
+    with pytest.raises(TypeError):
+        palette["40"] = "#000000"
+
+
+def test_token_subscribers_see_only_their_tokens():
+    theme = BaseTheme()
+    primary, neutral = [], []
+    theme.bind_tokens(("primary", "on_primary"), primary.append)
+    handle = theme.bind_tokens(("surface",), neutral.append)
+    theme.source_primary = "#006A6A"
+    # یک callback برای چند توکن تغییرکرده فقط یک‌بار صدا زده می‌شود
+    assert len(primary) == 1 and {"primary", "on_primary"} <= primary[0]
+    assert neutral == []
+
+    theme.unbind_tokens(handle)
+    theme.source_neutral = "#5D5F5F"
+    assert neutral == []
+
+
+def test_apply_theme_updates_only_changed_roles(tick):
+    theme = BaseTheme()
+    widget = swatch(theme)
+    assert list(widget.bg_color) == list(theme.get_rgba("surface"))
+
+    widget.bg_color = [1, 0, 1, 1]
+    widget.apply_theme(changed = {"on_surface"})
+    assert list(widget.bg_color) == [1, 0, 1, 1]
+    assert list(widget.fg_color) == list(theme.get_rgba("on_surface"))
+
+    theme.source_primary = "#006A6A"
+    tick()
+    assert list(widget.bg_color) == [1, 0, 1, 1]
+
+
+def test_dispatcher_batches_changes_into_one_pass(tick):
+    theme = BaseTheme()
+    widgets = [swatch(theme) for _ in range(10)]
+    other = swatch(theme, bg_token = "primary")
+    tick()
+    passes = theme.dispatcher.passes
+
+    theme.source_neutral = "#5D5F5F"
+    theme.mode = "dark"
+    tick()
+    stats = theme.dispatcher.stats()
+    assert stats["passes"] == passes + 1
+    # دو گروه: (surface، on_surface، ...) و (primary، on_surface، ...)
+    assert stats["groups"] == 2 and stats["last_pass_widgets"] == 11
+    assert all(list(widget.bg_color) == list(theme.get_rgba("surface")) for widget in widgets)
+    assert list(other.bg_color) == list(theme.get_rgba("primary"))
+
+
+def test_dispatcher_holds_widgets_weakly():
+    theme = BaseTheme()
+    widgets = [swatch(theme) for _ in range(5)]
+    assert len(theme.dispatcher) == 5
+    del widgets
+    gc.collect()
+    assert len(theme.dispatcher) == 0
+
+
+def test_token_change_moves_widget_between_groups(tick):
+    theme = BaseTheme()
+    widget = swatch(theme)
+    widget.bg_token = "primary"
+    assert theme.dispatcher.stats()["groups"] == 1
+
+    theme.source_neutral = "#5D5F5F"
+    tick()
+    assert list(widget.bg_color) == list(theme.get_rgba("primary"))
+    assert list(widget.fg_color) == list(theme.get_rgba("on_surface"))
+
+
+def test_frame_budget_continues_sweep_next_frame(tick):
+    theme = BaseTheme()
+    widgets = [swatch(theme) for _ in range(100)]
+    tick()
+    dispatcher = theme.dispatcher
+    dispatcher.frame_budget = 1e-9
+    theme.mode = "dark"
+    tick()
+    assert dispatcher.last_pass_widgets == dispatcher.BUDGET_CHECK_EVERY
+    assert dispatcher.last_pass_deferred == 100 - dispatcher.BUDGET_CHECK_EVERY
+    tick(10)
+    assert all(list(widget.bg_color) == list(theme.get_rgba("surface")) for widget in widgets)
+
+
+def test_rgba_table_follows_tokens():
+    theme = BaseTheme()
+    assert theme.rgba == {token: rgba_from_hex(value) for token, value in theme.tokens.items()}
+    with pytest.raises(TypeError):
+        theme.rgba["primary"] = (0, 0, 0, 1)
+
+    theme.mode = "dark"
+    assert theme.rgba == {token: rgba_from_hex(value) for token, value in theme.tokens.items()}
+
+
+def test_get_rgba_alpha_cache_is_invalidated():
+    theme = BaseTheme()
+    before = theme.get_rgba("primary", 0.5)
+    assert theme.get_rgba("primary", 0.5) is before
+    surface = theme.get_rgba("surface", 0.5)
+
+    theme.source_primary = "#006A6A"
+    after = theme.get_rgba("primary", 0.5)
+    assert after != before and after == rgba_from_hex(theme.tokens["primary"])[:3] + (0.5,)
+    assert theme.get_rgba("surface", 0.5) is surface
+    opaque = [theme.rgba[token][:3] + (1.0,) for token in ("primary", "surface")]
+    assert theme.get_rgba_many(["primary", "surface"]) == opaque
+    with pytest.raises(ThemeResolveError):
+        theme.get_rgba("missing")
+
+
+def test_transition_end_updates_skipped_offscreen_widgets(tick):
+    theme = BaseTheme(transition_duration = 10)
+    # توکنی که فقط در dark وجود دارد درون‌یابی نمی‌شود
+    theme._tables["dark"]["scrim"] = "#102030"
+    widgets = [swatch(theme) for _ in range(5)]
+    scrim = swatch(theme, bg_token = "scrim")
+    tick()
+
+    theme.mode = "dark"
+    tick()
+    transition = theme.transition
+    assert "scrim" in transition.changed and "scrim" not in transition.tokens
+    # ویجت‌های بیرون از پنجره حین انتقال رد می‌شوند
+    assert theme.dispatcher.last_pass_skipped == 6
+
+    transition.finish()
+    tick(3)
+    assert theme.transition is None
+    assert list(scrim.bg_color) == list(theme.get_rgba("scrim"))
+    assert all(list(widget.bg_color) == list(theme.get_rgba("surface")) for widget in widgets)
+
+
+def test_interrupted_transition_carries_its_changes_over(tick):
+    theme = BaseTheme(transition_duration = 10)
+    widget = swatch(theme)
+    tick()
+    theme.mode = "dark"
+    tick()
+    first = theme.transition
+    theme.set_sources(source_tertiary = "#8B5000")
+    assert theme.transition is not first and first.changed <= theme.transition.changed
+
+    theme.transition.finish()
+    tick(3)
+    assert list(widget.bg_color) == list(theme.get_rgba("surface"))
+    assert list(widget.fg_color) == list(theme.get_rgba("on_surface"))
@@ -0,0 +1,60 @@
+# tests/test_theme_cache.py
+import json
+
+from kivy_projectile.app.theme import BaseTheme, ThemeCache
+from kivy_projectile.app.theme.cache import theme_cache_key
+
+
+def test_second_start_loads_tokens_from_cache(tmp_path):
+    path = tmp_path / "theme.json"
+    first = BaseTheme(cache = ThemeCache(path), source_primary = "#006A6A")
+    assert "regenerate" in first.timings and path.exists()
+
+    cache = ThemeCache(path)
+    second = BaseTheme(cache = cache, source_primary = "#006A6A")
+    assert "cache_load" in second.timings and "regenerate" not in second.timings
+    assert cache.hits == 1
+    assert second.tokens == first.tokens
+    second.mode = "dark"
+    first.mode = "dark"
+    assert second.tokens == first.tokens
+
+
+def test_key_depends_on_sources_and_algorithm_version():
+    sources = {"source_primary": "#6750A4"}
+    key = theme_cache_key(sources, 1)
+    assert theme_cache_key(dict(sources), 1) == key
+    assert theme_cache_key({"source_primary": "#006A6A"}, 1) != key
+    assert theme_cache_key(sources, 2) != key
+
+
+def test_set_sources_stores_new_entry(tmp_path):
+    cache = ThemeCache(tmp_path / "theme.json")
+    theme = BaseTheme(cache = cache)
+    theme.set_sources(source_primary = "#006A6A")
+    assert cache.load(theme.cache_key()) == (theme._tables["light"], theme._tables["dark"])
+
+
+def test_entries_are_evicted_least_recently_used(tmp_path):
+    cache = ThemeCache(tmp_path / "theme.json", max_entries = 2)
+    for key in ("a", "b"):
+        cache.store(key, {"primary": key}, {"primary": key})
+    cache.load("a")
+    cache.store("a", {"primary": "a"}, {"primary": "a"})
+    cache.store("c", {"primary": "c"}, {"primary": "c"})
+
+    reopened = ThemeCache(tmp_path / "theme.json")
+    assert reopened.load("b") is None
+    assert reopened.load("a") == ({"primary": "a"}, {"primary": "a"})
+    assert reopened.load("c") is not None
+
+
+def test_unreadable_or_old_format_files_are_ignored(tmp_path):
+    path = tmp_path / "theme.json"
+    path.write_text("{not json")
+    assert ThemeCache(path).load("a") is None
+
+    path.write_text(json.dumps({"format": 0, "entries": [["a", {"light": {}, "dark": {}}]]}))
+    assert ThemeCache(path).load("a") is None
+    theme = BaseTheme(cache = ThemeCache(path))
+    assert "regenerate" in theme.timings
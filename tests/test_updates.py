@@ -0,0 +1,40 @@
+# tests/test_updates.py
+from kivy_projectile.models import BaseModel
+from kivy_projectile.models.field import IntegerField, StringField
+from kivy_projectile.models.updates import UpdateQueue
+
+
+class Task(BaseModel):
+    uid = IntegerField(primary_key = True)
+    title = StringField(default = "")
+
+
+def test_failed_write_does_not_drop_the_rest():
+    queue = UpdateQueue()
+    taken, first, second = Task(uid = 1), Task(uid = 2), Task(uid = 3)
+    # uid تکراری فقط هنگام اعمال (check_pk) خطا می‌دهد
+    queue.update(first, uid = 1, title = "a")
+    queue.set(second, "title", "b")
+    queue.drain()
+
+    assert first.uid == 2 and first.title == "a"
+    assert second.title == "b"
+    assert queue.errors == 1
+    assert queue.depth == 0 and queue.drains == 1
+
+
+def test_failing_listener_keeps_other_objects_and_stats():
+    queue = UpdateQueue()
+    broken, other = Task(uid = 10), Task(uid = 11)
+
+    def fail(*args):
+        raise RuntimeError("listener")
+    broken.fbind("on_change", fail)
+    queue.set(broken, "title", "x")
+    queue.set(other, "title", "y")
+    queue.drain()
+
+    assert broken.title == "x" and other.title == "y"
+    stats = queue.stats()
+    assert stats["errors"] == 1 and stats["drains"] == 1
+    assert stats["last_latency"] >= 0 and stats["last_drain_time"] >= 0
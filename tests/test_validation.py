@@ -0,0 +1,74 @@
+# tests/test_validation.py
+import pytest
+
+from kivy_projectile.models import BaseModel
+from kivy_projectile.models.field import BooleanField, FloatField, IntegerField, ModelField, StringField
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class Reading(BaseModel):
+    label = StringField(default = "")
+    value = FloatField(default = 0.0)
+    count = IntegerField(default = 0, null = False)
+    ok = BooleanField(default = True)
+
+
+SAMPLES = [None, 0, 1, 2.5, True, "x", b"x", [1]]
+
+
+@pytest.mark.parametrize("name", ["label", "value", "count", "ok"])
+def test_compiled_check_matches_validate(name):
+    field = Reading._fields[name]
+    for sample in SAMPLES:
+        try:
+            expected = ("ok", field.validate(sample))
+        except (TypeError, ValueError) as e:
+            expected = (type(e), str(e))
+        try:
+            actual = ("ok", field.check(sample))
+        except (TypeError, ValueError) as e:
+            actual = (type(e), str(e))
+        assert actual == expected, sample
+        if actual[0] == "ok":
+            assert type(actual[1]) is type(expected[1])
+
+
+def test_custom_validate_is_kept():
+    class Upper(ModelField):
+        def validate(self, value):
+            return value.upper()
+
+    class Note(BaseModel):
+        text = Upper(default = "")
+
+    assert Note(text = "hi").text == "HI"
+
+
+def test_validate_many_columns():
+    field = Reading._fields["value"]
+    assert field.validate_many([1.0, 2.0]) == [1.0, 2.0]
+    assert field.validate_many([1, 2.5]) == [1.0, 2.5]
+    with pytest.raises(TypeError):
+        field.validate_many([1.0, "2"])
+    with pytest.raises(ValueError):
+        Reading._fields["count"].validate_many([1, None])
+    if numpy is not None:
+        assert field.validate_many(numpy.arange(3)) == [0.0, 1.0, 2.0]
+
+
+def test_model_validate_many_does_not_mutate_input():
+    rows = [{"value": 1, "count": 2}, {"label": "a"}]
+    cleaned = Reading.validate_many(rows)
+    assert cleaned == [{"value": 1.0, "count": 2}, {"label": "a"}]
+    assert type(cleaned[0]["value"]) is float
+    assert type(rows[0]["value"]) is int
+
+
+def test_hydrate_skips_validation_and_dispatch():
+    reading = Reading.hydrate({"label": "raw", "count": 3})
+    assert (reading.label, reading.count, reading.value, reading.ok) == ("raw", 3, 0.0, True)
+    assert not reading.is_dirty()